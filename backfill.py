@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import argparse
+import tempfile
+
+from utils.backfill import StagingWriter, load_staging, stage_season
+from utils.browser import DriverFactory, DriverProfile
+from utils.cache import PageCache
+from utils.db import create_db_session
+from utils.fetch import build_fetcher
+from utils.parse import available_backends, get_parser_backend, set_parser_backend
+from utils.rate import AdaptiveRateController
+from utils.scheduler import parse_numbers
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Backfill whole seasons: scrape to CSV staging files, then COPY and merge them into Postgres."
+    )
+    parser.add_argument("--years", type=parse_numbers, required=True, help="Years to backfill, e.g. 2005-2025 or 2019,2021")
+    parser.add_argument(
+        "--comps", type=lambda value: [int(comp) for comp in value.split(",")], default=[111],
+        help="Comma separated competition IDs (default: 111 for NRL)",
+    )
+    parser.add_argument(
+        "--staging-dir",
+        help="Directory for the staging CSV files, kept after the run (default: a temporary directory)",
+    )
+    parser.add_argument("--load-only", action="store_true", help="Skip scraping and load the files already in --staging-dir")
+    parser.add_argument("--no-load", action="store_true", help="Only write the staging files")
+    parser.add_argument(
+        "--min-interval", type=float, default=1.0,
+        help="Minimum seconds between page loads (default: 1.0)",
+    )
+    parser.add_argument(
+        "--max-interval", type=float, default=30.0,
+        help="Longest the spacing between page loads grows to while the site is erroring or slow (default: 30)",
+    )
+    parser.add_argument(
+        "--wait-timeout", type=float, default=15.0,
+        help="Seconds to wait for the Play by Play events to render in the browser (default: 15)",
+    )
+    parser.add_argument(
+        "--browser-profile",
+        help="Keep Chromium profiles (and their HTTP cache) in this directory between runs (default: temporary profiles)",
+    )
+    parser.add_argument(
+        "--no-block-resources", action="store_true",
+        help="Let Chromium load images, media, fonts and third-party trackers",
+    )
+    parser.add_argument(
+        "--recycle-pages", type=int, default=200,
+        help="Restart each browser after this many page loads, 0 never (default: 200)",
+    )
+    parser.add_argument(
+        "--recycle-rss-mb", type=int, default=1024,
+        help="Restart a browser once its processes use more memory than this, 0 never (default: 1024)",
+    )
+    parser.add_argument(
+        "--fetcher", choices=["browser", "http"], default="browser",
+        help="Load pages in headless Chromium, or over plain HTTP falling back to the browser when needed",
+    )
+    parser.add_argument(
+        "--parser", choices=available_backends(), default=get_parser_backend(),
+        help=f"HTML parser backend (default: {get_parser_backend()})",
+    )
+    parser.add_argument("--cache-dir", help="Save the raw HTML of every page loaded to this directory")
+    parser.add_argument("--cache-max-mb", type=int, default=2048, help="Size cap of the page cache in MB (default: 2048)")
+    parser.add_argument(
+        "--replay", action="store_true",
+        help="Read pages only from --cache-dir instead of the site, no browser is started",
+    )
+    args = parser.parse_args()
+    if args.replay and not args.cache_dir:
+        parser.error("--replay requires --cache-dir")
+    if args.load_only and not args.staging_dir:
+        parser.error("--load-only requires --staging-dir")
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    set_parser_backend(args.parser)
+    staging_dir = args.staging_dir or tempfile.mkdtemp(prefix="nrl-backfill-")
+    print(
+        f"Starting NRL backfill for:\n"
+        f"  Years: {args.years[0]}-{args.years[-1]}\n"
+        f"  Competition IDs: {args.comps}\n"
+        f"  Staging directory: {staging_dir}\n"
+        f"  Replay: {args.replay}"
+    )
+
+    if not args.load_only:
+        page_cache = PageCache(args.cache_dir, args.cache_max_mb * 1024 ** 2) if args.cache_dir else None
+        rate_limiter = AdaptiveRateController(args.min_interval, args.max_interval)
+        driver_factory = DriverFactory(DriverProfile(
+            user_data_dir=args.browser_profile,
+            block_resources=not args.no_block_resources,
+            max_pages=args.recycle_pages,
+            max_rss_mb=args.recycle_rss_mb,
+        ))
+        fetcher = build_fetcher(args.fetcher, rate_limiter, page_cache, args.replay, args.wait_timeout, driver_factory)
+        try:
+            with StagingWriter(staging_dir) as writer:
+                for comp in args.comps:
+                    for year in args.years:
+                        stage_season(fetcher, writer, comp, year)
+        finally:
+            fetcher.close()
+        print(f"Staged {writer.matches} matches and {writer.events} events")
+
+    if not args.no_load:
+        session = create_db_session()()
+        counts = load_staging(session, staging_dir)
+        print(f"Merged: {counts}")
+
+    print("Backfill completed.")
+
+
+if __name__ == "__main__":
+    main()
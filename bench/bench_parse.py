@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Events/second of the play-by-play extractors on the saved 80 minute match
+page, for every installed parser backend.
+
+    python bench/bench_parse.py [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.parse import available_backends, extract_event_data, iter_event_records, make_soup
+
+MATCH_PAGE = Path(__file__).parent.parent / "test" / "fixtures" / "match_play_by_play.html"
+
+
+def find_extract(soup) -> list:
+    return [
+        parsed
+        for content in soup.find_all("div", class_="match-centre-event__content")
+        for parsed in extract_event_data(content)
+        if parsed
+    ]
+
+
+def single_pass(soup) -> list:
+    return list(iter_event_records(soup))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    html = MATCH_PAGE.read_text()
+    for backend in available_backends():
+        soup = make_soup(html, backend)
+        for extractor in (find_extract, single_pass):
+            events = len(extractor(soup))
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                extractor(soup)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            print(f"{backend:12} {extractor.__name__:13} {events} events  {events / elapsed:10,.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
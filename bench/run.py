@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the parse and persistence hot paths.
+
+Parse benchmarks run on the saved pages in test/fixtures. The ingest
+benchmark writes N synthetic matches through utils/db.py and needs a
+throwaway Postgres database, e.g. the `test` database from
+ops/create_tables.sql:
+
+    BENCH_DATABASE_URL=postgresql://nrluser:nrlpass@db:5432/test python bench/run.py --matches 20
+
+Results are written to bench/results.json. Use --save-baseline to
+overwrite bench/baseline.json, and commit it so later runs show up as a diff.
+Every run prints the change against the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.parse import (
+    available_backends,
+    extract_bye_teams,
+    extract_event_data,
+    extract_match_data,
+    iter_event_records,
+    make_soup,
+)
+
+BENCH_DIR = Path(__file__).parent
+FIXTURES = BENCH_DIR.parent / "test" / "fixtures"
+RESULTS = BENCH_DIR / "results.json"
+BASELINE = BENCH_DIR / "baseline.json"
+
+
+def timed(fn: Callable, repeat: int) -> dict:
+    """Mean wall time of fn over `repeat` calls, and peak traced memory of one call."""
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": elapsed, "peak_kb": peak / 1024}
+
+
+def bench_parse(repeat: int) -> dict:
+    match_html = (FIXTURES / "match_page.html").read_text()
+    play_by_play_html = (FIXTURES / "match_play_by_play.html").read_text()
+    bye_html = (FIXTURES / "bye_round.html").read_text()
+    results = {}
+    for backend in available_backends():
+        match_div = make_soup(match_html, backend).find("div", class_="match")
+        events_soup = make_soup(play_by_play_html, backend)
+        bye_soup = make_soup(bye_html, backend)
+        contents = events_soup.find_all("div", class_="match-centre-event__content")
+        events = len(list(iter_event_records(events_soup)))
+
+        cases = {
+            "make_soup.play_by_play": lambda: make_soup(play_by_play_html, backend),
+            "extract_match_data": lambda: extract_match_data(match_div, "2025"),
+            "extract_event_data": lambda: [p for c in contents for p in extract_event_data(c) if p],
+            "iter_event_records": lambda: list(iter_event_records(events_soup)),
+            "extract_bye_teams": lambda: extract_bye_teams(bye_soup),
+        }
+        for name, fn in cases.items():
+            result = timed(fn, repeat)
+            if name in ("extract_event_data", "iter_event_records"):
+                result["events_per_sec"] = events / result["seconds"]
+            results[f"{backend}/{name}"] = result
+    return results
+
+
+def synthetic_match(i: int, run_id: int) -> dict:
+    return {
+        "date": datetime(1900, 1, 1) + timedelta(days=run_id * 1000 + i),
+        "round": i % 27 + 1,
+        "home_name": f"Bench Home {i % 17}",
+        "away_name": f"Bench Away {i % 17}",
+        "home_score": 20,
+        "away_score": 18,
+        "venue": "Bench Oval",
+        "attendance": "10,000",
+        "ground_conditions": "Good",
+        "weather": "Fine",
+    }
+
+
+def bench_ingest(database_url: str, matches: int) -> dict:
+    from sqlalchemy import event
+
+    from utils.db import LOOKUP_CACHE, bulk_insert_match_events, create_db_session, get_or_create_event, get_or_create_match
+
+    session = create_db_session(database_url)()
+    queries = [0]
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: queries.__setitem__(0, queries[0] + 1))
+
+    records = list(iter_event_records(make_soup((FIXTURES / "match_play_by_play.html").read_text())))
+    run_id = int(time.time()) % 100000
+    results = {}
+    for mode, write in (
+        ("batch", lambda match_id: bulk_insert_match_events(session, match_id, records)),
+        ("per_row", lambda match_id: [get_or_create_event(session, match_id, r) for r in records]),
+    ):
+        LOOKUP_CACHE.invalidate()
+        queries[0] = 0
+        tracemalloc.start()
+        start = time.perf_counter()
+        for i in range(matches):
+            match = get_or_create_match(session, synthetic_match(i, run_id * 2 + (mode == "per_row")), 2025, 111)
+            write(match.id)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"ingest/{mode}"] = {
+            "seconds": elapsed / matches,
+            "events_per_sec": matches * len(records) / elapsed,
+            "queries_per_match": queries[0] / matches,
+            "peak_kb": peak / 1024,
+        }
+    session.close()
+    return results
+
+
+def compare(results: dict, baseline: dict) -> None:
+    print(f"\n{'benchmark':40} {'metric':18} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            change = f"{(value - before) / before:+.0%}" if before else ""
+            before = f"{before:12.6g}" if before is not None else f"{'-':>12}"
+            print(f"{name:40} {metric:18} {before} {value:12.6g} {change:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark parse and persistence hot paths.")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per parse benchmark (default: 20)")
+    parser.add_argument("--matches", type=int, default=20, help="Synthetic matches to ingest (default: 20)")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="Postgres to ingest into, ingest is skipped when unset (default: $BENCH_DATABASE_URL)")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Overwrite {BASELINE.name} with this run")
+    args = parser.parse_args()
+
+    results = bench_parse(args.repeat)
+    if args.database_url:
+        results.update(bench_ingest(args.database_url, args.matches))
+    else:
+        print("BENCH_DATABASE_URL not set, skipping ingest benchmark")
+
+    report = {"python": platform.python_version(), "results": results}
+    RESULTS.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    baseline = json.loads(BASELINE.read_text())["results"] if BASELINE.exists() else {}
+    compare(results, baseline)
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+        print(f"\nSaved baseline to {BASELINE}")
+
+
+if __name__ == "__main__":
+    main()
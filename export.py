@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import argparse
+
+from utils.db import create_db_session
+from utils.export import DEFAULT_CHUNK_SIZE, DEFAULT_LAG_SECONDS, export
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Export matches, events and the lookup tables to season-partitioned Parquet files."
+    )
+    parser.add_argument("--output-dir", required=True, help="Directory of the Parquet dataset")
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Re-export every event instead of only those added since the last export to --output-dir",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+        help=f"Rows fetched from the server-side cursor at a time (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--lag", type=float, default=DEFAULT_LAG_SECONDS,
+        help=f"Leave events created in the last LAG seconds to the next export (default: {DEFAULT_LAG_SECONDS})",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    session = create_db_session()()
+    try:
+        counts = export(session, args.output_dir, args.full, args.chunk_size, args.lag)
+    finally:
+        session.close()
+    print(f"Exported to {args.output_dir}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,407 @@
 #!/usr/bin/env python3
+"""
+NRL scraper command line.
+
+    ./main.py scrape --year 2025      scrape a season into Postgres (the default command)
+    ./main.py scrape --year 2025 --sink sqlite:nrl.db
+    ./main.py replay --year 2025 --cache-dir DIR
+    ./main.py parse FILE              print what the parser finds in a saved page as JSON
+    ./main.py stats ladder --season 2025
+    ./main.py enrich                  fill in player profiles that are missing or stale
+
+Only argparse is imported up front, every command imports what it needs when
+it runs, so parse never loads Selenium or SQLAlchemy and --help is instant.
+"""
+from __future__ import annotations
 
 import argparse
-from dataclasses import dataclass
+import sys
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from utils.browser import DriverFactory
+    from utils.fetch import Fetcher
+    from utils.pool import WorkerPool
+    from utils.scheduler import Target
+    from utils.scrape import ScrapeConfig
+    from utils.sinks import Sink
+
+COMMANDS = ("scrape", "replay", "parse", "stats", "enrich")
+SINK_HELP = (
+    "Where to write what is scraped: postgres (default, $DB_* settings), a postgresql:// URL, sqlite:PATH "
+    "for an embedded database, or ndjson:PATH with ndjson:- for stdout"
+)
+PARSER_HELP = "HTML parser backend, lxml or html.parser (default: lxml when installed, or $NRL_HTML_PARSER)"
+
 
-from utils.db import create_db_session
-from utils.scrape import ScrapeConfig, create_driver, determine_latest_round, scrape_round
+def matrix_target(value: str) -> list[Target]:
+    from utils.scheduler import parse_target
+    return parse_target(value)
 
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Scrape NRL match data for a given year and round.")
-    parser.add_argument("--year", type=int, required=True, help="Year to scrape data for (e.g. 2025)")
+def add_scrape_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--year", type=int, help="Year to scrape data for (e.g. 2025), required unless --matrix is given")
     parser.add_argument("--comp", type=int, default=111, help="Competition ID to scrape (default: 111 for NRL)")
-    parser.add_argument("--start-round", type=int, default=1, help="Round number to start from (default: 1)")
-    return parser.parse_args()
+    parser.add_argument(
+        "--start-round", type=int,
+        help="Round number to start from (default: the first round not yet complete in scrape_state)",
+    )
+    parser.add_argument(
+        "--ignore-state", action="store_true",
+        help="Re-scrape rounds and matches even if scrape_state marks them complete",
+    )
+    parser.add_argument(
+        "--per-row-writes", action="store_true",
+        help="Write events one row per transaction instead of one batch per match (for comparison)",
+    )
+    parser.add_argument(
+        "--matrix", type=matrix_target, action="append",
+        help="COMP:YEARS[:ROUNDS][@PRIORITY] to scrape instead of --year/--comp, e.g. 111:2015-2025 or "
+             "116:2024:1-5@1. Repeat for more competitions; all of them share one queue run by --workers threads",
+    )
+    parser.add_argument(
+        "--live", action="store_true",
+        help="Poll the current round's matches for new events until they have all finished",
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=30.0,
+        help="Seconds between polls of each live match with --live (default: 30)",
+    )
+    parser.add_argument(
+        "--poll-timeout", type=float, default=240.0,
+        help="Minutes after which --live stops polling a match that has not finished, e.g. one postponed, "
+             "and marks it failed (default: 240)",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Number of browsers scraping match pages in parallel (default: 1)")
+    parser.add_argument(
+        "--min-interval", type=float, default=1.0,
+        help="Minimum seconds between page loads across all workers, the spacing backs off from here "
+             "when the site errors or slows down (default: 1.0)",
+    )
+    parser.add_argument(
+        "--max-interval", type=float, default=30.0,
+        help="Longest the spacing between page loads grows to while the site is erroring or slow (default: 30)",
+    )
+    parser.add_argument(
+        "--wait-timeout", type=float, default=15.0,
+        help="Seconds to wait for the Play by Play events to render in the browser (default: 15)",
+    )
+    parser.add_argument(
+        "--browser-profile",
+        help="Keep Chromium profiles (and their HTTP cache) in this directory between runs (default: temporary profiles)",
+    )
+    parser.add_argument(
+        "--no-block-resources", action="store_true",
+        help="Let Chromium load images, media, fonts and third-party trackers",
+    )
+    parser.add_argument(
+        "--recycle-pages", type=int, default=200,
+        help="Restart each browser after this many page loads, 0 never (default: 200)",
+    )
+    parser.add_argument(
+        "--recycle-rss-mb", type=int, default=1024,
+        help="Restart a browser once its processes use more memory than this, 0 never (default: 1024)",
+    )
+    parser.add_argument(
+        "--fetcher", choices=["browser", "http"], default="browser",
+        help="Load pages in headless Chromium, or over plain HTTP falling back to the browser when needed",
+    )
+    parser.add_argument(
+        "--engine", choices=["sync", "async"], default="sync",
+        help="Scrape rounds one after another, or as overlapping asyncio tasks (default: sync)",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4,
+        help="Pages fetched at once by the async engine, each with its own fetcher (default: 4)",
+    )
+    parser.add_argument("--parser", help=PARSER_HELP)
+    parser.add_argument("--sink", default="postgres", help=SINK_HELP)
+    parser.add_argument("--cache-max-mb", type=int, default=2048, help="Size cap of the page cache in MB (default: 2048)")
+    parser.add_argument("--metrics-json", help="Write a JSON report of stage timings and counters to this file")
+    parser.add_argument(
+        "--metrics-prom",
+        help="Write stage timings and counters in Prometheus text format to this file, e.g. for the textfile collector",
+    )
+
 
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # the scraper's flags used to be the whole CLI, keep `./main.py --year 2025` working
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv = ["scrape", *argv]
 
-@dataclass
-class ScrapeArgs:
-    year: int
-    comp: int
-    start_round: int
+    parser = argparse.ArgumentParser(description="Scrape NRL match data, parse saved pages and report on the results.")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="{" + ",".join(COMMANDS) + "}")
+
+    scrape = commands.add_parser("scrape", help="Scrape match data for a given year and round into Postgres")
+    add_scrape_arguments(scrape)
+    scrape.add_argument("--cache-dir", help="Save the raw HTML of every page loaded to this directory")
+    scrape.add_argument(
+        "--replay", action="store_true",
+        help="Read pages only from --cache-dir instead of the site, no browser is started",
+    )
+
+    replay = commands.add_parser("replay", help="Scrape from the page cache only, no browser is started")
+    add_scrape_arguments(replay)
+    replay.add_argument("--cache-dir", required=True, help="Directory of pages saved by an earlier scrape --cache-dir")
+    replay.set_defaults(replay=True)
+
+    parse = commands.add_parser("parse", help="Print what the parser extracts from a saved page as JSON, offline")
+    parse.add_argument("file", help="HTML file of a draw, match or play by play page, - for stdin")
+    parse.add_argument("--year", type=int, help="Year the match dates are in (default: this year)")
+    parse.add_argument("--parser", help=PARSER_HELP)
+
+    stats = commands.add_parser("stats", help="Print the ladder, team or player stats")
+    stats.add_argument("report", nargs="?", choices=["ladder", "teams", "players"], default="ladder")
+    stats.add_argument("--season", type=int, action="append", help="Season to report on, repeat for more (default: all)")
+    stats.add_argument("--parquet", help="Read a Parquet export (export.py --output-dir) instead of the database")
+    stats.add_argument("--limit", type=int, help="Print only the first rows")
+
+    enrich = commands.add_parser("enrich", help="Fetch the profile pages of players with missing or stale profiles")
+    enrich.add_argument(
+        "--max-age-days", type=int, default=30,
+        help="Re-check profiles last checked longer ago than this (default: 30)",
+    )
+    enrich.add_argument("--limit", type=int, help="Check at most this many players, those never checked first")
+    enrich.add_argument("--player", action="append", help="Only check the player with this name, repeat for more")
+    enrich.add_argument("--workers", type=int, default=8, help="Profile pages fetched at once (default: 8)")
+    enrich.add_argument(
+        "--min-interval", type=float, default=0.25,
+        help="Minimum seconds between profile requests, separate from any scrape's (default: 0.25)",
+    )
+    enrich.add_argument(
+        "--max-interval", type=float, default=30.0,
+        help="Longest the spacing between requests grows to while the site is erroring or slow (default: 30)",
+    )
+    enrich.add_argument("--batch-size", type=int, default=200, help="Profiles written per transaction (default: 200)")
+    enrich.add_argument(
+        "--competition-slug", default="nrl-premiership",
+        help="Competition part of profile URLs not yet known (default: nrl-premiership)",
+    )
+    enrich.add_argument("--metrics-json", help="Write a JSON report of fetch and parse timings to this file")
 
+    args = parser.parse_args(argv)
+    if args.command in ("scrape", "replay"):
+        if args.replay and not args.cache_dir:
+            parser.error("--replay requires --cache-dir")
+        if args.year is None and not args.matrix:
+            parser.error("one of --year or --matrix is required")
+        if args.live and args.matrix:
+            parser.error("--live polls a single --year / --comp, not a --matrix")
+        if args.matrix and args.engine == "async":
+            parser.error("--matrix runs on --workers threads, not --engine async")
+        if args.matrix and args.start_round is not None:
+            parser.error("--matrix takes its rounds as COMP:YEARS:ROUNDS, not --start-round")
+        kind, _, target = args.sink.partition(":")
+        if args.sink != "postgres" and not args.sink.startswith("postgresql"):
+            if kind not in ("sqlite", "ndjson") or not target:
+                parser.error(f"--sink must be postgres, a postgresql:// URL, sqlite:PATH or ndjson:PATH, not {args.sink!r}")
+            if args.live or args.matrix:
+                parser.error("--live and --matrix keep their state in Postgres, use them with --sink postgres")
+    if getattr(args, "parser", None):
+        from utils.parse import set_parser_backend
+        try:
+            set_parser_backend(args.parser)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
 
-def main() -> None:
-    args = parse_args()
+
+def build_driver_factory(args: argparse.Namespace) -> DriverFactory:
+    from utils.browser import DriverFactory, DriverProfile
+    return DriverFactory(DriverProfile(
+        user_data_dir=args.browser_profile,
+        block_resources=not args.no_block_resources,
+        max_pages=args.recycle_pages,
+        max_rss_mb=args.recycle_rss_mb,
+    ))
+
+
+def scrape_year(args: argparse.Namespace, config: ScrapeConfig, pool: WorkerPool | None,
+                async_fetcher_factory: Callable[[], Fetcher]) -> None:
+    """Scrape the rounds of --year / --comp from where scrape_state says to resume."""
+    from utils.db import LOOKUP_CACHE
+    from utils.scrape import determine_latest_round, scrape_round
+    from utils.state import first_incomplete_round
+
+    start_round = args.start_round or (
+        1 if args.ignore_state else first_incomplete_round(config.session, args.comp, args.year)
+    )
+    print(f"Starting from Round {start_round}")
+    latest_round = determine_latest_round(config)
+    if args.engine == "async":
+        import asyncio
+
+        from utils.engine import AsyncEngine
+
+        engine = AsyncEngine(
+            config, async_fetcher_factory, concurrency=args.concurrency,
+            rate=1 / args.min_interval if args.min_interval > 0 else 0,
+        )
+        asyncio.run(engine.run(range(start_round, latest_round)))
+        print(f"Lookup cache: {LOOKUP_CACHE.stats()}")
+    else:
+        for round_number in range(start_round, latest_round):
+            scrape_round(config=config, round_number=round_number, pool=pool)
+            print(f"Lookup cache for Round {round_number}: {LOOKUP_CACHE.stats()}")
+            LOOKUP_CACHE.reset_stats()
+
+
+def scrape(args: argparse.Namespace) -> None:
+    import contextlib
+
+    from utils.sinks import is_postgres, open_sink
+
+    sink = open_sink(args.sink)
+    # keep stdout for the records when they are streamed there
+    output = contextlib.redirect_stdout(sys.stderr) if args.sink == "ndjson:-" else contextlib.nullcontext()
+    try:
+        with output:
+            scrape_into(args, sink, args.sink if is_postgres(args.sink) and args.sink != "postgres" else None)
+    finally:
+        if sink:
+            sink.close()
+
+
+def scrape_into(args: argparse.Namespace, sink: Sink | None, database_url: str | None) -> None:
+    """
+    Scrape into sink, or into Postgres when it is None. scrape_state, --live
+    and --matrix need Postgres, so other sinks rescrape everything asked for.
+    """
+    from utils.cache import PageCache
+    from utils.db import DATABASE_URL, LOOKUP_CACHE, create_db_session
+    from utils.fetch import build_fetcher
+    from utils.live import LivePoller
+    from utils.metrics import METRICS
+    from utils.parse import get_parser_backend
+    from utils.pool import WorkerPool
+    from utils.rate import AdaptiveRateController
+    from utils.scheduler import Scheduler
+    from utils.scrape import DEFAULT_YEAR, ScrapeConfig
+
+    targets = [target for entry in args.matrix or [] for target in entry]
     print(
         f"Starting NRL data scraping for:\n"
-        f"  Year: {args.year}\n"
+        f"  Year: {args.year or '-'}\n"
         f"  Competition ID: {args.comp}\n"
-        f"  Starting Round: {args.start_round}"
+        f"  Matrix: {len(targets)} seasons\n"
+        f"  Starting Round: {args.start_round or 'resume'}\n"
+        f"  Workers: {args.workers}\n"
+        f"  Fetcher: {args.fetcher}\n"
+        f"  Engine: {args.engine}\n"
+        f"  Parser: {get_parser_backend()}\n"
+        f"  Sink: {args.sink}\n"
+        f"  Replay: {args.replay}\n"
+        f"  Live: {args.live}"
     )
 
+    if sink is None:
+        session_factory = create_db_session(database_url or DATABASE_URL)
+    else:
+        def session_factory():
+            return None
+        args.ignore_state = True
+    rate_limiter = AdaptiveRateController(args.min_interval, args.max_interval)
+    page_cache = PageCache(args.cache_dir, args.cache_max_mb * 1024 ** 2) if args.cache_dir else None
+    # replay never starts a browser, leave Selenium unimported
+    driver_factory = None if args.replay else build_driver_factory(args)
+
+    def fetcher_factory():
+        return build_fetcher(args.fetcher, rate_limiter, page_cache, args.replay, args.wait_timeout, driver_factory)
+
+    def async_fetcher_factory():
+        # the async engine rate limits with its own per-host token buckets
+        return build_fetcher(args.fetcher, None, page_cache, args.replay, args.wait_timeout, driver_factory)
+
     config = ScrapeConfig(
-        session=create_db_session()(),
-        driver=create_driver(),
-        year=args.year,
+        session=session_factory(),
+        fetcher=fetcher_factory(),
+        year=args.year or int(DEFAULT_YEAR),
         competition_id=args.comp,
+        batch_writes=not args.per_row_writes,
+        track_state=not args.ignore_state,
+        sink=sink,
     )
+    pool = WorkerPool(config, args.workers, session_factory, fetcher_factory) if args.workers > 1 and not targets else None
 
     try:
-        latest_round = determine_latest_round(config)
-        for round_number in range(args.start_round, latest_round):
-            scrape_round(config=config, round_number=round_number)
+        if config.session is not None:
+            LOOKUP_CACHE.warm(config.session)
+        if targets:
+            scheduler = Scheduler(config, targets, args.workers, session_factory, fetcher_factory)
+            print(f"Scheduler ran: {dict(scheduler.run())}")
+            print(f"Lookup cache: {LOOKUP_CACHE.stats()}")
+        elif args.live:
+            LivePoller(config, args.poll_interval, max_poll_seconds=args.poll_timeout * 60).run()
+        else:
+            scrape_year(args, config, pool, async_fetcher_factory)
     finally:
-        config.driver.quit()
+        if pool:
+            pool.close()
+        config.fetcher.close()
+        if args.metrics_json:
+            METRICS.write_json(args.metrics_json)
+        if args.metrics_prom:
+            METRICS.write_prometheus(args.metrics_prom)
 
     print("Scraping completed.")
 
 
+def parse(args: argparse.Namespace) -> None:
+    """Run the extract_* functions over a saved page, no browser or database involved."""
+    import json
+    from datetime import date, datetime
+
+    from utils.parse import parse_html
+
+    if args.file == "-":
+        html = sys.stdin.read()
+    else:
+        with open(args.file, encoding="utf-8", errors="replace") as f:
+            html = f.read()
+    result = parse_html(html, str(args.year or datetime.now().year))
+    print(json.dumps(result, indent=2, default=lambda value: value.isoformat() if isinstance(value, (date, datetime)) else str(value)))
+
+
+def stats(args: argparse.Namespace) -> None:
+    import pandas as pd
+
+    from utils.analytics import Analytics
+
+    if args.parquet:
+        analytics = Analytics.from_parquet(args.parquet, args.season)
+    else:
+        from utils.db import create_db_session
+        analytics = Analytics.from_db(create_db_session()(), args.season)
+    report = {"ladder": analytics.ladder, "teams": analytics.team_stats, "players": analytics.player_stats}[args.report]
+    frame = report(args.season)
+    if args.limit is not None:
+        frame = frame.head(args.limit)
+    with pd.option_context("display.max_columns", None, "display.width", None):
+        print(frame.to_string(index=False))
+
+
+def enrich(args: argparse.Namespace) -> None:
+    from utils.db import create_db_session
+    from utils.metrics import METRICS
+    from utils.profiles import ProfileFetcher, enrich_profiles
+    from utils.rate import AdaptiveRateController
+
+    fetcher = ProfileFetcher(AdaptiveRateController(args.min_interval, args.max_interval), args.workers)
+    counts = enrich_profiles(
+        create_db_session()(), fetcher, args.workers, args.max_age_days, args.limit, args.batch_size,
+        args.competition_slug, args.player,
+    )
+    print(f"Player profiles: {dict(counts)}")
+    if args.metrics_json:
+        METRICS.write_json(args.metrics_json)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    commands = {"scrape": scrape, "replay": scrape, "parse": parse, "stats": stats, "enrich": enrich}
+    commands[args.command](args)
+
+
 if __name__ == "__main__":
     main()
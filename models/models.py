@@ -1,13 +1,18 @@
 from sqlalchemy import (
     ARRAY,
+    Boolean,
     Column,
     Date,
     DateTime,
     ForeignKey,
+    ForeignKeyConstraint,
+    Index,
     Integer,
     PrimaryKeyConstraint,
+    SmallInteger,
     String,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base, relationship
@@ -30,7 +35,7 @@ class Team(Base):
 class Player(Base):
     __tablename__ = 'players'
     id = Column(Integer, primary_key=True)
-    name = Column(String(255), nullable=False)
+    name = Column(String(255), nullable=False, unique=True)
     positions = Column(ARRAY(Text))
     date_of_birth = Column(Date)
     height = Column(Integer)
@@ -50,6 +55,8 @@ class Player(Base):
 class Match(Base):
     __tablename__ = 'matches'
     id = Column(Integer, primary_key=True)
+    competition_id = Column(Integer, nullable=False)
+    season = Column(Integer, nullable=False)
     round = Column(Integer, nullable=False)
     date = Column(DateTime(timezone=True))
     venue = Column(String(255))
@@ -61,6 +68,15 @@ class Match(Base):
     weather = Column(String(255))
     ground_conditions = Column(String(255))
 
+    __table_args__ = (
+        Index('idx_matches_date_teams', 'date', 'home_team_id', 'away_team_id',
+              unique=True, postgresql_where=date.isnot(None)),
+        Index('idx_matches_round_teams', 'round', 'home_team_id', 'away_team_id'),
+        Index('idx_matches_bye', 'competition_id', 'season', 'round', 'home_team_id',
+              unique=True, postgresql_where=away_team_id.is_(None)),
+        Index('idx_matches_season_round', 'season', 'round'),
+    )
+
     home_team = relationship('Team', foreign_keys=[home_team_id], back_populates='home_matches')
     away_team = relationship('Team', foreign_keys=[away_team_id], back_populates='away_matches')
     appearances = relationship('PlayerAppearance', back_populates='match')
@@ -78,6 +94,11 @@ class TeamMembership(Base):
     player = relationship('Player', back_populates='memberships')
     team = relationship('Team', back_populates='players')
 
+    __table_args__ = (
+        UniqueConstraint('player_id', 'team_id', 'start_date', name='team_memberships_player_team_start_key'),
+        Index('idx_team_memberships_player', 'player_id'),
+    )
+
 
 class PlayerAppearance(Base):
     __tablename__ = 'player_appearances'
@@ -86,18 +107,34 @@ class PlayerAppearance(Base):
     match_id = Column(Integer, ForeignKey('matches.id', ondelete='CASCADE'), nullable=False)
     team_id = Column(Integer, ForeignKey('teams.id', ondelete='CASCADE'), nullable=False)
     jersey_number = Column(Integer)
+    position = Column(String(50))
     stats = Column(JSONB)
 
     player = relationship('Player', back_populates='appearances')
     match = relationship('Match', back_populates='appearances')
     team = relationship('Team', back_populates='appearances')
 
+    __table_args__ = (
+        UniqueConstraint('match_id', 'player_id', name='player_appearances_match_player_key'),
+        Index('idx_player_appearances_match_team', 'match_id', 'team_id'),
+        Index('idx_player_appearances_player', 'player_id'),
+    )
+
 
 class EventType(Base):
     __tablename__ = 'event_types'
     id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False, unique=True)
     description = Column(Text)
+    # filled in from the name by the classify_event_type trigger
+    points = Column(SmallInteger, nullable=False, server_default='0')
+    is_try = Column(Boolean, nullable=False, server_default='false')
+    is_error = Column(Boolean, nullable=False, server_default='false')
+    is_conversion_made = Column(Boolean, nullable=False, server_default='false')
+    is_conversion_missed = Column(Boolean, nullable=False, server_default='false')
+    is_penalty_conceded = Column(Boolean, nullable=False, server_default='false')
+    is_field_goal_made = Column(Boolean, nullable=False, server_default='false')
+    is_field_goal_missed = Column(Boolean, nullable=False, server_default='false')
 
     events = relationship('Event', back_populates='event_type')
 
@@ -113,7 +150,9 @@ class EventRole(Base):
 class Event(Base):
     __tablename__ = 'events'
 
-    id = Column(Integer, primary_key=True)
+    # partitioned by season, every key includes it
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    season = Column(Integer, primary_key=True)
     match_id = Column(Integer, ForeignKey('matches.id', ondelete='CASCADE'), nullable=False)
     team_id = Column(Integer, ForeignKey('teams.id', ondelete='CASCADE'))
     event_type_id = Column(Integer, ForeignKey('event_types.id', ondelete='CASCADE'), nullable=False)
@@ -122,6 +161,13 @@ class Event(Base):
     description = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        UniqueConstraint('match_id', 'event_type_id', 'game_time_sec', 'player_id', 'season',
+                         name='events_natural_key', postgresql_nulls_not_distinct=True),
+        Index('idx_events_created_at', 'created_at'),
+        {'postgresql_partition_by': 'LIST (season)'},
+    )
+
     match = relationship('Match', back_populates='events')
     team = relationship('Team', back_populates='events')
     event_type = relationship('EventType', back_populates='events')
@@ -131,14 +177,47 @@ class Event(Base):
 
 class EventPlayer(Base):
     __tablename__ = 'event_players'
-    event_id = Column(Integer, ForeignKey('events.id', ondelete='CASCADE'))
+    event_id = Column(Integer)
+    season = Column(Integer)
     player_id = Column(Integer, ForeignKey('players.id', ondelete='CASCADE'))
     role_id = Column(Integer, ForeignKey('event_roles.id', ondelete='CASCADE'), nullable=True)
 
     __table_args__ = (
-        PrimaryKeyConstraint('event_id', 'player_id'),
+        PrimaryKeyConstraint('event_id', 'player_id', 'season'),
+        ForeignKeyConstraint(['event_id', 'season'], ['events.id', 'events.season'], ondelete='CASCADE'),
+        {'postgresql_partition_by': 'LIST (season)'},
     )
 
     event = relationship('Event', back_populates='players')
     player = relationship('Player', back_populates='event_players')
     role = relationship('EventRole', back_populates='event_players')
+
+
+class ScrapeState(Base):
+    __tablename__ = 'scrape_state'
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)  # 'round' or 'match'
+    key = Column(String(512), nullable=False)  # '<comp>/<season>/<round>' or the match page path
+    status = Column(String(20), nullable=False)
+    content_hash = Column(String(64))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('kind', 'key'),
+    )
+
+
+class PlayerProfile(Base):
+    __tablename__ = 'player_profiles'
+    player_id = Column(Integer, ForeignKey('players.id', ondelete='CASCADE'), primary_key=True)
+    url = Column(String(512))
+    etag = Column(String(255))
+    last_modified = Column(String(64))  # sent back verbatim as If-Modified-Since
+    content_hash = Column(String(64))
+    status = Column(String(20))  # 'changed', 'unchanged' or 'missing' on the last check
+    checked_at = Column(DateTime(timezone=True))
+    changed_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index('idx_player_profiles_checked_at', 'checked_at'),
+    )
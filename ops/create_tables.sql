@@ -4,10 +4,17 @@ CREATE TABLE teams (
     name VARCHAR(255) NOT NULL UNIQUE
 );
 
+-- Versions from ops/migrations already reflected in this schema
+CREATE TABLE schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+INSERT INTO schema_migrations (version) VALUES ('001_lookup_indexes'), ('002_events_created_at_index'), ('002a_scrape_state'), ('002b_match_stats'), ('003_season_partitions'), ('003a_unique_match_season'), ('004_player_profiles'), ('005_player_appearances');
+
 -- Players
 CREATE TABLE players (
     id SERIAL PRIMARY KEY,
-    name VARCHAR(255) NOT NULL,
+    name VARCHAR(255) NOT NULL UNIQUE,
     positions TEXT[],
     date_of_birth DATE,
     height INT,
@@ -23,6 +30,8 @@ CREATE TABLE players (
 -- Matches
 CREATE TABLE matches (
     id SERIAL PRIMARY KEY,
+    competition_id INT NOT NULL,
+    season INT NOT NULL,
     round INT NOT NULL,
     date TIMESTAMP WITH TIME ZONE,
     venue VARCHAR(255),
@@ -36,67 +45,166 @@ CREATE TABLE matches (
 );
 
 -- Team Membership (player-team history)
-CREATE TABLE team_membership (
+-- derived from player_appearances by utils/db.py refresh_team_memberships
+CREATE TABLE team_memberships (
     id SERIAL PRIMARY KEY,
     player_id INT NOT NULL REFERENCES players(id),
     team_id INT NOT NULL REFERENCES teams(id),
     start_date DATE NOT NULL,
-    end_date DATE
+    end_date DATE,
+    CONSTRAINT team_memberships_player_team_start_key UNIQUE (player_id, team_id, start_date)
 );
 
 -- Player Appearance in Matches
-CREATE TABLE player_appearance (
+-- one row per player named in a match's team lists, stats holds their row of
+-- the match centre's player stats table
+CREATE TABLE player_appearances (
     id SERIAL PRIMARY KEY,
     player_id INT NOT NULL REFERENCES players(id),
     match_id INT NOT NULL REFERENCES matches(id),
     team_id INT NOT NULL REFERENCES teams(id),
     jersey_number INT,
-    stats JSONB
+    position VARCHAR(50),
+    stats JSONB,
+    CONSTRAINT player_appearances_match_player_key UNIQUE (match_id, player_id)
 );
 
 -- Event Types Lookup Table
+-- points and the is_* flags say how each event type counts towards the
+-- stats tables, so aggregation never has to string match event names
 CREATE TABLE event_types (
     id SERIAL PRIMARY KEY,
     name VARCHAR(100) UNIQUE NOT NULL,
-    description TEXT
+    description TEXT,
+    points SMALLINT NOT NULL DEFAULT 0,
+    is_try BOOLEAN NOT NULL DEFAULT false,
+    is_error BOOLEAN NOT NULL DEFAULT false,
+    is_conversion_made BOOLEAN NOT NULL DEFAULT false,
+    is_conversion_missed BOOLEAN NOT NULL DEFAULT false,
+    is_penalty_conceded BOOLEAN NOT NULL DEFAULT false,
+    is_field_goal_made BOOLEAN NOT NULL DEFAULT false,
+    is_field_goal_missed BOOLEAN NOT NULL DEFAULT false
 );
 
+-- Classify event types by name once, when they are first inserted
+CREATE OR REPLACE FUNCTION classify_event_type() RETURNS trigger AS $$
+DECLARE
+    n TEXT := LOWER(NEW.name);
+BEGIN
+    NEW.points := CASE
+        WHEN n LIKE '%try' THEN 4
+        WHEN n = 'conversion-made' THEN 2
+        WHEN n = 'penalty shot-made' THEN 2
+        WHEN n = '1 point field goal-made' THEN 1
+        WHEN n = '2 point field goal-made' THEN 2
+        ELSE 0
+    END;
+    NEW.is_try := n = 'try';
+    NEW.is_error := n LIKE '%error%';
+    NEW.is_conversion_made := n = 'conversion-made';
+    NEW.is_conversion_missed := n = 'conversion-missed';
+    NEW.is_penalty_conceded := n LIKE 'penalty - %';
+    NEW.is_field_goal_made := n LIKE '%field goal-made';
+    NEW.is_field_goal_missed := n LIKE '%field goal-missed';
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER event_types_classify
+BEFORE INSERT OR UPDATE OF name ON event_types
+FOR EACH ROW EXECUTE FUNCTION classify_event_type();
+
 -- Roles Lookup Table for event_players.role
 CREATE TABLE event_roles (
     id SERIAL PRIMARY KEY,
     role_name VARCHAR(50) UNIQUE
 );
 
--- Events Table
+-- Events Table, partitioned by the season of its match. Keys include the
+-- season, as Postgres requires of a partitioned table, and queries filtering
+-- on it only read that season's partition
+CREATE SEQUENCE events_id_seq;
 CREATE TABLE events (
-    id SERIAL PRIMARY KEY,
+    id INT NOT NULL DEFAULT nextval('events_id_seq'),
+    season INT NOT NULL,
     match_id INT NOT NULL REFERENCES matches(id),
     team_id INT REFERENCES teams(id),
     player_id INT REFERENCES players(id),
     event_type_id INT NOT NULL REFERENCES event_types(id),
     game_time_sec INT NOT NULL,
     description TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
-);
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    PRIMARY KEY (id, season),
+    CONSTRAINT events_natural_key UNIQUE NULLS NOT DISTINCT (match_id, event_type_id, game_time_sec, player_id, season)
+) PARTITION BY LIST (season);
+ALTER SEQUENCE events_id_seq OWNED BY events.id;
 
--- Junction table for players involved in events (many-to-many)
+-- Junction table for players involved in events (many-to-many), partitioned like events
 CREATE TABLE event_players (
-    event_id INT NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    event_id INT NOT NULL,
+    season INT NOT NULL,
     player_id INT NOT NULL REFERENCES players(id),
     role_id INT REFERENCES event_roles(id),
-    PRIMARY KEY (event_id, player_id)
+    PRIMARY KEY (event_id, player_id, season),
+    FOREIGN KEY (event_id, season) REFERENCES events(id, season) ON DELETE CASCADE
+) PARTITION BY LIST (season);
+
+-- Create a season's events and event_players partitions (events_2025,
+-- event_players_2025) if they don't exist yet. A season can be re-scraped
+-- from scratch by truncating or detaching its partitions.
+CREATE OR REPLACE FUNCTION ensure_season_partitions(p_season INT) RETURNS void AS $$
+BEGIN
+    -- serialise concurrent callers, the second then finds the tables there
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_season_partitions'));
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF events FOR VALUES IN (%s)',
+                   'events_' || p_season, p_season);
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF event_players FOR VALUES IN (%s)',
+                   'event_players_' || p_season, p_season);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Progress of the scraper per round and per match page, lets runs skip
+-- finished work and resume after a crash
+CREATE TABLE scrape_state (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    key VARCHAR(512) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    content_hash VARCHAR(64),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    UNIQUE (kind, key)
+);
+
+-- Where each player's profile page is and the validators it was last
+-- fetched with, so enrichment only re-downloads profiles that changed
+CREATE TABLE player_profiles (
+    player_id INT PRIMARY KEY REFERENCES players(id) ON DELETE CASCADE,
+    url VARCHAR(512),
+    etag VARCHAR(255),
+    last_modified VARCHAR(64),
+    content_hash VARCHAR(64),
+    status VARCHAR(20),
+    checked_at TIMESTAMP WITH TIME ZONE,
+    changed_at TIMESTAMP WITH TIME ZONE
 );
 
 -- Indexes to speed up common queries
+CREATE INDEX idx_player_profiles_checked_at ON player_profiles(checked_at);
 CREATE INDEX idx_events_match_time ON events(match_id, game_time_sec);
-CREATE INDEX idx_player_appearance_match_team ON player_appearance(match_id, team_id);
-CREATE INDEX idx_team_membership_player ON team_membership(player_id);
+CREATE INDEX idx_events_created_at ON events(created_at);
+CREATE INDEX idx_player_appearances_match_team ON player_appearances(match_id, team_id);
+CREATE INDEX idx_player_appearances_player ON player_appearances(player_id);
+CREATE INDEX idx_team_memberships_player ON team_memberships(player_id);
+CREATE UNIQUE INDEX idx_matches_date_teams ON matches(date, home_team_id, away_team_id) WHERE date IS NOT NULL;
+CREATE INDEX idx_matches_round_teams ON matches(round, home_team_id, away_team_id);
+CREATE UNIQUE INDEX idx_matches_bye ON matches(competition_id, season, round, home_team_id) WHERE away_team_id IS NULL;
+CREATE INDEX idx_matches_season_round ON matches(season, round);
 
 
 
 ALTER TABLE matches
 ADD CONSTRAINT unique_match
-  UNIQUE NULLS NOT DISTINCT (round, away_team_id, date, venue, home_team_id, score_home, score_away);
+  UNIQUE NULLS NOT DISTINCT (competition_id, season, round, away_team_id, date, venue, home_team_id, score_home, score_away);
 
 -- basic matches
 CREATE OR REPLACE VIEW match_summaries AS
@@ -107,84 +215,13 @@ SELECT
     at.name as away_team,
     m.score_away,
     m.venue,
-    m.round
+    m.round,
+    m.season,
+    m.competition_id
 FROM matches m
 LEFT JOIN teams ht ON m.home_team_id = ht.id
 LEFT JOIN teams AT ON m.away_team_id = at.id;
 
--- Create the ladder view
-CREATE OR REPLACE VIEW ladder AS
-WITH 
-wins AS (
-  SELECT home_team AS team, 2 AS pts, score_home as team_for, score_away as team_against, 'win' as home_match_status
-  FROM match_summaries
-  WHERE away_team IS NOT NULL AND score_home > score_away
-
-  UNION ALL
-
-  SELECT away_team AS team, 2 AS pts, score_away as team_for, score_home as team_against, 'win' as home_match_status
-  FROM match_summaries
-  WHERE away_team IS NOT NULL AND score_away > score_home
-),
-losses AS (
-  SELECT away_team AS team, 0 AS pts, score_away as team_for, score_home as team_against, 'loss' as home_match_status
-  FROM match_summaries
-  WHERE away_team IS NOT NULL AND score_away < score_home
-
-  UNION ALL
-
-  SELECT home_team AS team, 0 AS pts, score_home as team_for, score_away as team_against, 'loss' as home_match_status
-  FROM match_summaries
-  WHERE away_team IS NOT NULL AND score_home < score_away
-),
-draws AS (
-  SELECT home_team AS team, 1 AS pts, score_home as team_for, score_away as team_against, 'draw' as home_match_status
-  FROM match_summaries
-  WHERE away_team IS NOT NULL AND score_home = score_away
-
-  UNION ALL
-
-  SELECT away_team AS team, 1 AS pts, score_away as team_for, score_home as team_against, 'draw' as home_match_status
-  FROM match_summaries
-  WHERE away_team IS NOT NULL AND score_home = score_away
-),
-byes AS (
-  SELECT home_team AS team, 2 AS pts, 0 AS team_for, 0 AS team_against, 'bye' as home_match_status
-  FROM match_summaries
-  WHERE away_team IS NULL
-),
-combined AS (
-  SELECT * FROM wins
-  UNION ALL
-  SELECT * FROM byes
-  UNION ALL
-  SELECT * FROM losses
-  UNION ALL
-  SELECT * FROM draws
-),
-team_stats AS (
-  SELECT 
-    team,
-    COUNT(*) FILTER (WHERE home_match_status IN ('win', 'loss', 'draw')) AS games_played,
-    SUM(CASE WHEN home_match_status = 'win'  THEN 1 ELSE 0 END) AS wins,
-    SUM(CASE WHEN home_match_status = 'loss' THEN 1 ELSE 0 END) AS losses,
-    SUM(CASE WHEN home_match_status = 'draw' THEN 1 ELSE 0 END) AS draws,
-    SUM(CASE WHEN home_match_status = 'bye'  THEN 1 ELSE 0 END) AS byes,
-    SUM(team_for)                   AS points_for,
-    SUM(team_against)              AS points_against,
-    SUM(team_for) - SUM(team_against) AS points_diff,
-    SUM(pts)                        AS total_points
-  FROM combined
-  GROUP BY team
-)
-SELECT 
-  RANK() OVER (
-    ORDER BY total_points DESC, points_diff DESC, points_for DESC
-  ) AS ladder_position,
-  *
-FROM team_stats
-ORDER BY ladder_position;
-
 --  Join in team, player, and event type names
 CREATE OR REPLACE VIEW basic_events AS
 SELECT 
@@ -194,57 +231,194 @@ SELECT
     e.description,
     m.round,
     m.id AS match_id,
-    e.team_id AS team_id
+    e.team_id AS team_id,
+    e.season
 FROM events e
 INNER JOIN event_types et ON et.id = e.event_type_id
 LEFT JOIN players p ON p.id = e.player_id
 INNER JOIN matches m ON m.id = e.match_id;
 
+-- Per match summary tables behind the ladder, team_stats and player_stats
+-- views. The scraper refreshes a match's rows with refresh_match_stats()
+-- after ingesting it, so the views never rescan matches or events.
+
+-- One row per team per match: the result as it counts on the ladder
+CREATE TABLE match_results (
+    match_id INT NOT NULL REFERENCES matches(id) ON DELETE CASCADE,
+    team_id INT NOT NULL REFERENCES teams(id),
+    season INT NOT NULL,
+    round INT NOT NULL,
+    status VARCHAR(4) NOT NULL, -- win, loss, draw or bye
+    pts INT NOT NULL,
+    points_for INT NOT NULL,
+    points_against INT NOT NULL,
+    PRIMARY KEY (match_id, team_id)
+);
+
+-- Event totals per team per match
+CREATE TABLE match_team_stats (
+    match_id INT NOT NULL REFERENCES matches(id) ON DELETE CASCADE,
+    team_id INT NOT NULL REFERENCES teams(id),
+    season INT NOT NULL,
+    round INT NOT NULL,
+    total_points INT NOT NULL,
+    tries INT NOT NULL,
+    errors INT NOT NULL,
+    conversions_kicked INT NOT NULL,
+    conversions_missed INT NOT NULL,
+    penalty_conceeded INT NOT NULL,
+    field_goals INT NOT NULL,
+    field_goals_missed INT NOT NULL,
+    PRIMARY KEY (match_id, team_id)
+);
+
+-- Event totals per player per match, player_id is NULL for events without a player
+CREATE TABLE match_player_stats (
+    match_id INT NOT NULL REFERENCES matches(id) ON DELETE CASCADE,
+    player_id INT REFERENCES players(id),
+    season INT NOT NULL,
+    round INT NOT NULL,
+    total_points INT NOT NULL,
+    tries INT NOT NULL,
+    errors INT NOT NULL,
+    penalty_conceeded INT NOT NULL,
+    UNIQUE NULLS NOT DISTINCT (match_id, player_id)
+);
+
+CREATE INDEX idx_match_results_season_round ON match_results(season, round);
+CREATE INDEX idx_match_team_stats_season_round ON match_team_stats(season, round);
+CREATE INDEX idx_match_player_stats_season_round ON match_player_stats(season, round);
+
+CREATE OR REPLACE FUNCTION refresh_match_stats(p_match_id INT) RETURNS void AS $$
+DECLARE
+    -- the season column of every summary row, and the events partition to read
+    match_season INT := (SELECT season FROM matches WHERE id = p_match_id);
+BEGIN
+    DELETE FROM match_results WHERE match_id = p_match_id;
+    DELETE FROM match_team_stats WHERE match_id = p_match_id;
+    DELETE FROM match_player_stats WHERE match_id = p_match_id;
+
+    INSERT INTO match_results (match_id, team_id, season, round, status, pts, points_for, points_against)
+    SELECT id, team_id, match_season, round, status,
+           CASE status WHEN 'win' THEN 2 WHEN 'bye' THEN 2 WHEN 'draw' THEN 1 ELSE 0 END,
+           points_for, points_against
+    FROM (
+        SELECT m.id, m.round, m.home_team_id AS team_id,
+               CASE
+                 WHEN m.away_team_id IS NULL THEN 'bye'
+                 WHEN m.score_home > m.score_away THEN 'win'
+                 WHEN m.score_home < m.score_away THEN 'loss'
+                 WHEN m.score_home = m.score_away THEN 'draw'
+               END AS status,
+               CASE WHEN m.away_team_id IS NULL THEN 0 ELSE m.score_home END AS points_for,
+               CASE WHEN m.away_team_id IS NULL THEN 0 ELSE m.score_away END AS points_against
+        FROM matches m
+        WHERE m.id = p_match_id
+
+        UNION ALL
+
+        SELECT m.id, m.round, m.away_team_id,
+               CASE
+                 WHEN m.score_away > m.score_home THEN 'win'
+                 WHEN m.score_away < m.score_home THEN 'loss'
+                 WHEN m.score_away = m.score_home THEN 'draw'
+               END,
+               m.score_away, m.score_home
+        FROM matches m
+        WHERE m.id = p_match_id AND m.away_team_id IS NOT NULL
+    ) results
+    -- matches without scores yet don't count
+    WHERE status IS NOT NULL;
+
+    INSERT INTO match_team_stats
+    SELECT e.match_id, e.team_id, match_season, m.round,
+           SUM(et.points),
+           COUNT(*) FILTER (WHERE et.is_try),
+           COUNT(*) FILTER (WHERE et.is_error),
+           COUNT(*) FILTER (WHERE et.is_conversion_made),
+           COUNT(*) FILTER (WHERE et.is_conversion_missed),
+           COUNT(*) FILTER (WHERE et.is_penalty_conceded),
+           COUNT(*) FILTER (WHERE et.is_field_goal_made),
+           COUNT(*) FILTER (WHERE et.is_field_goal_missed)
+    FROM events e
+    INNER JOIN event_types et ON et.id = e.event_type_id
+    INNER JOIN matches m ON m.id = e.match_id
+    WHERE e.season = match_season AND e.match_id = p_match_id AND e.team_id IS NOT NULL
+    GROUP BY e.match_id, e.team_id, m.round;
+
+    INSERT INTO match_player_stats
+    SELECT e.match_id, e.player_id, match_season, m.round,
+           SUM(et.points),
+           COUNT(*) FILTER (WHERE et.is_try),
+           COUNT(*) FILTER (WHERE et.is_error),
+           COUNT(*) FILTER (WHERE et.is_penalty_conceded)
+    FROM events e
+    INNER JOIN event_types et ON et.id = e.event_type_id
+    INNER JOIN matches m ON m.id = e.match_id
+    WHERE e.season = match_season AND e.match_id = p_match_id
+    GROUP BY e.match_id, e.player_id, m.round;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create the ladder view, one ladder per season
+CREATE OR REPLACE VIEW ladder AS
+WITH team_stats AS (
+  SELECT
+    r.season,
+    t.name AS team,
+    COUNT(*) FILTER (WHERE r.status IN ('win', 'loss', 'draw')) AS games_played,
+    COUNT(*) FILTER (WHERE r.status = 'win') AS wins,
+    COUNT(*) FILTER (WHERE r.status = 'loss') AS losses,
+    COUNT(*) FILTER (WHERE r.status = 'draw') AS draws,
+    COUNT(*) FILTER (WHERE r.status = 'bye') AS byes,
+    SUM(r.points_for) AS points_for,
+    SUM(r.points_against) AS points_against,
+    SUM(r.points_for) - SUM(r.points_against) AS points_diff,
+    SUM(r.pts) AS total_points
+  FROM match_results r
+  INNER JOIN teams t ON t.id = r.team_id
+  GROUP BY r.season, t.name
+)
+SELECT
+  RANK() OVER (
+    PARTITION BY season
+    ORDER BY total_points DESC, points_diff DESC, points_for DESC
+  ) AS ladder_position,
+  *
+FROM team_stats
+ORDER BY season, ladder_position;
+
 -- team stats like total points, tries, errors, etc.
 CREATE OR REPLACE VIEW team_stats AS
 SELECT
+    s.season,
     t.name AS team,
-    -- total points scored
-    SUM(CASE
-      WHEN LOWER(be.event) LIKE '%try' THEN 4
-      WHEN LOWER(be.event) = 'conversion-made' THEN 2
-      WHEN LOWER(be.event) LIKE 'penalty shot-made' THEN 2
-      WHEN LOWER(be.event) LIKE '1 point field goal-made' THEN 1
-      WHEN LOWER(be.event) LIKE '2 point field goal-made' THEN 2
-      ELSE 0 
-    END) AS total_points,
-    SUM(CASE WHEN LOWER(be.event) = 'try' THEN 1 ELSE 0 END) AS tries,
-    SUM(CASE WHEN LOWER(be.event) LIKE '%error%' THEN 1 ELSE 0 END) AS errors,
-    SUM(CASE WHEN LOWER(be.event) = 'conversion-made' THEN 1 ELSE 0 END) AS conversions_kicked,
-    SUM(CASE WHEN LOWER(be.event) = 'conversion-missed' THEN 1 ELSE 0 END) AS conversions_missed,
-    SUM(CASE WHEN LOWER(be.event) LIKE 'penalty - %'  THEN 1 ELSE 0 END) AS penalty_conceeded,
-    SUM(CASE WHEN LOWER(be.event) LIKE '%field goal-made'  THEN 1 ELSE 0 END) AS field_goals,
-    SUM(CASE WHEN LOWER(be.event) LIKE '%field goal-missed' THEN 1 ELSE 0 END) AS field_goals_missed,
-    COUNT(DISTINCT m.id) AS matches_played
-FROM basic_events be
-INNER JOIN matches m ON m.id = be.match_id
-INNER JOIN teams t ON t.id = be.team_id
-GROUP BY t.name;
+    SUM(s.total_points) AS total_points,
+    SUM(s.tries) AS tries,
+    SUM(s.errors) AS errors,
+    SUM(s.conversions_kicked) AS conversions_kicked,
+    SUM(s.conversions_missed) AS conversions_missed,
+    SUM(s.penalty_conceeded) AS penalty_conceeded,
+    SUM(s.field_goals) AS field_goals,
+    SUM(s.field_goals_missed) AS field_goals_missed,
+    COUNT(DISTINCT s.match_id) AS matches_played
+FROM match_team_stats s
+INNER JOIN teams t ON t.id = s.team_id
+GROUP BY s.season, t.name;
 
 -- Create the player stats view
 CREATE OR REPLACE VIEW player_stats AS
 SELECT
-    be.player,
-    SUM(CASE
-      WHEN LOWER(be.event) LIKE '%try' THEN 4
-      WHEN LOWER(be.event) = 'conversion-made' THEN 2
-      WHEN LOWER(be.event) LIKE 'penalty shot-made' THEN 2
-      WHEN LOWER(be.event) LIKE '1 point field goal-made' THEN 1
-      WHEN LOWER(be.event) LIKE '2 point field goal-made' THEN 2
-      ELSE 0
-    END) AS total_points,
-    SUM(CASE WHEN LOWER(be.event) = 'try' THEN 1 ELSE 0 END) AS tries,
-    SUM(CASE WHEN LOWER(be.event) LIKE '%error%' THEN 1 ELSE 0 END) AS errors,
-    SUM(CASE WHEN LOWER(be.event) LIKE 'penalty - %'  THEN 1 ELSE 0 END) AS penalty_conceeded,
-    COUNT(DISTINCT m.id) AS matches_played
-FROM basic_events be
-INNER JOIN matches m ON m.id = be.match_id
-GROUP BY be.player
+    s.season,
+    p.name AS player,
+    SUM(s.total_points) AS total_points,
+    SUM(s.tries) AS tries,
+    SUM(s.errors) AS errors,
+    SUM(s.penalty_conceeded) AS penalty_conceeded,
+    COUNT(DISTINCT s.match_id) AS matches_played
+FROM match_player_stats s
+LEFT JOIN players p ON p.id = s.player_id
+GROUP BY s.season, p.name
 ORDER BY total_points DESC, tries DESC, errors ASC, penalty_conceeded ASC;
 
 -- copy production to a test database
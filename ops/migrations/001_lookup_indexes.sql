@@ -0,0 +1,39 @@
+-- Indexes and natural key constraints behind the lookups in utils/db.py, so
+-- get_or_create_* can upsert with ON CONFLICT instead of SELECT then INSERT.
+-- Existing duplicates are merged into the lowest id first.
+
+-- players.name: repoint references to the surviving row, then drop the rest
+CREATE TEMP TABLE player_dupes AS
+SELECT id, MIN(id) OVER (PARTITION BY name) AS keep_id
+FROM players;
+DELETE FROM player_dupes WHERE id = keep_id;
+
+DELETE FROM event_players ep
+USING player_dupes d
+WHERE ep.player_id = d.id
+  AND EXISTS (SELECT 1 FROM event_players k WHERE k.event_id = ep.event_id AND k.player_id = d.keep_id);
+UPDATE event_players ep SET player_id = d.keep_id FROM player_dupes d WHERE ep.player_id = d.id;
+UPDATE events e SET player_id = d.keep_id FROM player_dupes d WHERE e.player_id = d.id;
+UPDATE player_appearance pa SET player_id = d.keep_id FROM player_dupes d WHERE pa.player_id = d.id;
+UPDATE team_membership tm SET player_id = d.keep_id FROM player_dupes d WHERE tm.player_id = d.id;
+DELETE FROM players p USING player_dupes d WHERE p.id = d.id;
+
+ALTER TABLE players ADD CONSTRAINT players_name_key UNIQUE (name);
+
+-- events: the key get_or_create_event deduplicates on
+DELETE FROM events e
+USING events k
+WHERE e.match_id = k.match_id
+  AND e.event_type_id = k.event_type_id
+  AND e.game_time_sec = k.game_time_sec
+  AND e.player_id IS NOT DISTINCT FROM k.player_id
+  AND e.id > k.id;
+
+ALTER TABLE events ADD CONSTRAINT events_natural_key
+  UNIQUE NULLS NOT DISTINCT (match_id, event_type_id, game_time_sec, player_id);
+
+-- matches: get_or_create_match looks up (date, home, away) and
+-- create_bye_match (round, home, away). Byes have no date, and a season
+-- column would be needed before (round, home) could be unique for them.
+CREATE UNIQUE INDEX idx_matches_date_teams ON matches(date, home_team_id, away_team_id) WHERE date IS NOT NULL;
+CREATE INDEX idx_matches_round_teams ON matches(round, home_team_id, away_team_id);
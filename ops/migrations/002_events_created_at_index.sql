@@ -0,0 +1,3 @@
+-- events: the incremental Parquet export (export.py) reads rows added since
+-- its last run by created_at
+CREATE INDEX IF NOT EXISTS idx_events_created_at ON events(created_at);
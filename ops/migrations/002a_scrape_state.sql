@@ -0,0 +1,11 @@
+-- scrape_state: the scraper's progress per round and per match page, read
+-- by utils/state.py to skip finished work and resume after a crash
+CREATE TABLE IF NOT EXISTS scrape_state (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    key VARCHAR(512) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    content_hash VARCHAR(64),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    UNIQUE (kind, key)
+);
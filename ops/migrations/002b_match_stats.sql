@@ -0,0 +1,238 @@
+-- event_types classified by points and is_* flags, the per match summary
+-- tables behind the ladder, team_stats and player_stats views, and
+-- refresh_match_stats() to rebuild one match's rows.
+
+-- event_types: points and the is_* flags, set from the name by a trigger
+ALTER TABLE event_types
+    ADD COLUMN points SMALLINT NOT NULL DEFAULT 0,
+    ADD COLUMN is_try BOOLEAN NOT NULL DEFAULT false,
+    ADD COLUMN is_error BOOLEAN NOT NULL DEFAULT false,
+    ADD COLUMN is_conversion_made BOOLEAN NOT NULL DEFAULT false,
+    ADD COLUMN is_conversion_missed BOOLEAN NOT NULL DEFAULT false,
+    ADD COLUMN is_penalty_conceded BOOLEAN NOT NULL DEFAULT false,
+    ADD COLUMN is_field_goal_made BOOLEAN NOT NULL DEFAULT false,
+    ADD COLUMN is_field_goal_missed BOOLEAN NOT NULL DEFAULT false;
+
+CREATE OR REPLACE FUNCTION classify_event_type() RETURNS trigger AS $$
+DECLARE
+    n TEXT := LOWER(NEW.name);
+BEGIN
+    NEW.points := CASE
+        WHEN n LIKE '%try' THEN 4
+        WHEN n = 'conversion-made' THEN 2
+        WHEN n = 'penalty shot-made' THEN 2
+        WHEN n = '1 point field goal-made' THEN 1
+        WHEN n = '2 point field goal-made' THEN 2
+        ELSE 0
+    END;
+    NEW.is_try := n = 'try';
+    NEW.is_error := n LIKE '%error%';
+    NEW.is_conversion_made := n = 'conversion-made';
+    NEW.is_conversion_missed := n = 'conversion-missed';
+    NEW.is_penalty_conceded := n LIKE 'penalty - %';
+    NEW.is_field_goal_made := n LIKE '%field goal-made';
+    NEW.is_field_goal_missed := n LIKE '%field goal-missed';
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER event_types_classify
+BEFORE INSERT OR UPDATE OF name ON event_types
+FOR EACH ROW EXECUTE FUNCTION classify_event_type();
+
+-- classify the event types already there
+UPDATE event_types SET name = name;
+
+-- One row per team per match: the result as it counts on the ladder
+CREATE TABLE match_results (
+    match_id INT NOT NULL REFERENCES matches(id) ON DELETE CASCADE,
+    team_id INT NOT NULL REFERENCES teams(id),
+    season INT NOT NULL,
+    round INT NOT NULL,
+    status VARCHAR(4) NOT NULL, -- win, loss, draw or bye
+    pts INT NOT NULL,
+    points_for INT NOT NULL,
+    points_against INT NOT NULL,
+    PRIMARY KEY (match_id, team_id)
+);
+
+-- Event totals per team per match
+CREATE TABLE match_team_stats (
+    match_id INT NOT NULL REFERENCES matches(id) ON DELETE CASCADE,
+    team_id INT NOT NULL REFERENCES teams(id),
+    season INT NOT NULL,
+    round INT NOT NULL,
+    total_points INT NOT NULL,
+    tries INT NOT NULL,
+    errors INT NOT NULL,
+    conversions_kicked INT NOT NULL,
+    conversions_missed INT NOT NULL,
+    penalty_conceeded INT NOT NULL,
+    field_goals INT NOT NULL,
+    field_goals_missed INT NOT NULL,
+    PRIMARY KEY (match_id, team_id)
+);
+
+-- Event totals per player per match, player_id is NULL for events without a player
+CREATE TABLE match_player_stats (
+    match_id INT NOT NULL REFERENCES matches(id) ON DELETE CASCADE,
+    player_id INT REFERENCES players(id),
+    season INT NOT NULL,
+    round INT NOT NULL,
+    total_points INT NOT NULL,
+    tries INT NOT NULL,
+    errors INT NOT NULL,
+    penalty_conceeded INT NOT NULL,
+    UNIQUE NULLS NOT DISTINCT (match_id, player_id)
+);
+
+CREATE INDEX idx_match_results_season_round ON match_results(season, round);
+CREATE INDEX idx_match_team_stats_season_round ON match_team_stats(season, round);
+CREATE INDEX idx_match_player_stats_season_round ON match_player_stats(season, round);
+
+CREATE OR REPLACE FUNCTION refresh_match_stats(p_match_id INT, p_season INT) RETURNS void AS $$
+BEGIN
+    DELETE FROM match_results WHERE match_id = p_match_id;
+    DELETE FROM match_team_stats WHERE match_id = p_match_id;
+    DELETE FROM match_player_stats WHERE match_id = p_match_id;
+
+    INSERT INTO match_results (match_id, team_id, season, round, status, pts, points_for, points_against)
+    SELECT id, team_id, p_season, round, status,
+           CASE status WHEN 'win' THEN 2 WHEN 'bye' THEN 2 WHEN 'draw' THEN 1 ELSE 0 END,
+           points_for, points_against
+    FROM (
+        SELECT m.id, m.round, m.home_team_id AS team_id,
+               CASE
+                 WHEN m.away_team_id IS NULL THEN 'bye'
+                 WHEN m.score_home > m.score_away THEN 'win'
+                 WHEN m.score_home < m.score_away THEN 'loss'
+                 WHEN m.score_home = m.score_away THEN 'draw'
+               END AS status,
+               CASE WHEN m.away_team_id IS NULL THEN 0 ELSE m.score_home END AS points_for,
+               CASE WHEN m.away_team_id IS NULL THEN 0 ELSE m.score_away END AS points_against
+        FROM matches m
+        WHERE m.id = p_match_id
+
+        UNION ALL
+
+        SELECT m.id, m.round, m.away_team_id,
+               CASE
+                 WHEN m.score_away > m.score_home THEN 'win'
+                 WHEN m.score_away < m.score_home THEN 'loss'
+                 WHEN m.score_away = m.score_home THEN 'draw'
+               END,
+               m.score_away, m.score_home
+        FROM matches m
+        WHERE m.id = p_match_id AND m.away_team_id IS NOT NULL
+    ) results
+    -- matches without scores yet don't count
+    WHERE status IS NOT NULL;
+
+    INSERT INTO match_team_stats
+    SELECT e.match_id, e.team_id, p_season, m.round,
+           SUM(et.points),
+           COUNT(*) FILTER (WHERE et.is_try),
+           COUNT(*) FILTER (WHERE et.is_error),
+           COUNT(*) FILTER (WHERE et.is_conversion_made),
+           COUNT(*) FILTER (WHERE et.is_conversion_missed),
+           COUNT(*) FILTER (WHERE et.is_penalty_conceded),
+           COUNT(*) FILTER (WHERE et.is_field_goal_made),
+           COUNT(*) FILTER (WHERE et.is_field_goal_missed)
+    FROM events e
+    INNER JOIN event_types et ON et.id = e.event_type_id
+    INNER JOIN matches m ON m.id = e.match_id
+    WHERE e.match_id = p_match_id AND e.team_id IS NOT NULL
+    GROUP BY e.match_id, e.team_id, m.round;
+
+    INSERT INTO match_player_stats
+    SELECT e.match_id, e.player_id, p_season, m.round,
+           SUM(et.points),
+           COUNT(*) FILTER (WHERE et.is_try),
+           COUNT(*) FILTER (WHERE et.is_error),
+           COUNT(*) FILTER (WHERE et.is_penalty_conceded)
+    FROM events e
+    INNER JOIN event_types et ON et.id = e.event_type_id
+    INNER JOIN matches m ON m.id = e.match_id
+    WHERE e.match_id = p_match_id
+    GROUP BY e.match_id, e.player_id, m.round;
+END;
+$$ LANGUAGE plpgsql;
+
+-- the views change columns, so they are dropped rather than replaced. The
+-- old team_stats and player_stats also held basic_events in place.
+DROP VIEW IF EXISTS ladder;
+DROP VIEW IF EXISTS team_stats;
+DROP VIEW IF EXISTS player_stats;
+
+-- Create the ladder view, one ladder per season
+CREATE OR REPLACE VIEW ladder AS
+WITH team_stats AS (
+  SELECT
+    r.season,
+    t.name AS team,
+    COUNT(*) FILTER (WHERE r.status IN ('win', 'loss', 'draw')) AS games_played,
+    COUNT(*) FILTER (WHERE r.status = 'win') AS wins,
+    COUNT(*) FILTER (WHERE r.status = 'loss') AS losses,
+    COUNT(*) FILTER (WHERE r.status = 'draw') AS draws,
+    COUNT(*) FILTER (WHERE r.status = 'bye') AS byes,
+    SUM(r.points_for) AS points_for,
+    SUM(r.points_against) AS points_against,
+    SUM(r.points_for) - SUM(r.points_against) AS points_diff,
+    SUM(r.pts) AS total_points
+  FROM match_results r
+  INNER JOIN teams t ON t.id = r.team_id
+  GROUP BY r.season, t.name
+)
+SELECT
+  RANK() OVER (
+    PARTITION BY season
+    ORDER BY total_points DESC, points_diff DESC, points_for DESC
+  ) AS ladder_position,
+  *
+FROM team_stats
+ORDER BY season, ladder_position;
+
+-- team stats like total points, tries, errors, etc.
+CREATE OR REPLACE VIEW team_stats AS
+SELECT
+    s.season,
+    t.name AS team,
+    SUM(s.total_points) AS total_points,
+    SUM(s.tries) AS tries,
+    SUM(s.errors) AS errors,
+    SUM(s.conversions_kicked) AS conversions_kicked,
+    SUM(s.conversions_missed) AS conversions_missed,
+    SUM(s.penalty_conceeded) AS penalty_conceeded,
+    SUM(s.field_goals) AS field_goals,
+    SUM(s.field_goals_missed) AS field_goals_missed,
+    COUNT(DISTINCT s.match_id) AS matches_played
+FROM match_team_stats s
+INNER JOIN teams t ON t.id = s.team_id
+GROUP BY s.season, t.name;
+
+-- Create the player stats view
+CREATE OR REPLACE VIEW player_stats AS
+SELECT
+    s.season,
+    p.name AS player,
+    SUM(s.total_points) AS total_points,
+    SUM(s.tries) AS tries,
+    SUM(s.errors) AS errors,
+    SUM(s.penalty_conceeded) AS penalty_conceeded,
+    COUNT(DISTINCT s.match_id) AS matches_played
+FROM match_player_stats s
+LEFT JOIN players p ON p.id = s.player_id
+GROUP BY s.season, p.name
+ORDER BY total_points DESC, tries DESC, errors ASC, penalty_conceeded ASC;
+
+-- fill the summary tables. Matches have no season column yet: take the year
+-- of the match date, and for byes, which have no date, the season of the
+-- match saved after (or else before) them in the same round.
+SELECT refresh_match_stats(m.id, COALESCE(
+    EXTRACT(YEAR FROM m.date)::INT,
+    (SELECT EXTRACT(YEAR FROM n.date)::INT FROM matches n
+     WHERE n.id > m.id AND n.round = m.round AND n.date IS NOT NULL ORDER BY n.id LIMIT 1),
+    (SELECT EXTRACT(YEAR FROM n.date)::INT FROM matches n WHERE n.id < m.id AND n.date IS NOT NULL ORDER BY n.id DESC LIMIT 1),
+    EXTRACT(YEAR FROM now())::INT
+))
+FROM matches m;
@@ -0,0 +1,214 @@
+-- Season and competition stored on matches, and events / event_players
+-- partitioned by season so per-season queries only read one partition.
+
+-- matches: store the season and competition each match was scraped for,
+-- byes had no date and so no season at all
+
+ALTER TABLE matches ADD COLUMN competition_id INT, ADD COLUMN season INT;
+
+UPDATE matches m SET season = r.season
+FROM (SELECT DISTINCT match_id, season FROM match_results) r
+WHERE r.match_id = m.id;
+
+UPDATE matches SET season = EXTRACT(YEAR FROM date)::INT WHERE season IS NULL AND date IS NOT NULL;
+
+-- byes are saved with their round's draw page, take the season of a match of
+-- the same round created right after (or else before) the bye
+UPDATE matches m SET season = COALESCE(
+    (SELECT n.season FROM matches n
+     WHERE n.id > m.id AND n.round = m.round AND n.season IS NOT NULL ORDER BY n.id LIMIT 1),
+    (SELECT n.season FROM matches n WHERE n.id < m.id AND n.season IS NOT NULL ORDER BY n.id DESC LIMIT 1),
+    EXTRACT(YEAR FROM now())::INT
+)
+WHERE season IS NULL;
+
+-- main.py defaults to the NRL premiership (111), which is all earlier
+-- versions recorded nothing else about
+UPDATE matches SET competition_id = 111;
+
+ALTER TABLE matches ALTER COLUMN competition_id SET NOT NULL, ALTER COLUMN season SET NOT NULL;
+
+-- byes: (competition, season, round, team) is now their natural key
+DELETE FROM matches m
+USING matches k
+WHERE m.away_team_id IS NULL AND k.away_team_id IS NULL
+  AND m.competition_id = k.competition_id
+  AND m.season = k.season
+  AND m.round = k.round
+  AND m.home_team_id = k.home_team_id
+  AND m.id > k.id;
+
+CREATE UNIQUE INDEX idx_matches_bye ON matches(competition_id, season, round, home_team_id) WHERE away_team_id IS NULL;
+CREATE INDEX idx_matches_season_round ON matches(season, round);
+
+-- events and event_players: rebuild as tables partitioned by season, keeping
+-- the event ids and their sequence
+
+DROP VIEW basic_events;
+
+ALTER TABLE event_players RENAME TO event_players_unpartitioned;
+ALTER TABLE event_players_unpartitioned RENAME CONSTRAINT event_players_pkey TO event_players_unpartitioned_pkey;
+ALTER TABLE events RENAME TO events_unpartitioned;
+ALTER TABLE events_unpartitioned RENAME CONSTRAINT events_pkey TO events_unpartitioned_pkey;
+ALTER TABLE events_unpartitioned RENAME CONSTRAINT events_natural_key TO events_unpartitioned_natural_key;
+ALTER INDEX idx_events_match_time RENAME TO idx_events_unpartitioned_match_time;
+ALTER INDEX idx_events_created_at RENAME TO idx_events_unpartitioned_created_at;
+
+CREATE TABLE events (
+    id INT NOT NULL DEFAULT nextval('events_id_seq'),
+    season INT NOT NULL,
+    match_id INT NOT NULL REFERENCES matches(id),
+    team_id INT REFERENCES teams(id),
+    player_id INT REFERENCES players(id),
+    event_type_id INT NOT NULL REFERENCES event_types(id),
+    game_time_sec INT NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    PRIMARY KEY (id, season),
+    CONSTRAINT events_natural_key UNIQUE NULLS NOT DISTINCT (match_id, event_type_id, game_time_sec, player_id, season)
+) PARTITION BY LIST (season);
+-- moved before the old table is dropped, which would drop the sequence with it
+ALTER SEQUENCE events_id_seq OWNED BY events.id;
+
+CREATE TABLE event_players (
+    event_id INT NOT NULL,
+    season INT NOT NULL,
+    player_id INT NOT NULL REFERENCES players(id),
+    role_id INT REFERENCES event_roles(id),
+    PRIMARY KEY (event_id, player_id, season),
+    FOREIGN KEY (event_id, season) REFERENCES events(id, season) ON DELETE CASCADE
+) PARTITION BY LIST (season);
+
+CREATE INDEX idx_events_match_time ON events(match_id, game_time_sec);
+CREATE INDEX idx_events_created_at ON events(created_at);
+
+CREATE OR REPLACE FUNCTION ensure_season_partitions(p_season INT) RETURNS void AS $$
+BEGIN
+    -- serialise concurrent callers, the second then finds the tables there
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_season_partitions'));
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF events FOR VALUES IN (%s)',
+                   'events_' || p_season, p_season);
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF event_players FOR VALUES IN (%s)',
+                   'event_players_' || p_season, p_season);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_season_partitions(season) FROM (SELECT DISTINCT season FROM matches) seasons;
+
+INSERT INTO events (id, season, match_id, team_id, player_id, event_type_id, game_time_sec, description, created_at)
+SELECT e.id, m.season, e.match_id, e.team_id, e.player_id, e.event_type_id, e.game_time_sec, e.description, e.created_at
+FROM events_unpartitioned e
+JOIN matches m ON m.id = e.match_id;
+
+INSERT INTO event_players (event_id, season, player_id, role_id)
+SELECT ep.event_id, m.season, ep.player_id, ep.role_id
+FROM event_players_unpartitioned ep
+JOIN events_unpartitioned e ON e.id = ep.event_id
+JOIN matches m ON m.id = e.match_id;
+
+DROP TABLE event_players_unpartitioned;
+DROP TABLE events_unpartitioned;
+
+CREATE OR REPLACE VIEW basic_events AS
+SELECT 
+    p.name AS player,
+    e.game_time_sec,
+    et.name AS event,
+    e.description,
+    m.round,
+    m.id AS match_id,
+    e.team_id AS team_id,
+    e.season
+FROM events e
+INNER JOIN event_types et ON et.id = e.event_type_id
+LEFT JOIN players p ON p.id = e.player_id
+INNER JOIN matches m ON m.id = e.match_id;
+
+CREATE OR REPLACE VIEW match_summaries AS
+SELECT
+    m.date,
+    ht.name as home_team,
+    m.score_home,
+    at.name as away_team,
+    m.score_away,
+    m.venue,
+    m.round,
+    m.season,
+    m.competition_id
+FROM matches m
+LEFT JOIN teams ht ON m.home_team_id = ht.id
+LEFT JOIN teams AT ON m.away_team_id = at.id;
+
+-- refresh_match_stats: the season now comes from the match
+DROP FUNCTION refresh_match_stats(INT, INT);
+
+CREATE OR REPLACE FUNCTION refresh_match_stats(p_match_id INT) RETURNS void AS $$
+DECLARE
+    -- the season column of every summary row, and the events partition to read
+    match_season INT := (SELECT season FROM matches WHERE id = p_match_id);
+BEGIN
+    DELETE FROM match_results WHERE match_id = p_match_id;
+    DELETE FROM match_team_stats WHERE match_id = p_match_id;
+    DELETE FROM match_player_stats WHERE match_id = p_match_id;
+
+    INSERT INTO match_results (match_id, team_id, season, round, status, pts, points_for, points_against)
+    SELECT id, team_id, match_season, round, status,
+           CASE status WHEN 'win' THEN 2 WHEN 'bye' THEN 2 WHEN 'draw' THEN 1 ELSE 0 END,
+           points_for, points_against
+    FROM (
+        SELECT m.id, m.round, m.home_team_id AS team_id,
+               CASE
+                 WHEN m.away_team_id IS NULL THEN 'bye'
+                 WHEN m.score_home > m.score_away THEN 'win'
+                 WHEN m.score_home < m.score_away THEN 'loss'
+                 WHEN m.score_home = m.score_away THEN 'draw'
+               END AS status,
+               CASE WHEN m.away_team_id IS NULL THEN 0 ELSE m.score_home END AS points_for,
+               CASE WHEN m.away_team_id IS NULL THEN 0 ELSE m.score_away END AS points_against
+        FROM matches m
+        WHERE m.id = p_match_id
+
+        UNION ALL
+
+        SELECT m.id, m.round, m.away_team_id,
+               CASE
+                 WHEN m.score_away > m.score_home THEN 'win'
+                 WHEN m.score_away < m.score_home THEN 'loss'
+                 WHEN m.score_away = m.score_home THEN 'draw'
+               END,
+               m.score_away, m.score_home
+        FROM matches m
+        WHERE m.id = p_match_id AND m.away_team_id IS NOT NULL
+    ) results
+    -- matches without scores yet don't count
+    WHERE status IS NOT NULL;
+
+    INSERT INTO match_team_stats
+    SELECT e.match_id, e.team_id, match_season, m.round,
+           SUM(et.points),
+           COUNT(*) FILTER (WHERE et.is_try),
+           COUNT(*) FILTER (WHERE et.is_error),
+           COUNT(*) FILTER (WHERE et.is_conversion_made),
+           COUNT(*) FILTER (WHERE et.is_conversion_missed),
+           COUNT(*) FILTER (WHERE et.is_penalty_conceded),
+           COUNT(*) FILTER (WHERE et.is_field_goal_made),
+           COUNT(*) FILTER (WHERE et.is_field_goal_missed)
+    FROM events e
+    INNER JOIN event_types et ON et.id = e.event_type_id
+    INNER JOIN matches m ON m.id = e.match_id
+    WHERE e.season = match_season AND e.match_id = p_match_id AND e.team_id IS NOT NULL
+    GROUP BY e.match_id, e.team_id, m.round;
+
+    INSERT INTO match_player_stats
+    SELECT e.match_id, e.player_id, match_season, m.round,
+           SUM(et.points),
+           COUNT(*) FILTER (WHERE et.is_try),
+           COUNT(*) FILTER (WHERE et.is_error),
+           COUNT(*) FILTER (WHERE et.is_penalty_conceded)
+    FROM events e
+    INNER JOIN event_types et ON et.id = e.event_type_id
+    INNER JOIN matches m ON m.id = e.match_id
+    WHERE e.season = match_season AND e.match_id = p_match_id
+    GROUP BY e.match_id, e.player_id, m.round;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,8 @@
+-- unique_match predates seasons and allowed one bye per round and team across
+-- all seasons and competitions, so it now includes both
+
+ALTER TABLE matches DROP CONSTRAINT unique_match;
+
+ALTER TABLE matches
+ADD CONSTRAINT unique_match
+  UNIQUE NULLS NOT DISTINCT (competition_id, season, round, away_team_id, date, venue, home_team_id, score_home, score_away);
@@ -0,0 +1,13 @@
+-- player_profiles: profile page URL and HTTP validators per player, read by
+-- utils/profiles.py to re-fetch only profiles that are missing or stale
+CREATE TABLE IF NOT EXISTS player_profiles (
+    player_id INT PRIMARY KEY REFERENCES players(id) ON DELETE CASCADE,
+    url VARCHAR(512),
+    etag VARCHAR(255),
+    last_modified VARCHAR(64),
+    content_hash VARCHAR(64),
+    status VARCHAR(20),
+    checked_at TIMESTAMP WITH TIME ZONE,
+    changed_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX IF NOT EXISTS idx_player_profiles_checked_at ON player_profiles(checked_at);
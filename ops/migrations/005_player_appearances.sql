@@ -0,0 +1,28 @@
+-- player_appearance and team_membership are renamed to the plural names the
+-- models (and every other table) use, and get the keys the team list upsert
+-- in utils/db.py relies on: one appearance per player per match, one
+-- membership per player, team and start date.
+ALTER TABLE player_appearance RENAME TO player_appearances;
+ALTER SEQUENCE player_appearance_id_seq RENAME TO player_appearances_id_seq;
+ALTER INDEX player_appearance_pkey RENAME TO player_appearances_pkey;
+ALTER INDEX idx_player_appearance_match_team RENAME TO idx_player_appearances_match_team;
+
+ALTER TABLE team_membership RENAME TO team_memberships;
+ALTER SEQUENCE team_membership_id_seq RENAME TO team_memberships_id_seq;
+ALTER INDEX team_membership_pkey RENAME TO team_memberships_pkey;
+ALTER INDEX idx_team_membership_player RENAME TO idx_team_memberships_player;
+
+ALTER TABLE player_appearances ADD COLUMN position VARCHAR(50);
+
+DELETE FROM player_appearances a
+USING player_appearances k
+WHERE a.match_id = k.match_id AND a.player_id = k.player_id AND a.id > k.id;
+ALTER TABLE player_appearances
+  ADD CONSTRAINT player_appearances_match_player_key UNIQUE (match_id, player_id);
+CREATE INDEX idx_player_appearances_player ON player_appearances(player_id);
+
+DELETE FROM team_memberships m
+USING team_memberships k
+WHERE m.player_id = k.player_id AND m.team_id = k.team_id AND m.start_date = k.start_date AND m.id > k.id;
+ALTER TABLE team_memberships
+  ADD CONSTRAINT team_memberships_player_team_start_key UNIQUE (player_id, team_id, start_date);
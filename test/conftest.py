@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SERVER_URL = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}"
+DATABASE_URL = f"{SERVER_URL}/test"
+
+
+@pytest.fixture(scope="function")
+def session_factory():
+    """Sessions on the test database, as create_db_session returns them."""
+    from utils.db import create_db_session
+
+    return create_db_session(DATABASE_URL)
+
+
+@pytest.fixture(scope="function")
+def session(session_factory):
+    """A session on the test database, closed after the test so it holds no locks."""
+    session = session_factory()
+    yield session
+    session.close()
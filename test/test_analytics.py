@@ -0,0 +1,197 @@
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from utils.analytics import EVENT_COLUMNS, MATCH_COLUMNS, Analytics
+from utils.db import bulk_insert_match_events, create_bye_match, get_or_create_match, refresh_match_stats
+from utils.export import EVENT_TYPE_FLAGS, EVENTS, LOOKUPS, MATCHES, PartitionedWriter, _write_file, to_batch
+from utils.parse import EventRecord
+
+# name -> points and the flags classify_event_type sets
+EVENT_TYPES = {
+    "Try": (4, {"is_try"}),
+    "Conversion-Made": (2, {"is_conversion_made"}),
+    "Handling Error": (0, {"is_error"}),
+    "Penalty": (0, {"is_penalty_conceded"}),
+}
+
+MATCHES_ROWS = [
+    # season, match_id, round, home, away, home score, away score
+    (2025, 1, 1, "Broncos", "Storm", 10, 6),
+    (2025, 2, 1, "Sharks", "Eels", 12, 12),
+    (2025, 3, 2, "Storm", "Sharks", 20, 4),
+    (2025, 4, 2, "Broncos", None, None, None),  # bye
+    (2025, 5, 2, "Eels", "Dragons", None, None),  # not played yet
+    (2024, 6, 1, "Storm", "Broncos", 30, 0),
+]
+
+
+def make_event(season, match_id, round_, team, player, event_type, game_time_sec):
+    points, flags = EVENT_TYPES[event_type]
+    return (season, match_id, round_, team, player, event_type, game_time_sec, points,
+            *[flag in flags for flag in EVENT_TYPE_FLAGS])
+
+
+EVENT_ROWS = [
+    make_event(2025, 1, 1, "Broncos", "Reece Walsh", "Try", 300),
+    make_event(2025, 1, 1, "Broncos", "Adam Reynolds", "Conversion-Made", 330),
+    make_event(2025, 1, 1, "Broncos", "Reece Walsh", "Try", 3000),
+    make_event(2025, 1, 1, "Storm", "Jahrome Hughes", "Handling Error", 400),
+    make_event(2025, 1, 1, "Storm", None, "Penalty", 500),
+    make_event(2025, 3, 2, "Storm", "Jahrome Hughes", "Try", 100),
+    make_event(2024, 6, 1, "Storm", "Jahrome Hughes", "Try", 100),
+]
+
+
+@pytest.fixture
+def analytics() -> Analytics:
+    return Analytics(pd.DataFrame(MATCHES_ROWS, columns=MATCH_COLUMNS), pd.DataFrame(EVENT_ROWS, columns=EVENT_COLUMNS))
+
+
+def test_ladder(analytics) -> None:
+    ladder = analytics.ladder(seasons=[2025]).set_index("team")
+    assert list(ladder.columns) == [
+        "ladder_position", "season", "games_played", "wins", "losses", "draws", "byes",
+        "points_for", "points_against", "points_diff", "total_points",
+    ]
+    assert ladder.loc["Broncos", ["games_played", "wins", "byes", "points_for", "total_points"]].tolist() == [1, 1, 1, 10, 4]
+    assert ladder.loc["Storm", ["games_played", "wins", "losses", "points_diff", "total_points"]].tolist() == [2, 1, 1, 12, 2]
+    # the unplayed match counts for neither team
+    assert "Dragons" not in ladder.index
+    assert ladder.loc["Eels", ["games_played", "draws", "total_points"]].tolist() == [1, 1, 1]
+    assert ladder["ladder_position"].to_dict() == {"Broncos": 1, "Storm": 2, "Eels": 3, "Sharks": 4}
+
+
+def test_ladder_ties_share_a_position() -> None:
+    matches = pd.DataFrame([(2025, 1, 1, "A", "B", 10, 10), (2025, 2, 1, "C", "D", 10, 10)], columns=MATCH_COLUMNS)
+    ladder = Analytics(matches, pd.DataFrame([], columns=EVENT_COLUMNS)).ladder()
+    assert ladder["ladder_position"].tolist() == [1, 1, 1, 1]
+
+
+def test_stats_of_an_empty_database() -> None:
+    analytics = Analytics(pd.DataFrame([], columns=MATCH_COLUMNS), pd.DataFrame([], columns=EVENT_COLUMNS))
+    assert analytics.ladder().empty
+    assert analytics.team_stats().empty
+    assert analytics.player_stats().empty
+
+
+def test_ladder_what_if(analytics) -> None:
+    after_round_1 = analytics.ladder(seasons=[2025], max_round=1).set_index("team")
+    assert after_round_1.loc["Storm", "losses"] == 1
+    assert after_round_1.loc["Storm", "wins"] == 0
+    three_for_a_win = analytics.ladder(seasons=[2025], points={"win": 3}).set_index("team")
+    assert three_for_a_win.loc["Broncos", "total_points"] == 5
+    assert set(analytics.ladder()["season"]) == {2024, 2025}
+
+
+def test_team_stats(analytics) -> None:
+    stats = analytics.team_stats(seasons=[2025]).set_index("team")
+    assert stats.loc["Broncos", ["total_points", "tries", "conversions_kicked", "matches_played"]].tolist() == [10, 2, 1, 1]
+    assert stats.loc["Storm", ["total_points", "tries", "errors", "penalty_conceeded", "matches_played"]].tolist() == [4, 1, 1, 1, 2]
+
+
+def test_player_stats(analytics) -> None:
+    stats = analytics.player_stats(seasons=[2025])
+    assert stats["player"].tolist()[0] == "Reece Walsh"
+    assert stats.iloc[0][["total_points", "tries", "matches_played"]].tolist() == [8, 2, 1]
+    # events without a player are totalled under a null player, as in the view
+    assert stats["player"].isna().sum() == 1
+    hughes = stats.set_index("player").loc["Jahrome Hughes"]
+    assert hughes[["total_points", "errors", "matches_played"]].tolist() == [4, 1, 2]
+
+
+def test_scoring_timeline(analytics) -> None:
+    timeline = analytics.scoring_timeline(seasons=[2025], teams=["Broncos"])
+    assert timeline[["minute", "points", "cumulative_points"]].values.tolist() == [[5, 6, 6], [50, 4, 10]]
+    by_minute = analytics.points_by_minute(seasons=[2025]).set_index("minute")
+    assert by_minute.loc[1, "points"] == 4
+    assert by_minute["points"].sum() == 14
+
+
+def test_from_parquet(analytics, tmp_path) -> None:
+    match_rows = [(season, match_id, round_, None, None, home, away, sh, sa, None, None, None)
+                  for season, match_id, round_, home, away, sh, sa in MATCHES_ROWS]
+    event_rows = [(season, i, match_id, round_, team, player, event_type, time_, None, None)
+                  for i, (season, match_id, round_, team, player, event_type, time_, *_) in enumerate(EVENT_ROWS)]
+    with PartitionedWriter(str(tmp_path / "matches"), MATCHES[1], "part-0.parquet") as writer:
+        writer.write(sorted(match_rows, key=lambda row: row[0]))
+    with PartitionedWriter(str(tmp_path / "events"), EVENTS[1], "part-0.parquet") as writer:
+        writer.write(sorted(event_rows, key=lambda row: row[0]))
+    _, schema = LOOKUPS["event_types"]
+    types = [(i, name, points, *[flag in flags for flag in EVENT_TYPE_FLAGS])
+             for i, (name, (points, flags)) in enumerate(EVENT_TYPES.items())]
+    _write_file(str(tmp_path / "event_types.parquet"), [to_batch(types, schema)], schema)
+
+    loaded = Analytics.from_parquet(str(tmp_path), seasons=[2025])
+    pd.testing.assert_frame_equal(loaded.ladder(), analytics.ladder(seasons=[2025]))
+    pd.testing.assert_frame_equal(
+        loaded.player_stats().fillna("-"), analytics.player_stats(seasons=[2025]).fillna("-"), check_dtype=False,
+    )
+
+
+def test_whole_history_is_fast() -> None:
+    matches = pd.DataFrame(
+        [(2000 + i // 200, i, i % 27 + 1, f"T{i % 17}", f"T{(i + 5) % 17}", i % 40, (i * 7) % 40) for i in range(5000)],
+        columns=MATCH_COLUMNS,
+    )
+    analytics = Analytics(matches, pd.DataFrame([], columns=EVENT_COLUMNS))
+    analytics.ladder()
+    start = time.perf_counter()
+    analytics.ladder(points={"win": 3}, max_round=10)
+    assert time.perf_counter() - start < 0.5
+
+
+# other tests write to the shared test database without refreshing match
+# stats, so the views are compared on a season only this test writes
+VIEW_SEASON = 1908
+VIEW_MATCHES = [
+    # round, home, away, home score, away score, events
+    (1, "Glebe", "Newtown", 8, 5, [("05:00", "Try", "Glebe", "Dan Frawley"), ("06:00", "Conversion-Made", "Glebe", "Dan Frawley"),
+                                   ("30:00", "Try", "Newtown", "Albert Rosenfeld"), ("41:00", "Handling Error", "Glebe", None)]),
+    (1, "Balmain", "Souths", 6, 6, [("10:00", "Try", "Souths", "Arthur Hennessy"), ("70:00", "Penalty", "Balmain", None)]),
+    (2, "Newtown", "Balmain", 0, 12, [("20:00", "Try", "Balmain", "Bill Kelly")]),
+    (2, "Souths", "Glebe", 3, 3, []),
+]
+
+
+def seed_view_season(session) -> None:
+    """Write VIEW_SEASON with the scraper's helpers, a rerun adds nothing."""
+    for i, (round_number, home, away, home_score, away_score, events) in enumerate(VIEW_MATCHES):
+        data = {
+            "round": round_number, "date": datetime(VIEW_SEASON, 4, 7 * round_number + i, 15, 0),
+            "venue": "Wentworth Park", "home_name": home, "away_name": away, "home_score": home_score,
+            "away_score": away_score, "attendance": "3,000", "ground_conditions": "Dry", "weather": "Fine",
+        }
+        match = get_or_create_match(session, data, VIEW_SEASON, 111)
+        bulk_insert_match_events(session, match.id, [EventRecord(*event, None) for event in events])
+        refresh_match_stats(session, match.id)
+    bye = create_bye_match(session, "Easts", 2, VIEW_SEASON, 111)
+    refresh_match_stats(session, bye.id)
+
+
+def test_matches_the_sql_views(session) -> None:
+    seed_view_season(session)
+    analytics = Analytics.from_db(session, seasons=[VIEW_SEASON])
+    params = {"season": VIEW_SEASON}
+    columns = ["ladder_position", "season", "team", "games_played", "wins", "losses", "draws", "byes",
+               "points_for", "points_against", "points_diff", "total_points"]
+    view = pd.DataFrame(session.execute(text("SELECT * FROM ladder WHERE season = :season"), params).all(), columns=columns)
+    assert len(view) == 5
+    view = view.sort_values(["season", "team"]).reset_index(drop=True)
+    ladder = analytics.ladder()[columns].sort_values(["season", "team"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(ladder, view, check_dtype=False)
+
+    player_columns = ["season", "player", "total_points", "tries", "errors", "penalty_conceeded", "matches_played"]
+    view = pd.DataFrame(
+        session.execute(text("SELECT * FROM player_stats WHERE season = :season"), params).all(), columns=player_columns,
+    )
+    assert len(view) == 5  # four players and the events without one
+    key = ["season", "player"]
+    pd.testing.assert_frame_equal(
+        analytics.player_stats().fillna("").sort_values(key).reset_index(drop=True),
+        view.fillna("").sort_values(key).reset_index(drop=True),
+        check_dtype=False,
+    )
@@ -0,0 +1,80 @@
+import os
+
+from utils.browser import BLOCKED_TRACKERS, DriverFactory, DriverProfile, process_tree_rss_mb
+from utils.fetch import SeleniumFetcher
+
+
+class FakeChrome:
+    def __init__(self, options) -> None:
+        self.options = options
+        self.cdp = []
+        self.loaded = []
+        self.quit_called = False
+        self.current_url = ""
+        self.page_source = "<html></html>"
+
+    def execute_cdp_cmd(self, cmd, params) -> None:
+        self.cdp.append((cmd, params))
+
+    def get(self, url) -> None:
+        self.loaded.append(url)
+        self.current_url = url
+
+    def quit(self) -> None:
+        self.quit_called = True
+
+
+def user_data_dir(driver) -> str:
+    [arg] = [arg for arg in driver.options.arguments if arg.startswith("--user-data-dir=")]
+    return arg.split("=", 1)[1]
+
+
+def test_driver_factory_blocks_resources() -> None:
+    factory = DriverFactory(chrome=FakeChrome)
+    driver = factory()
+    assert driver.options.experimental_options["prefs"]["profile.managed_default_content_settings.images"] == 2
+    blocked = dict(driver.cdp)["Network.setBlockedURLs"]["urls"]
+    assert "*.woff2" in blocked and BLOCKED_TRACKERS[0] in blocked
+    factory.release(driver)
+
+    driver = DriverFactory(DriverProfile(block_resources=False), chrome=FakeChrome)()
+    assert driver.cdp == []
+
+
+def test_temporary_profiles_are_removed() -> None:
+    factory = DriverFactory(chrome=FakeChrome)
+    released, leftover = factory(), factory()
+    assert os.path.isdir(user_data_dir(released))
+    factory.release(released)
+    assert released.quit_called
+    assert not os.path.exists(user_data_dir(released))
+    factory.cleanup()
+    assert not os.path.exists(user_data_dir(leftover))
+
+
+def test_persistent_profile_gives_each_driver_a_slot(tmp_path) -> None:
+    factory = DriverFactory(DriverProfile(user_data_dir=str(tmp_path)), chrome=FakeChrome)
+    first, second = factory(), factory()
+    assert user_data_dir(first) == str(tmp_path / "0")
+    assert user_data_dir(second) == str(tmp_path / "1")
+    factory.release(first)
+    assert os.path.isdir(tmp_path / "0")  # kept for the next run
+    assert user_data_dir(factory()) == str(tmp_path / "0")
+
+
+def test_selenium_fetcher_recycles_driver_after_max_pages() -> None:
+    factory = DriverFactory(DriverProfile(max_pages=2, max_rss_mb=0), chrome=FakeChrome)
+    fetcher = SeleniumFetcher(driver_factory=factory)
+    drivers = []
+    for i in range(5):
+        fetcher.get(f"https://www.nrl.com/{i}/")
+        drivers.append(fetcher.driver)
+    assert drivers[0] is drivers[1] and drivers[2] is drivers[3]
+    assert drivers[1] is not drivers[2] and drivers[3] is not drivers[4]
+    assert drivers[0].quit_called and not drivers[-1].quit_called
+    fetcher.close()
+    assert drivers[-1].quit_called
+
+
+def test_process_tree_rss() -> None:
+    assert process_tree_rss_mb(os.getpid()) > 0
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from utils.cache import PageCache
+from utils.fetch import CacheMiss, ReplayFetcher
+from utils.scrape import BASE_URL, ScrapeConfig, determine_latest_round
+
+
+def test_page_cache_round_trip(tmp_path) -> None:
+    cache = PageCache(str(tmp_path))
+    cache.put("draw/?competition=111&season=2025", "<html>draw</html>",
+              final_url="draw/?competition=111&round=9&season=2025")
+
+    page = cache.get("draw/?competition=111&season=2025")
+    assert page.html == "<html>draw</html>"
+    assert page.final_url == "draw/?competition=111&round=9&season=2025"
+    assert cache.get("draw/?competition=111&season=2024") is None
+
+
+def test_page_cache_keys_on_tab(tmp_path) -> None:
+    cache = PageCache(str(tmp_path))
+    cache.put("match", "<html>summary</html>")
+    cache.put("match", "<html>events</html>", tab="play-by-play")
+
+    assert cache.get("match").html == "<html>summary</html>"
+    assert cache.get("match", tab="play-by-play").html == "<html>events</html>"
+
+
+def test_page_cache_stores_identical_content_once(tmp_path) -> None:
+    cache = PageCache(str(tmp_path))
+    cache.put("a", "<html>same</html>")
+    cache.put("b", "<html>same</html>")
+    assert len(os.listdir(tmp_path / "objects")) == 1
+
+
+def test_page_cache_evicts_least_recently_used(tmp_path) -> None:
+    # random bodies so gzip can't shrink them much
+    pages = {url: os.urandom(600).hex() for url in ("a", "b", "c")}
+    cache = PageCache(str(tmp_path), max_bytes=1800)
+    cache.put("a", pages["a"])
+    os.utime(next((tmp_path / "objects").iterdir()), (0, 0))  # make "a" clearly the oldest
+    cache.put("b", pages["b"])
+    cache.put("c", pages["c"])
+
+    assert cache.get("a") is None
+    assert cache.get("b").html == pages["b"]
+    assert cache.get("c").html == pages["c"]
+
+
+def test_replay_determines_latest_round_from_cached_redirect(tmp_path) -> None:
+    cache = PageCache(str(tmp_path))
+    url = f"{BASE_URL}/draw/?competition=111&season=2025"
+    cache.put(url, "<html></html>", final_url=f"{BASE_URL}/draw/?competition=111&round=14&season=2025")
+    config = ScrapeConfig(session=None, fetcher=ReplayFetcher(cache), year=2025)
+
+    assert determine_latest_round(config) == 14
+
+
+def test_replay_raises_on_cache_miss(tmp_path) -> None:
+    fetcher = ReplayFetcher(PageCache(str(tmp_path)))
+    with pytest.raises(CacheMiss):
+        fetcher.get(f"{BASE_URL}/draw/?competition=111&season=2025")
@@ -0,0 +1,60 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from main import parse_args
+
+ROOT = Path(__file__).parent.parent
+FIXTURES = Path(__file__).parent / "fixtures"
+HEAVY_MODULES = ("selenium", "sqlalchemy", "bs4", "pandas", "pyarrow")
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def loaded_modules(code: str) -> set[str]:
+    script = f"{code}\nimport sys\nprint(' '.join(sorted({{name.split('.')[0] for name in sys.modules}})))"
+    return set(run_python("-c", script).stdout.split("\n")[-2].split())
+
+
+def test_importing_main_loads_no_heavy_modules() -> None:
+    assert loaded_modules("import main").isdisjoint(HEAVY_MODULES)
+
+
+def test_parse_prints_json_without_browser_or_database() -> None:
+    output = run_python("main.py", "parse", str(FIXTURES / "match_play_by_play.html"), "--year", "2025").stdout
+    result = json.loads(output)
+    assert result["status"] == "Full Time"
+    assert result["matches"][0]["home_name"] == "Storm"
+    assert result["matches"][0]["date"].startswith("2025-")
+    assert result["events"]
+
+    modules = loaded_modules(
+        f"import main\nmain.main(['parse', {str(FIXTURES / 'draw_page.html')!r}])"
+    )
+    assert "bs4" in modules
+    assert modules.isdisjoint(("selenium", "sqlalchemy", "pandas", "pyarrow"))
+
+
+def test_flags_without_a_command_scrape() -> None:
+    args = parse_args(["--year", "2025", "--workers", "2"])
+    assert args.command == "scrape"
+    assert args.year == 2025 and args.workers == 2 and not args.replay
+
+
+def test_replay_command_reads_the_cache_only() -> None:
+    args = parse_args(["replay", "--year", "2024", "--cache-dir", "/tmp/pages"])
+    assert args.command == "replay"
+    assert args.replay and args.cache_dir == "/tmp/pages"
+
+
+def test_matrix_rejects_flags_it_would_ignore(capsys) -> None:
+    for flags in (["--engine", "async"], ["--start-round", "3"], ["--live"]):
+        with pytest.raises(SystemExit):
+            parse_args(["--matrix", "111:2024-2025", *flags])
+        assert "--matrix" in capsys.readouterr().err
+    assert parse_args(["--matrix", "111:2024-2025:1-5"]).matrix
@@ -1,25 +1,24 @@
-import os
-import sys
+import uuid
 from datetime import datetime
-from typing import Callable
-
-from sqlalchemy.orm import Session as OrmSession
-
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import pytest
+from sqlalchemy import select, text
 
-from main import create_db_session
+from models.models import Player, PlayerAppearance, PlayerProfile, Team, TeamMembership
+from utils import state
 from utils.db import (
+    LookupCache,
+    bulk_insert_match_events,
     get_or_create_event_role,
     get_or_create_event_type,
+    create_bye_match,
     get_or_create_match,
     get_or_create_player,
     get_or_create_team,
-)
-
-DATABASE_URL = (
-    f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/test"
+    match_event_keys,
+    refresh_match_stats,
+    update_match_score,
+    upsert_player_appearances,
 )
 
 
@@ -38,11 +37,6 @@ def make_match_data(home, away, home_score=10, away_score=12) -> dict[str, any]:
     }
 
 
-@pytest.fixture(scope="function")
-def session() -> Callable[[], OrmSession]:
-    return create_db_session(DATABASE_URL)()
-
-
 def test_get_or_create_team(session) -> None:
     team = get_or_create_team(session, "Rabbitohs")
     assert team.name == "Rabbitohs"
@@ -67,7 +61,7 @@ def test_get_or_create_event_role(session) -> None:
 
 def test_creates_new_match(session) -> None:
     data = make_match_data("Storm", "Eels", 20, 18)
-    match = get_or_create_match(session, data)
+    match = get_or_create_match(session, data, 2025, 111)
 
     assert match.id is not None
     assert match.home_team.name == "Storm"
@@ -76,4 +70,148 @@ def test_creates_new_match(session) -> None:
     assert match.score_away == 18
     assert match.attendance == 20000
     assert match.venue == "Suncorp Stadium"
+    assert (match.season, match.competition_id) == (2025, 111)
     session.rollback()  # Clean up after test
+
+
+def test_create_bye_match_once_per_season(session) -> None:
+    bye = create_bye_match(session, "Dolphins", 7, 2025, 111)
+    assert (bye.season, bye.round, bye.away_team_id, bye.venue) == (2025, 7, None, "Bye")
+    assert create_bye_match(session, "Dolphins", 7, 2025, 111).id == bye.id
+    # the same round of another season is another bye
+    assert create_bye_match(session, "Dolphins", 7, 2024, 111).id != bye.id
+
+
+def make_parsed_event(title, timestamp, team_name=None, player=None, role=None) -> dict[str, any]:
+    return {"timestamp": timestamp, "title": title, "team_name": team_name, "player": player, "role": role}
+
+
+def run_unique(name: str) -> str:
+    """name with a suffix of its own, so a test's match is new on every run against the shared database."""
+    return f"{name} {uuid.uuid4().hex[:8]}"
+
+
+def test_bulk_insert_match_events(session) -> None:
+    home, away = run_unique("Sharks"), run_unique("Titans")
+    match = get_or_create_match(session, make_match_data(home, away, 24, 6), 2025, 111)
+    events = [
+        make_parsed_event("Try", "12:05", home, "Nicho Hynes"),
+        make_parsed_event("Interchange #1", "30:00", away, "David Fifita", "on"),
+        make_parsed_event("Interchange #1", "30:00", away, "Kieran Foran", "off"),
+        make_parsed_event("Kick Off", "00:00"),
+    ]
+    assert bulk_insert_match_events(session, match.id, events) == 4
+    # re-running the same batch must not duplicate anything
+    assert bulk_insert_match_events(session, match.id, events) == 0
+    session.refresh(match)
+    assert len(match.events) == 4
+    interchange = [e for e in match.events if e.event_type.name == "Interchange #1"]
+    assert sorted(ep.role.role_name for e in interchange for ep in e.players) == ["off", "on"]
+
+
+def test_lookup_cache_player_lru() -> None:
+    cache = LookupCache(max_players=2)
+    cache.put(Player, "Jahrome Hughes", 1)
+    cache.put(Player, "Harry Grant", 2)
+    assert cache.get(Player, "Jahrome Hughes") == 1  # now most recently used
+    cache.put(Player, "Ryan Papenhuyzen", 3)
+    assert cache.get(Player, "Harry Grant") is None
+    assert cache.get(Player, "Jahrome Hughes") == 1
+    assert cache.stats()["players"] == {"hits": 2, "misses": 1, "size": 2}
+
+
+def test_lookup_cache_invalidate() -> None:
+    cache = LookupCache()
+    cache.put(Team, "Storm", 7)
+    cache.invalidate()
+    assert cache.get(Team, "Storm") is None
+
+
+def test_scrape_state_ledger(session) -> None:
+    key = state.round_key(111, 1999, 1)
+    state.mark(session, state.ROUND, key, state.IN_PROGRESS)
+    assert state.get_status(session, state.ROUND, key) == state.IN_PROGRESS
+    assert state.first_incomplete_round(session, 111, 1999) == 1
+
+    state.mark(session, state.ROUND, key, state.COMPLETE, "<html></html>")
+    state.mark(session, state.ROUND, state.round_key(111, 1999, 2), state.COMPLETE)
+    assert state.first_incomplete_round(session, 111, 1999) == 3
+
+    state.mark(session, state.MATCH, "draw/1999/a/", state.COMPLETE)
+    state.mark(session, state.MATCH, "draw/1999/b/", state.FAILED)
+    assert state.completed_keys(session, state.MATCH, ["draw/1999/a/", "draw/1999/b/"]) == {"draw/1999/a/"}
+
+
+def test_event_types_are_classified_for_stats(session) -> None:
+    assert get_or_create_event_type(session, "Try").points == 4
+    penalty = get_or_create_event_type(session, "Penalty - Ruck Infringement")
+    assert penalty.is_penalty_conceded and penalty.points == 0
+    assert get_or_create_event_type(session, "1 Point Field Goal-Made").is_field_goal_made
+
+
+def test_refresh_match_stats(session) -> None:
+    match = get_or_create_match(session, make_match_data("Dragons", "Knights", 16, 16), 1998, 111)
+    bulk_insert_match_events(session, match.id, [
+        make_parsed_event("Try", "10:00", "Dragons", "Zac Lomax"),
+        make_parsed_event("Conversion-Made", "10:30", "Dragons", "Zac Lomax"),
+        make_parsed_event("Error", "20:00", "Knights", "Kalyn Ponga"),
+    ])
+    refresh_match_stats(session, match.id)
+
+    results = session.execute(text(
+        "SELECT status, pts FROM match_results WHERE match_id = :id"), {"id": match.id}).all()
+    assert sorted(results) == [("draw", 1), ("draw", 1)]
+    lomax = session.execute(text(
+        "SELECT total_points, tries FROM player_stats WHERE season = 1998 AND player = 'Zac Lomax'")).one()
+    assert tuple(lomax) == (6, 1)
+
+
+def test_match_event_keys_and_score_updates(session) -> None:
+    home = run_unique("Warriors")
+    match = get_or_create_match(session, make_match_data(home, run_unique("Raiders"), 4, 0), 2025, 111)
+    bulk_insert_match_events(session, match.id, [
+        make_parsed_event("Try", "03:10", home, "Shaun Johnson"),
+        make_parsed_event("Kick Off", "00:00"),
+    ])
+    assert match_event_keys(session, match.id) == {("Try", 190, "Shaun Johnson"), ("Kick Off", 0, None)}
+
+    assert update_match_score(session, match.id, 6, 0)
+    assert not update_match_score(session, match.id, 6, 0)
+
+
+def make_appearance(team, player, number, **stats) -> dict:
+    return {"team_name": team, "player": player, "jersey_number": number, "position": None, "stats": stats}
+
+
+def test_upsert_player_appearances_and_memberships(session) -> None:
+    first = get_or_create_match(session, make_match_data("Titans", "Dolphins"), 2025, 111)
+    data = make_match_data("Dolphins", "Titans")
+    data["date"] = datetime(2025, 6, 1, 19, 0)
+    second = get_or_create_match(session, data, 2025, 111)
+
+    appearance = make_appearance("Titans", "Jayden Campbell", 6, tries=1)
+    appearance["profile_url"] = "https://www.nrl.com/players/nrl-premiership/titans/jayden-campbell/"
+    assert upsert_player_appearances(session, first.id, [appearance, make_appearance("Dolphins", "Isaiya Katoa", 7)]) == 2
+    # a rescrape updates the stats instead of adding rows
+    appearance["stats"] = {"tries": 2}
+    assert upsert_player_appearances(session, first.id, [appearance]) == 1
+    assert upsert_player_appearances(session, second.id, [make_appearance("Dolphins", "Jayden Campbell", 6)]) == 1
+
+    player = session.execute(select(Player).where(Player.name == "Jayden Campbell")).scalar_one()
+    rows = session.execute(
+        select(PlayerAppearance).where(PlayerAppearance.player_id == player.id).order_by(PlayerAppearance.match_id)
+    ).scalars().all()
+    assert [(row.match_id, row.jersey_number) for row in rows] == [(first.id, 6), (second.id, 6)]
+    assert rows[0].stats == {"tries": 2}
+    assert session.get(PlayerProfile, player.id).url.endswith("/titans/jayden-campbell/")
+
+    spells = session.execute(
+        select(Team.name, TeamMembership.start_date, TeamMembership.end_date)
+        .join(Team, Team.id == TeamMembership.team_id)
+        .where(TeamMembership.player_id == player.id)
+        .order_by(TeamMembership.start_date)
+    ).all()
+    assert [tuple(spell) for spell in spells] == [
+        ("Titans", datetime(2025, 3, 2).date(), datetime(2025, 6, 1).date()),
+        ("Dolphins", datetime(2025, 6, 1).date(), None),
+    ]
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, text
+
+from utils.db import (
+    LOOKUP_CACHE,
+    bulk_insert_match_events,
+    create_bye_match,
+    ensure_season_partitions,
+    get_or_create_event,
+    get_or_create_match,
+    match_has_events,
+)
+from utils.parse import EventRecord
+
+
+def capture_lookups(session, fn) -> list[tuple[str, dict]]:
+    """Run fn and return every SELECT it sent, with its parameters."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "refresh_match_stats" not in statement:
+            statements.append((statement, parameters))
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+def explain(session, statement: str, parameters) -> str:
+    # the test tables are tiny, so make the planner use an index wherever one exists
+    session.execute(text("SET enable_seqscan = off"))
+    plan = session.connection().exec_driver_sql(f"EXPLAIN {statement}", parameters).scalars().all()
+    session.rollback()
+    return "\n".join(plan)
+
+
+def assert_indexed(session, fn) -> None:
+    LOOKUP_CACHE.invalidate()
+    statements = capture_lookups(session, fn)
+    assert statements
+    for statement, parameters in statements:
+        plan = explain(session, statement, parameters)
+        assert "Seq Scan" not in plan, f"{statement}\n{plan}"
+
+
+def test_match_lookups_use_indexes(session) -> None:
+    data = {
+        "round": 3, "date": datetime(2025, 3, 20, 19, 50), "venue": "AAMI Park",
+        "home_name": "Index Home", "away_name": "Index Away", "home_score": 1, "away_score": 0,
+        "attendance": "1", "ground_conditions": None, "weather": None,
+    }
+    get_or_create_match(session, data, 2025, 111)
+    assert_indexed(session, lambda: get_or_create_match(session, data, 2025, 111))
+    assert_indexed(session, lambda: create_bye_match(session, "Index Bye", 3, 2025, 111))
+
+
+def test_event_lookups_use_indexes(session) -> None:
+    data = {
+        "round": 4, "date": datetime(2025, 3, 27, 19, 50), "venue": "AAMI Park",
+        "home_name": "Index Home", "away_name": "Index Away", "home_score": 1, "away_score": 0,
+        "attendance": "1", "ground_conditions": None, "weather": None,
+    }
+    match = get_or_create_match(session, data, 2025, 111)
+    record = EventRecord("12:00", "Index Try", "Index Home", "Index Player", None)
+    bulk_insert_match_events(session, match.id, [record])
+
+    assert_indexed(session, lambda: get_or_create_event(session, match.id, record))
+    assert_indexed(session, lambda: match_has_events(session, match.id))
+
+
+def test_season_queries_read_one_partition(session) -> None:
+    ensure_season_partitions(session, 2024)
+    ensure_season_partitions(session, 2025)
+    plan = explain(session, "SELECT * FROM basic_events WHERE season = %(season)s", {"season": 2025})
+    assert "events_2025" in plan
+    assert "events_2024" not in plan
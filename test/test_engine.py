@@ -0,0 +1,197 @@
+import asyncio
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.engine import AsyncEngine, ParsedMatch, ParsedRound, RoundDone
+from utils.fetch import Fetcher, HttpFetcher, Page
+from utils.rate import AsyncTokenBucket
+from utils.scrape import ScrapeConfig
+from utils.sinks import NDJSONSink
+
+DRAW_HTML = """
+<div class="o-shadowed-box u-spacing-mv-16 u-text-align-center">
+    <ul><li class="match-bye-team"><span class="u-visually-hidden">Dolphins</span></li></ul>
+</div>
+<a class="match--highlighted u-flex-column u-flex-align-items-center u-width-100"
+   href="draw/nrl-premiership/2025/round-5/storm-v-eels/">Storm v Eels</a>
+"""
+
+MATCH_HTML = """
+<div class="match">
+    <p class="match-header__title">Round 5 - Sunday 6 April</p>
+    <p class="match-team__name--home">Storm</p>
+    <p class="match-team__name--away">Eels</p>
+    <div class="match-team__score--home">30</div>
+    <div class="match-team__score--away">12</div>
+</div>
+"""
+
+PLAY_BY_PLAY_HTML = """
+<div class="match-centre-event__content">
+    <span class="match-centre-event__timestamp">05:10</span>
+    <h4 class="match-centre-event__title">Try</h4>
+    <div class="match-centre-event__summary">
+        <p class="match-centre-event__team-name">Storm</p>
+        <p class="u-font-weight-500">Ryan Papenhuyzen</p>
+    </div>
+</div>
+"""
+
+
+class FakeSite(Fetcher):
+    def __init__(self, failures: int = 0, click_failures: int = 0) -> None:
+        self.failures = failures
+        self.click_failures = click_failures
+        self.clicks = 0
+
+    def get(self, url, ready=None) -> Page:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("reset by peer")
+        html = DRAW_HTML if "/draw/?" in url else MATCH_HTML
+        return Page(url=url, final_url=url, html=html)
+
+    def play_by_play(self, url) -> str:
+        self.clicks += 1
+        if self.click_failures:
+            self.click_failures -= 1
+            raise TimeoutError("no play by play events rendered")
+        return PLAY_BY_PLAY_HTML
+
+
+class ServerRenderedHandler(BaseHTTPRequestHandler):
+    """A draw of eight matches whose pages include their play by play, as served to the HTTP fetcher."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/draw/?"):
+            body = "".join(
+                '<a class="match--highlighted u-flex-column u-flex-align-items-center u-width-100" '
+                f'href="draw/nrl-premiership/2025/round-5/match-{n}/">Match {n}</a>'
+                for n in range(8)
+            )
+        else:
+            body = MATCH_HTML + PLAY_BY_PLAY_HTML
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class RecordingBrowser(Fetcher):
+    def __init__(self) -> None:
+        self.calls = []
+
+    def get(self, url, ready=None) -> Page:
+        self.calls.append(("get", url))
+        return Page(url=url, final_url=url, html="")
+
+    def play_by_play(self, url) -> str:
+        self.calls.append(("play_by_play", url))
+        return ""
+
+
+@pytest.fixture
+def server_rendered_site(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ServerRenderedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr("utils.engine.BASE_URL", base_url)
+    monkeypatch.setattr("utils.scrape.BASE_URL", base_url)
+    yield base_url
+    server.shutdown()
+
+
+class RecordingEngine(AsyncEngine):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.saved = []
+
+    def _save(self, result) -> bool:
+        self.saved.append(result)
+        return True
+
+
+def test_async_engine_hands_parsed_rounds_and_matches_to_writer() -> None:
+    config = ScrapeConfig(session=None, fetcher=None, year=2025, track_state=False, sink=NDJSONSink(io.StringIO()))
+    engine = RecordingEngine(config, FakeSite, concurrency=2, rate=0)
+    asyncio.run(engine.run([5]))
+
+    rounds = [r for r in engine.saved if isinstance(r, ParsedRound)]
+    matches = [m for m in engine.saved if isinstance(m, ParsedMatch)]
+    assert isinstance(engine.saved[-1], RoundDone)
+    assert rounds == [ParsedRound(round_number=5, bye_teams=["Dolphins"])]
+    assert len(matches) == 1
+    assert matches[0].data["home_name"] == "Storm"
+    assert matches[0].events[0]["player"] == "Ryan Papenhuyzen"
+
+
+def test_async_engine_retries_failed_fetches() -> None:
+    site = FakeSite(failures=2)
+    config = ScrapeConfig(session=None, fetcher=None, year=2025, track_state=False, sink=NDJSONSink(io.StringIO()))
+    engine = RecordingEngine(config, lambda: site, concurrency=1, rate=0, backoff=0.01)
+    asyncio.run(engine.run([5]))
+    assert len(engine.saved) == 3
+
+
+def test_async_engine_does_not_retry_play_by_play_on_its_own() -> None:
+    site = FakeSite(click_failures=1)
+    config = ScrapeConfig(session=None, fetcher=None, year=2025, track_state=False, sink=NDJSONSink(io.StringIO()))
+    engine = RecordingEngine(config, lambda: site, concurrency=1, rate=0, backoff=0.01)
+    asyncio.run(engine.run([5]))
+
+    matches = [m for m in engine.saved if isinstance(m, ParsedMatch)]
+    assert site.clicks == 1
+    assert matches[0].data["home_name"] == "Storm" and matches[0].events is None
+
+
+def test_async_engine_skips_play_by_play_of_matches_with_events() -> None:
+    site = FakeSite()
+    stream = io.StringIO()
+    config = ScrapeConfig(session=None, fetcher=None, year=2025, track_state=False, sink=NDJSONSink(stream))
+    for _ in range(2):
+        asyncio.run(AsyncEngine(config, lambda: site, concurrency=1, rate=0).run([5]))
+
+    # the second run saves the match again and finds its events before clicking
+    assert site.clicks == 1
+    assert sum('"type": "event"' in line for line in stream.getvalue().splitlines()) == 1
+
+
+def test_async_engine_http_fetcher_keeps_play_by_play_of_its_page(server_rendered_site) -> None:
+    # get() and play_by_play() of one fetcher run on different executor threads
+    browsers = []
+
+    def fetcher_factory() -> HttpFetcher:
+        browsers.append(RecordingBrowser())
+        return HttpFetcher(fallback=browsers[-1])
+
+    config = ScrapeConfig(session=None, fetcher=None, year=2025, track_state=False, sink=NDJSONSink(io.StringIO()))
+    engine = RecordingEngine(config, fetcher_factory, concurrency=8, rate=0)
+    asyncio.run(engine.run([5]))
+
+    matches = [m for m in engine.saved if isinstance(m, ParsedMatch)]
+    assert len(matches) == 8
+    assert all(m.events and m.events[0]["player"] == "Ryan Papenhuyzen" for m in matches)
+    assert [call for browser in browsers for call in browser.calls] == []
+
+
+def test_async_token_bucket_limits_rate() -> None:
+    async def acquire_many() -> float:
+        bucket = AsyncTokenBucket(rate=20)
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+        return time.monotonic() - start
+
+    # first token is free, the next four arrive at 20/s
+    assert asyncio.run(acquire_many()) >= 0.19
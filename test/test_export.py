@@ -0,0 +1,91 @@
+import os
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from utils.db import bulk_insert_match_events, get_or_create_match
+from utils.export import (
+    EVENTS,
+    NULL_PARTITION,
+    PartitionedWriter,
+    export,
+    read_watermark,
+    write_watermark,
+)
+from utils.parse import EventRecord
+
+CREATED = datetime(2025, 3, 2, 5, 0, tzinfo=timezone.utc)
+
+
+def event_row(season, event_id, event_type="Try", player="Reece Walsh"):
+    return (season, event_id, 1, 1, "Broncos", player, event_type, 60 * event_id, None, CREATED)
+
+
+def read_dataset(path) -> pa.Table:
+    partitioning = ds.partitioning(pa.schema([("season", pa.int32())]), flavor="hive")
+    return ds.dataset(path, format="parquet", partitioning=partitioning).to_table()
+
+
+def test_partitioned_writer_splits_by_season(tmp_path) -> None:
+    _, schema = EVENTS
+    with PartitionedWriter(str(tmp_path), schema, "part-0.parquet") as writer:
+        writer.write([event_row(2024, 1), event_row(2024, 2)])
+        writer.write([event_row(2024, 3), event_row(2025, 4), event_row(None, 5)])
+
+    assert writer.rows == 5
+    assert sorted(os.listdir(tmp_path)) == ["season=2024", "season=2025", f"season={NULL_PARTITION}"]
+    assert os.listdir(tmp_path / "season=2024") == ["part-0.parquet"]  # no temporary files left
+    table = read_dataset(str(tmp_path)).sort_by("event_id")
+    assert table.column("event_id").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("season").to_pylist() == [2024, 2024, 2024, 2025, None]
+
+
+def test_name_columns_are_dictionary_encoded(tmp_path) -> None:
+    _, schema = EVENTS
+    with PartitionedWriter(str(tmp_path), schema, "part-0.parquet") as writer:
+        writer.write([event_row(2025, i, player=f"Player {i % 3}") for i in range(100)])
+
+    file_schema = pq.read_schema(tmp_path / "season=2025" / "part-0.parquet")
+    for column in ("team", "player", "event_type"):
+        assert pa.types.is_dictionary(file_schema.field(column).type)
+    metadata = pq.ParquetFile(tmp_path / "season=2025" / "part-0.parquet").metadata
+    player = metadata.row_group(0).column(file_schema.get_field_index("player"))
+    assert "RLE_DICTIONARY" in player.encodings
+
+
+def test_watermark_round_trip(tmp_path) -> None:
+    assert read_watermark(str(tmp_path)) is None
+    write_watermark(str(tmp_path), CREATED)
+    assert read_watermark(str(tmp_path)) == CREATED
+
+
+def test_export_is_incremental(session, tmp_path) -> None:
+    data = {
+        "round": 1,
+        "date": datetime(2025, 3, 9, 15, 0),
+        "venue": "Accor Stadium",
+        "home_name": "Export Home",
+        "away_name": "Export Away",
+        "home_score": 6,
+        "away_score": 0,
+        "attendance": "1,000",
+        "ground_conditions": "Dry",
+        "weather": "Fine",
+    }
+    match = get_or_create_match(session, data, 2025, 111)
+    bulk_insert_match_events(session, match.id, [EventRecord("12:00", "Try", "Export Home", "Export Player", None)])
+
+    counts = export(session, str(tmp_path), full=True, lag_seconds=0)
+    assert counts["events"] >= 1
+    events = read_dataset(str(tmp_path / "events"))
+    assert "Export Player" in events.column("player").to_pylist()
+    assert os.path.exists(tmp_path / "teams.parquet")
+
+    # nothing new since the first export
+    counts = export(session, str(tmp_path), lag_seconds=0)
+    assert counts["events"] == 0
+    assert counts["event_players"] == 0
+    assert read_dataset(str(tmp_path / "events")).num_rows == events.num_rows
@@ -0,0 +1,158 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.common.by import By
+
+from utils.cache import PageCache
+from utils.fetch import PLAY_BY_PLAY_TAB, CachingFetcher, Fetcher, HttpFetcher, Page, SeleniumFetcher
+from utils.rate import AdaptiveRateController
+from utils.scrape import draw_page_ready, redirected_to_round
+
+PAGES = {
+    "/draw/?competition=111&round=3&season=2025": '<a class="match--highlighted" href="/m/1/">Storm v Eels</a>',
+    "/empty-draw/": "<div id='vue-draw'></div>",
+    "/match/": '<p class="match-header__title">Round 3</p><div class="match-centre-event__content">Try</div>',
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self) -> None:
+        if self.path == "/draw/?competition=111&season=2025":
+            self.send_response(302)
+            self.send_header("Location", "/draw/?competition=111&round=3&season=2025")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class FakeBrowser(Fetcher):
+    def __init__(self) -> None:
+        self.loaded = []
+
+    def get(self, url, ready=None) -> Page:
+        self.loaded.append(url)
+        return Page(url=url, final_url=url, html="<html>rendered by browser</html>")
+
+    def play_by_play(self, url) -> str:
+        return "<html>browser play by play</html>"
+
+
+@pytest.fixture(scope="module")
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_http_fetcher_serves_server_rendered_page(site) -> None:
+    browser = FakeBrowser()
+    fetcher = HttpFetcher(fallback=browser)
+    page = fetcher.get(f"{site}/draw/?competition=111&round=3&season=2025", draw_page_ready)
+    assert "match--highlighted" in page.html
+    assert browser.loaded == []
+
+
+def test_http_fetcher_follows_redirects(site) -> None:
+    fetcher = HttpFetcher()
+    page = fetcher.get(f"{site}/draw/?competition=111&season=2025", redirected_to_round)
+    assert page.final_url.endswith("/draw/?competition=111&round=3&season=2025")
+
+
+def test_http_fetcher_falls_back_when_page_not_ready(site) -> None:
+    browser = FakeBrowser()
+    fetcher = HttpFetcher(fallback=browser)
+    page = fetcher.get(f"{site}/empty-draw/", draw_page_ready)
+    assert page.html == "<html>rendered by browser</html>"
+    assert browser.loaded == [f"{site}/empty-draw/"]
+    assert fetcher.fallbacks == 1
+
+
+def test_http_fetcher_play_by_play_from_server_html(site) -> None:
+    browser = FakeBrowser()
+    fetcher = HttpFetcher(fallback=browser)
+    fetcher.get(f"{site}/match/")
+    assert "match-centre-event__content" in fetcher.play_by_play(f"{site}/match/")
+    assert browser.loaded == []
+
+
+def test_http_fetcher_play_by_play_falls_back_to_browser(site) -> None:
+    browser = FakeBrowser()
+    fetcher = HttpFetcher(fallback=browser)
+    fetcher.get(f"{site}/empty-draw/")
+    assert fetcher.play_by_play(f"{site}/empty-draw/") == "<html>browser play by play</html>"
+    assert browser.loaded == [f"{site}/empty-draw/"]
+
+
+def test_http_fetcher_without_fallback_raises(site) -> None:
+    with pytest.raises(ValueError):
+        HttpFetcher().get(f"{site}/empty-draw/", draw_page_ready)
+
+
+def test_caching_fetcher_saves_both_tabs(site, tmp_path) -> None:
+    cache = PageCache(str(tmp_path))
+    fetcher = CachingFetcher(HttpFetcher(), cache)
+    fetcher.get(f"{site}/match/")
+    fetcher.play_by_play(f"{site}/match/")
+    assert cache.get(f"{site}/match/") is not None
+    assert cache.get(f"{site}/match/", tab=PLAY_BY_PLAY_TAB) is not None
+
+
+class FakeElement:
+    def is_displayed(self) -> bool:
+        return True
+
+    def is_enabled(self) -> bool:
+        return True
+
+    def click(self) -> None:
+        pass
+
+
+class FakeDriver:
+    """Has a Play by Play tab, and event content only if rendered=True."""
+
+    def __init__(self, rendered: bool) -> None:
+        self.rendered = rendered
+        self.page_source = "<html></html>"
+
+    def find_element(self, by, value):
+        if by == By.CLASS_NAME and not self.rendered:
+            raise NoSuchElementException(value)
+        return FakeElement()
+
+    def quit(self) -> None:
+        pass
+
+
+def test_selenium_play_by_play_waits_for_events() -> None:
+    limiter = AdaptiveRateController(0)
+    fetcher = SeleniumFetcher(limiter, driver_factory=lambda: FakeDriver(rendered=True), wait_timeout=0.1)
+    assert fetcher.play_by_play("https://www.nrl.com/match/") == "<html></html>"
+    assert limiter.interval == 0
+
+
+def test_selenium_play_by_play_times_out_instead_of_returning_no_events() -> None:
+    limiter = AdaptiveRateController(0)
+    fetcher = SeleniumFetcher(limiter, driver_factory=lambda: FakeDriver(rendered=False), wait_timeout=0.1)
+    with pytest.raises(TimeoutException):
+        fetcher.play_by_play("https://www.nrl.com/match/")
+    assert limiter.interval == 1.0
@@ -0,0 +1,139 @@
+import io
+import json
+from pathlib import Path
+
+from utils.fetch import Fetcher, Page
+from utils.live import LiveMatch, LivePoller, event_key
+from utils.parse import iter_event_records, make_soup
+from utils.scrape import ScrapeConfig
+from utils.sinks import NDJSONSink
+
+FIXTURES = Path(__file__).parent / "fixtures"
+FULL_TIME_HTML = (FIXTURES / "match_play_by_play.html").read_text()
+MATCH_PAGE_HTML = (FIXTURES / "match_page.html").read_text()
+
+
+def in_progress_html() -> str:
+    """The fixture as it looked a few minutes before full time: status changed and the latest event missing."""
+    soup = make_soup(FULL_TIME_HTML.replace(">Full Time</p>", ">2nd Half</p>"))
+    soup.find("div", class_="match-centre-event__content").decompose()
+    return str(soup)
+
+
+class Replay(Fetcher):
+    """Serves one play by play page per poll."""
+
+    def __init__(self, pages: list[str], match_page: str = "") -> None:
+        self.pages = pages
+        self.match_page = match_page
+        self.polls = 0
+
+    def get(self, url, ready=None) -> Page:
+        return Page(url=url, final_url=url, html=self.match_page)
+
+    def play_by_play(self, url) -> str:
+        html = self.pages[min(self.polls, len(self.pages) - 1)]
+        self.polls += 1
+        return html
+
+
+class RecordingPoller(LivePoller):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.writes = []
+        self.finished = []
+        self.failed = []
+
+    def _open_match(self, live, data) -> None:
+        live.match_id = 1
+
+    def _write(self, live, score, records) -> bool:
+        self.writes.append((score, records))
+        live.keys.update(event_key(record) for record in records)
+        return True
+
+    def _finish(self, live, html) -> None:
+        self.finished.append(live.path)
+
+    def _fail(self, live) -> None:
+        self.failed.append(live.path)
+
+
+class Broken(Fetcher):
+    def __init__(self) -> None:
+        self.polls = 0
+
+    def get(self, url, ready=None) -> Page:
+        self.polls += 1
+        raise ConnectionError("reset by peer")
+
+
+def make_poller(pages: list[str], fetcher: Fetcher | None = None, sink=None, **kwargs) -> RecordingPoller:
+    config = ScrapeConfig(session=None, fetcher=fetcher or Replay(pages), year=2025, track_state=False, sink=sink)
+    poller = RecordingPoller(config, interval=0, sleep=lambda seconds: None, **kwargs)
+    poller.matches["draw/nrl-premiership/2025/round-5/storm-v-eels/"] = LiveMatch(
+        "draw/nrl-premiership/2025/round-5/storm-v-eels/"
+    )
+    return poller
+
+
+def test_live_poller_writes_only_new_events_until_full_time() -> None:
+    live_html = in_progress_html()
+    poller = make_poller([live_html, live_html, FULL_TIME_HTML])
+
+    poller.poll()
+    assert len(poller.writes) == 1
+    first = poller.writes[0][1]
+    assert len(first) == len({event_key(r) for r in iter_event_records(make_soup(live_html))})
+
+    # an unchanged page is skipped without parsing or writing
+    poller.poll()
+    assert len(poller.writes) == 1
+
+    poller.poll()
+    assert [r.title for r in poller.writes[1][1]] == ["Full Time"]
+    assert poller.writes[1][0] == (30, 12)
+    assert poller.finished == ["draw/nrl-premiership/2025/round-5/storm-v-eels/"]
+    assert not poller.matches
+
+
+def test_live_poller_run_stops_when_all_matches_finish() -> None:
+    poller = make_poller([in_progress_html(), FULL_TIME_HTML])
+    poller.discover = lambda: None
+    poller.run()
+    assert poller.config.fetcher.polls == 2
+    assert not poller.matches
+
+
+def test_live_poller_gives_up_on_a_match_that_never_finishes() -> None:
+    now = [0.0]
+    # e.g. postponed: the page never reaches Full Time
+    poller = make_poller([in_progress_html()], clock=lambda: now[0], max_poll_seconds=3600)
+    poller.discover = lambda: None
+    poller.sleep = lambda seconds: now.__setitem__(0, now[0] + 600)
+    poller.run()
+    assert poller.config.fetcher.polls == 7
+    assert poller.failed == ["draw/nrl-premiership/2025/round-5/storm-v-eels/"]
+    assert poller.finished == []
+    assert not poller.matches
+
+
+def test_live_poller_gives_up_on_a_match_whose_page_keeps_failing() -> None:
+    poller = make_poller([], fetcher=Broken(), max_errors=3)
+    poller.discover = lambda: None
+    poller.run()
+    assert poller.config.fetcher.polls == 3
+    assert poller.failed == ["draw/nrl-premiership/2025/round-5/storm-v-eels/"]
+    assert not poller.matches
+
+
+def test_live_poller_stores_team_lists_once() -> None:
+    stream = io.StringIO()
+    live_html = in_progress_html()
+    poller = make_poller([], fetcher=Replay([live_html, FULL_TIME_HTML], MATCH_PAGE_HTML), sink=NDJSONSink(stream))
+    poller.poll()
+    poller.poll()
+    appearances = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(appearances) == 8
+    assert {a["type"] for a in appearances} == {"appearance"}
+    assert {a["match_id"] for a in appearances} == {1}
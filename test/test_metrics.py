@@ -0,0 +1,102 @@
+import io
+import json
+import threading
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+from fakes import FixtureSite
+from utils.metrics import METRICS, Metrics
+from utils.pool import WorkerPool
+from utils.scrape import ScrapeConfig, parse_draw_page, parse_play_by_play, scrape_round
+from utils.sinks import NDJSONSink
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def test_timers_and_counters_roll_up_into_open_scopes() -> None:
+    metrics = Metrics()
+    with metrics.scope("round", "111/2025/5"):
+        with metrics.scope("match", "storm-v-eels"):
+            with metrics.timer("fetch"):
+                pass
+            metrics.incr("pages_fetched")
+        with metrics.timer("fetch"):
+            pass
+
+    report = metrics.report()
+    assert report["stages"]["fetch"]["count"] == 2
+    assert report["counters"] == {"pages_fetched": 1}
+    [round_] = report["rounds"]
+    [match] = report["matches"]
+    assert match["counters"] == {"pages_fetched": 1}
+    assert round_["counters"] == {"pages_fetched": 1}
+    assert round_["stages"]["fetch"] >= match["stages"]["fetch"]
+
+
+def test_scopes_are_per_thread() -> None:
+    metrics = Metrics()
+    with metrics.scope("match", "a"):
+        thread = threading.Thread(target=metrics.incr, args=("pages_fetched",))
+        thread.start()
+        thread.join()
+    assert metrics.counters["pages_fetched"] == 1
+    assert metrics.report()["matches"][0]["counters"] == {}
+
+
+def test_round_scope_counts_matches_run_by_the_worker_pool() -> None:
+    METRICS.reset()
+    config = ScrapeConfig(
+        session=None, fetcher=FixtureSite(), year=2025, track_state=False, sink=NDJSONSink(io.StringIO()),
+    )
+    pool = WorkerPool(config, 3, lambda: None, FixtureSite)
+    try:
+        scrape_round(config, 5, pool)
+    finally:
+        pool.close()
+
+    _, paths = parse_draw_page((FIXTURES / "draw_page.html").read_text())
+    report = METRICS.report()
+    [round_] = report["rounds"]
+    assert len(report["matches"]) == len(paths) > 1
+    assert round_["counters"]["matches_complete"] == len(paths)
+    assert round_["counters"]["events_inserted"] == report["counters"]["events_inserted"]
+    assert round_["stages"]["fetch"] >= sum(match["stages"]["fetch"] for match in report["matches"])
+
+
+def test_timed_decorator_and_sql_query_counts() -> None:
+    metrics = Metrics()
+    engine = create_engine("sqlite://")
+    metrics.instrument(engine)
+
+    @metrics.timed("db.select_one")
+    def select_one():
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT 1")).scalar()
+
+    assert select_one() == 1
+    assert metrics.stages["db.select_one"].count == 1
+    assert metrics.counters["sql_queries"] == metrics.counters["sql_select"] == 1
+
+
+def test_parse_stages_are_recorded() -> None:
+    from utils.metrics import METRICS
+
+    METRICS.reset()
+    events = parse_play_by_play((FIXTURES / "match_play_by_play.html").read_text())
+    assert METRICS.counters["events_parsed"] == len(events)
+    assert {"parse", "extract"} <= METRICS.stages.keys()
+
+
+def test_report_outputs(tmp_path) -> None:
+    metrics = Metrics()
+    with metrics.timer("fetch"):
+        pass
+    metrics.incr("pages_fetched", 3)
+    metrics.write_json(tmp_path / "report.json")
+    metrics.write_prometheus(tmp_path / "metrics.prom")
+
+    assert json.loads((tmp_path / "report.json").read_text())["counters"] == {"pages_fetched": 3}
+    prom = (tmp_path / "metrics.prom").read_text()
+    assert 'nrl_scraper_stage_seconds_count{stage="fetch"} 1' in prom
+    assert "# TYPE nrl_scraper_pages_fetched_total counter\nnrl_scraper_pages_fetched_total 3" in prom
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from conftest import DATABASE_URL, SERVER_URL
+from utils.db import create_db_session
+from utils.migrate import MIGRATIONS_DIR, apply_migrations
+
+FIXTURES = Path(__file__).parent / "fixtures"
+BASELINE_DB = "migrations_baseline"
+
+# a round with a bye and a match, scraped before seasons were stored
+BASELINE_DATA = """
+INSERT INTO teams (id, name) VALUES (1, 'Storm'), (2, 'Eels'), (3, 'Dolphins');
+INSERT INTO players (id, name) VALUES (1, 'Ryan Papenhuyzen'), (2, 'Mitch Moses');
+INSERT INTO event_types (id, name) VALUES (1, 'Try'), (2, 'Conversion-Made'), (3, 'Handling Error');
+INSERT INTO matches (id, round, date, venue, home_team_id, away_team_id, score_home, score_away)
+VALUES (1, 5, NULL, 'Bye', 3, NULL, NULL, NULL),
+       (2, 5, '2024-04-06 19:35+10', 'AAMI Park', 1, 2, 6, 0);
+INSERT INTO events (id, match_id, team_id, player_id, event_type_id, game_time_sec)
+VALUES (1, 2, 1, 1, 1, 310), (2, 2, 1, 1, 2, 360), (3, 2, 2, 2, 3, 400);
+INSERT INTO event_players (event_id, player_id) VALUES (1, 1);
+INSERT INTO player_appearance (player_id, match_id, team_id, jersey_number) VALUES (1, 2, 1, 1), (2, 2, 2, 7);
+INSERT INTO team_membership (player_id, team_id, start_date) VALUES (1, 1, '2024-04-06');
+SELECT setval('events_id_seq', 3);
+"""
+
+COLUMNS_SQL = """
+    SELECT c.table_name, c.column_name, c.data_type, c.is_nullable
+    FROM information_schema.columns c
+    JOIN pg_class r ON r.relname = c.table_name AND r.relnamespace = 'public'::regnamespace
+    WHERE c.table_schema = 'public' AND NOT r.relispartition
+    ORDER BY 1, 2
+"""
+
+
+@pytest.fixture(scope="function")
+def baseline_session():
+    """A new database with the original schema and some data in it."""
+    server = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    with server.connect() as conn:
+        conn.exec_driver_sql(f"DROP DATABASE IF EXISTS {BASELINE_DB}")
+        conn.exec_driver_sql(f"CREATE DATABASE {BASELINE_DB}")
+    session = create_db_session(f"{SERVER_URL}/{BASELINE_DB}")()
+    schema = (FIXTURES / "baseline_schema.sql").read_text()
+    session.connection().exec_driver_sql(schema + BASELINE_DATA, execution_options={"no_parameters": True})
+    session.commit()
+    yield session
+    session.close()
+    session.get_bind().dispose()
+    with server.connect() as conn:
+        conn.exec_driver_sql(f"DROP DATABASE {BASELINE_DB}")
+    server.dispose()
+
+
+def test_migrations_upgrade_the_baseline_schema(baseline_session, session_factory) -> None:
+    session = baseline_session
+    versions = [path.stem for path in sorted(MIGRATIONS_DIR.glob("*.sql"))]
+    assert apply_migrations(session) == versions
+    assert apply_migrations(session) == []
+
+    # the upgraded database has the columns of one created from ops/create_tables.sql
+    fresh = session_factory()
+    try:
+        assert session.execute(text(COLUMNS_SQL)).all() == fresh.execute(text(COLUMNS_SQL)).all()
+    finally:
+        fresh.close()
+
+    # existing rows were carried over: seasons, partitions, event types and summaries
+    assert session.execute(text("SELECT id, season, competition_id FROM matches ORDER BY id")).all() == [
+        (1, 2024, 111), (2, 2024, 111),
+    ]
+    assert session.execute(text("SELECT count(*) FROM events_2024")).scalar() == 3
+    assert session.execute(text("SELECT count(*) FROM event_players_2024")).scalar() == 1
+    assert session.execute(text("SELECT points FROM event_types WHERE name = 'Try'")).scalar() == 4
+    assert session.execute(text("SELECT team, wins, byes, total_points FROM ladder ORDER BY team")).all() == [
+        ("Dolphins", 0, 1, 2), ("Eels", 0, 0, 0), ("Storm", 1, 0, 2),
+    ]
+    assert session.execute(text("SELECT tries, errors FROM team_stats WHERE team = 'Storm'")).one() == (1, 0)
+    assert session.execute(text("SELECT count(*) FROM player_appearances")).scalar() == 2
+    assert session.execute(text("SELECT count(*) FROM scrape_state")).scalar() == 0
+
+    # and the functions the scraper calls work on them
+    session.execute(text("SELECT refresh_match_stats(2)"))
+    session.execute(text("SELECT ensure_season_partitions(2025)"))
+    session.commit()
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import pytest
+
+from utils.parse import PARSER_BACKENDS, available_backends, get_parser_backend, set_parser_backend
+from utils.scrape import parse_draw_page, parse_match_page, parse_play_by_play
+
+FIXTURES = Path(__file__).parent / "fixtures"
+MATCH_URL = "draw/nrl-premiership/2025/round-5/storm-v-eels/"
+
+
+def parse_fixtures() -> dict:
+    return {
+        "draw": parse_draw_page((FIXTURES / "draw_page.html").read_text()),
+        "bye_round": parse_draw_page((FIXTURES / "bye_round.html").read_text()),
+        "match": parse_match_page((FIXTURES / "match_page.html").read_text(), MATCH_URL),
+        "events": parse_play_by_play((FIXTURES / "match_play_by_play.html").read_text()),
+    }
+
+
+@pytest.fixture
+def backend_results():
+    original = get_parser_backend()
+    results = {}
+    for backend in available_backends():
+        set_parser_backend(backend)
+        results[backend] = parse_fixtures()
+    set_parser_backend(original)
+    return results
+
+
+def test_html_parser_results_on_saved_pages() -> None:
+    original = get_parser_backend()
+    set_parser_backend("html.parser")
+    try:
+        results = parse_fixtures()
+    finally:
+        set_parser_backend(original)
+
+    bye_teams, paths = results["draw"]
+    assert bye_teams == ["Wests Tigers"]
+    assert len(paths) == 8
+    assert sorted(results["bye_round"][0]) == ["Roosters", "Warriors", "Wests Tigers"]
+    assert results["match"][0]["home_name"] == "Storm"
+    assert results["match"][0]["attendance"] == "21,744"
+    appearances = results["match"][0]["appearances"]
+    assert [(a["team_name"], a["jersey_number"]) for a in appearances[:2]] == [("Storm", 1), ("Storm", 7)]
+    grant = next(a for a in appearances if a["player"] == "Harry Grant")
+    assert grant["position"] == "Hooker"
+    assert grant["profile_path"] == "/players/nrl-premiership/storm/harry-grant/"
+    assert grant["stats"] == {
+        "mins_played": 62, "points": 4, "tries": 1, "all_runs": 6, "all_run_metres": 48,
+        "tackles_made": 41, "missed_tackles": 0,
+    }
+    assert next(a for a in appearances if a["player"] == "Tyran Wishart")["stats"]["all_runs"] is None
+    assert {a["team_name"] for a in appearances[4:]} == {"Eels"}
+    assert results["events"][0]["title"] == "Full Time"
+    assert results["events"][-1]["title"] == "Kick Off"
+
+
+@pytest.mark.parametrize("backend", [b for b in PARSER_BACKENDS if b != "html.parser"])
+def test_backends_match_html_parser(backend, backend_results) -> None:
+    if backend not in backend_results:
+        pytest.skip(f"{backend} is not installed")
+    for page, expected in backend_results["html.parser"].items():
+        # bye teams come from a set so compare them sorted
+        if page in ("draw", "bye_round"):
+            assert sorted(backend_results[backend][page][0]) == sorted(expected[0])
+            assert backend_results[backend][page][1] == expected[1]
+        else:
+            assert backend_results[backend][page] == expected, page
+
+
+def test_set_parser_backend_rejects_unknown() -> None:
+    with pytest.raises(ValueError):
+        set_parser_backend("selectolax")
@@ -0,0 +1,124 @@
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from sqlalchemy import delete, select
+
+from models.models import Player, PlayerProfile
+from utils.db import get_or_create_player
+from utils.parse import extract_player_profile, make_soup
+from utils.profiles import (
+    CHANGED,
+    MISSING,
+    UNCHANGED,
+    ProfileFetcher,
+    StaleProfile,
+    enrich_profiles,
+    profile_url,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PROFILE = (FIXTURES / "player_profile.html").read_text()
+ETAG = '"profile-v1"'
+
+
+class ProfileHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    requests = []
+
+    def do_GET(self) -> None:
+        ProfileHandler.requests.append(self.path)
+        if self.path != "/players/nrl-premiership/storm/harry-grant/":
+            self.send_error(404)
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = PROFILE.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ProfileHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_extract_player_profile() -> None:
+    profile = extract_player_profile(make_soup(PROFILE))
+    assert profile["positions"] == ["Hooker"]
+    assert profile["date_of_birth"] == date(1998, 2, 11)
+    assert (profile["height"], profile["weight"]) == (173, 88)
+    assert profile["birthplace"] == "Gerringong, NSW"
+    assert profile["junior_club"] == "Gerringong Lions"
+    assert profile["debut"] == {"club": "Melbourne Storm", "date": "2018-03-15", "opposition": "Wests Tigers", "round": 2}
+    assert profile["career"][1] == {
+        "season": 2025, "team": "Melbourne Storm", "appearances": 21, "tries": 5, "goals": None, "points": 20,
+    }
+    assert extract_player_profile(make_soup("<html><body></body></html>")) == {}
+
+
+def test_profile_url() -> None:
+    assert profile_url("Wests Tigers", "Api Koroisau") == "https://www.nrl.com/players/nrl-premiership/wests-tigers/api-koroisau/"
+
+
+def test_fetcher_skips_unchanged_profiles(site) -> None:
+    fetcher = ProfileFetcher(workers=2)
+    url = f"{site}/players/nrl-premiership/storm/harry-grant/"
+
+    first = fetcher.fetch(StaleProfile(1, "Harry Grant", url))
+    assert first.status == CHANGED
+    assert first.etag == ETAG
+    assert first.fields["weight"] == 88
+
+    # the stored ETag gets a 304 and keeps the stored hash
+    revalidated = fetcher.fetch(StaleProfile(1, "Harry Grant", url, ETAG, None, first.content_hash))
+    assert revalidated.status == UNCHANGED
+    assert revalidated.content_hash == first.content_hash
+    assert not revalidated.fields
+
+    # without a usable ETag an identical body is recognised by its hash and not parsed
+    same_body = fetcher.fetch(StaleProfile(1, "Harry Grant", url, '"other"', None, first.content_hash))
+    assert same_body.status == UNCHANGED
+    assert not same_body.fields
+
+    assert fetcher.fetch(StaleProfile(2, "Nobody", f"{site}/players/nrl-premiership/storm/nobody/")).status == MISSING
+    assert fetcher.fetch(StaleProfile(3, "No Team", None)).status == MISSING
+
+
+def test_enrich_profiles_updates_players_in_bulk(site, session) -> None:
+    player = get_or_create_player(session, "Harry Grant")
+    session.execute(delete(PlayerProfile).where(PlayerProfile.player_id == player.id))
+    session.add(PlayerProfile(player_id=player.id, url=f"{site}/players/nrl-premiership/storm/harry-grant/"))
+    session.commit()
+
+    counts = enrich_profiles(session, ProfileFetcher(workers=2), workers=2, names=["Harry Grant"])
+    assert counts == {CHANGED: 1}
+    session.expire_all()
+    player = session.get(Player, player.id)
+    assert player.height == 173
+    assert player.debut["round"] == 2
+    profile = session.get(PlayerProfile, player.id)
+    assert profile.etag == ETAG and profile.status == CHANGED and profile.changed_at is not None
+
+    # checked just now, so not stale again until max_age_days have passed
+    ProfileHandler.requests.clear()
+    assert enrich_profiles(session, ProfileFetcher(workers=2), workers=2, names=["Harry Grant"]) == {}
+    assert "/players/nrl-premiership/storm/harry-grant/" not in ProfileHandler.requests
+    assert session.execute(select(PlayerProfile.checked_at).where(PlayerProfile.player_id == player.id)).scalar()
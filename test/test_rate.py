@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from utils.rate import AdaptiveRateController, RateLimiter
+
+
+def test_rate_limiter_spaces_requests_across_threads() -> None:
+    limiter = RateLimiter(0.05)
+    starts = []
+
+    def worker() -> None:
+        limiter.wait()
+        starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    starts.sort()
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert all(gap >= 0.045 for gap in gaps)
+
+
+def test_rate_limiter_zero_interval_never_sleeps() -> None:
+    limiter = RateLimiter(0)
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.wait()
+    assert time.monotonic() - start < 0.05
+
+
+def test_adaptive_rate_controller_backs_off_and_recovers() -> None:
+    controller = AdaptiveRateController(0.5, max_interval=4, slow=1.0)
+    controller.record(0.2, ok=False)
+    assert controller.interval == 1.0
+    controller.record(2.0)  # slow response
+    assert controller.interval == 2.0
+    for _ in range(3):
+        controller.record(0.1, ok=False)
+    assert controller.interval == 4  # capped
+    for _ in range(50):
+        controller.record(0.1)
+    assert controller.interval == 0.5  # floor
+
+
+def test_rate_limiter_request_records_failures() -> None:
+    controller = AdaptiveRateController(0)
+    with pytest.raises(ConnectionError):
+        with controller.request():
+            raise ConnectionError("reset by peer")
+    assert controller.interval == 1.0
@@ -0,0 +1,110 @@
+import re
+import threading
+
+import pytest
+
+from utils import state
+from utils.fetch import Fetcher, Page
+from utils.scheduler import Scheduler, Target, parse_numbers, parse_target
+from utils.scrape import BASE_URL, ScrapeConfig
+
+
+class FakeSite(Fetcher):
+    """Every season has 3 finished rounds (round 4 is the latest), each with two matches."""
+
+    def __init__(self, log: list) -> None:
+        self.log = log
+
+    def get(self, url, ready=None) -> Page:
+        self.log.append(url)
+        params = dict(re.findall(r"(\w+)=(\d+)", url))
+        if "round" not in params:
+            return Page(url=url, final_url=f"{url}&round=4", html="")
+        season, round_number = params["season"], params["round"]
+        html = "".join(
+            f'<a class="match--highlighted u-flex-column u-flex-align-items-center u-width-100" '
+            f'href="draw/{params["competition"]}/{season}/round-{round_number}/match-{i}/">match</a>'
+            for i in range(2)
+        )
+        return Page(url=url, final_url=url, html=html)
+
+
+class FakeSession:
+    def close(self) -> None:
+        pass
+
+
+class RecordingScheduler(Scheduler):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.matches = []
+        self._record_lock = threading.Lock()
+
+    def _save_byes(self, config, round_number, bye_teams) -> None:
+        pass
+
+    def _process_match(self, config, path) -> bool:
+        with self._record_lock:
+            self.matches.append(path)
+        return True
+
+
+def make_scheduler(targets, workers=1):
+    log = []
+    config = ScrapeConfig(session=FakeSession(), fetcher=None, track_state=False)
+    scheduler = RecordingScheduler(config, targets, workers, FakeSession, lambda: FakeSite(log))
+    return scheduler, log
+
+
+def test_parse_numbers() -> None:
+    assert parse_numbers("2023-2025") == [2023, 2024, 2025]
+    assert parse_numbers("2019,2021-2022") == [2019, 2021, 2022]
+
+
+def test_parse_target() -> None:
+    assert parse_target("111:2024-2025") == [Target(111, 2024), Target(111, 2025)]
+    assert parse_target("116:2024:1-3@2") == [Target(116, 2024, rounds=(1, 2, 3), priority=2)]
+    with pytest.raises(ValueError):
+        parse_target("111")
+
+
+def test_scheduler_runs_current_round_first_then_history() -> None:
+    scheduler, log = make_scheduler([Target(111, 2024), Target(111, 2025)])
+    counts = scheduler.run()
+
+    assert counts == {"season": 2, "round": 6, "match": 12}
+    draw_pages = [url for url in log if "round=" in url and "&round=4" not in url]
+    rounds = [(re.search(r"season=(\d+)", url).group(1), re.search(r"round=(\d+)", url).group(1)) for url in draw_pages]
+    assert rounds == [("2025", "3"), ("2025", "2"), ("2025", "1"), ("2024", "3"), ("2024", "2"), ("2024", "1")]
+    # a round's matches run before the next round's draw page
+    assert scheduler.matches[:2] == ["draw/111/2025/round-3/match-0/", "draw/111/2025/round-3/match-1/"]
+
+
+def test_scheduler_deduplicates_overlapping_targets() -> None:
+    scheduler, log = make_scheduler(
+        parse_target("111:2025") + parse_target("111:2025:2-3") + parse_target("111:2025"), workers=3
+    )
+    scheduler.run()
+
+    assert sorted(scheduler.matches) == sorted(set(scheduler.matches))
+    assert len(scheduler.matches) == 6
+    assert len([url for url in log if f"{BASE_URL}/draw/" in url]) == 1 + 3
+
+
+def test_scheduler_priority_runs_first() -> None:
+    scheduler, log = make_scheduler([Target(111, 2025, rounds=(1,)), Target(116, 2010, rounds=(1,), priority=-1)])
+    scheduler.run()
+    assert scheduler.matches[0].startswith("draw/116/2010/")
+
+
+def test_scheduler_resumes_from_scrape_state(session_factory) -> None:
+    session = session_factory()
+    state.mark(session, state.ROUND, state.round_key(111, 2099, 2), state.COMPLETE)
+
+    log = []
+    config = ScrapeConfig(session=session, fetcher=None)
+    scheduler = RecordingScheduler(config, parse_target("111:2099:1-2"), 2, session_factory, lambda: FakeSite(log))
+    scheduler.run()
+
+    assert not any("round=2&" in url for url in log)
+    assert state.get_status(session, state.ROUND, state.round_key(111, 2099, 1)) == state.COMPLETE
@@ -3,7 +3,13 @@ from datetime import datetime
 import pytest
 from bs4 import BeautifulSoup
 
-from utils.parse import extract_bye_teams, extract_event_data, extract_match_data, parse_game_time_to_seconds
+from utils.parse import (
+    extract_bye_teams,
+    extract_event_data,
+    extract_match_data,
+    iter_event_records,
+    parse_game_time_to_seconds,
+)
 
 # -- parse_game_time_to_seconds --
 
@@ -66,6 +72,45 @@ def test_parse_event_multiple_players() -> None:
     assert results[1]["player"] == "Brian To'o"
     assert results[1]["role"] == "off"
 
+def test_iter_event_records_matches_extract_event_data() -> None:
+    html = '''
+    <div>
+        <div class="match-centre-event__content">
+            <span class="match-centre-event__timestamp">65:20</span>
+            <h4 class="match-centre-event__title">Interchange #8</h4>
+            <div class="match-centre-event__summary">
+                <p class="match-centre-event__team-name">Panthers</p>
+                <ul>
+                    <li><span>on</span> Nathan Cleary</li>
+                    <li><span>off</span> Brian To'o</li>
+                </ul>
+            </div>
+        </div>
+        <div class="match-centre-event__content">
+            <span class="match-centre-event__timestamp">52:54</span>
+            <h4 class="match-centre-event__title">Try</h4>
+            <div class="match-centre-event__summary">
+                <p class="match-centre-event__team-name">Storm</p>
+                <p class="u-font-weight-500">Cameron Munster</p>
+            </div>
+        </div>
+        <div class="match-centre-event__content">
+            <span class="match-centre-event__timestamp">00:00</span>
+            <h4 class="match-centre-event__title">Kick Off</h4>
+        </div>
+    </div>
+    '''
+    soup = BeautifulSoup(html, "html.parser")
+    expected = [
+        parsed
+        for content in soup.find_all("div", class_="match-centre-event__content")
+        for parsed in extract_event_data(content)
+    ]
+    records = list(iter_event_records(soup))
+    assert records == expected
+    assert records[1]["role"] == "off"
+    assert records[3].get("player") is None
+
 def test_extract_match_data() -> None:
     html = """
     <div>
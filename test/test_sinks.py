@@ -0,0 +1,86 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+from fakes import FixtureSite
+from utils.scrape import ScrapeConfig, process_match_page, scrape_round
+from utils.sinks import NDJSONSink, SQLiteSink, open_sink
+
+def scrape_into(sink) -> None:
+    config = ScrapeConfig(session=None, fetcher=FixtureSite(), year=2025, track_state=False, sink=sink)
+    scrape_round(config, 5)
+
+
+def count(conn: sqlite3.Connection, table: str) -> int:
+    return conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+def test_sqlite_sink_stores_a_round_and_rescrapes_idempotently(tmp_path) -> None:
+    path = tmp_path / "nrl.db"
+    sink = SQLiteSink(str(path))
+    scrape_into(sink)
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute(
+        "SELECT h.name, a.name FROM matches m JOIN teams h ON h.id = m.home_team_id JOIN teams a ON a.id = m.away_team_id"
+    ).fetchall() == [("Storm", "Eels")]
+    before = {table: count(conn, table) for table in ("matches", "events", "player_appearances", "players")}
+    assert before["events"] and before["player_appearances"] == 8
+    stats = conn.execute(
+        "SELECT stats FROM player_appearances pa JOIN players p ON p.id = pa.player_id WHERE p.name = 'Harry Grant'"
+    ).fetchone()[0]
+    assert json.loads(stats)
+
+    # every match page of the draw is the same match, and a second run adds nothing
+    scrape_into(sink)
+    sink.close()
+    assert {table: count(conn, table) for table in before} == before
+
+
+def test_ndjson_sink_streams_typed_records() -> None:
+    stream = io.StringIO()
+    scrape_into(NDJSONSink(stream))
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    types = {record["type"] for record in records}
+    assert types >= {"match", "event", "appearance"}
+    match = next(record for record in records if record["type"] == "match")
+    assert (match["home_name"], match["away_name"], match["season"]) == ("Storm", "Eels", 2025)
+    assert match["date"].startswith("2025-")
+    # the match is written once and its events only for the first of its pages
+    assert sum(record["type"] == "match" for record in records) == 1
+    events = [record for record in records if record["type"] == "event"]
+    assert events and {event["match_id"] for event in events} == {match["match_id"]}
+
+
+class NoTeamLists(NDJSONSink):
+    """Fails to write team lists, as upsert_player_appearances does when its transaction fails."""
+
+    def save_appearances(self, match_id: int, appearances: list[dict]) -> int:
+        return 0
+
+
+def test_failed_team_list_write_fails_the_match() -> None:
+    config = ScrapeConfig(
+        session=None, fetcher=FixtureSite(), year=2025, track_state=False, sink=NDJSONSink(io.StringIO()),
+    )
+    assert process_match_page(config, "draw/nrl-premiership/2025/round-5/storm-v-eels/")
+    config.sink = NoTeamLists(io.StringIO())
+    assert not process_match_page(config, "draw/nrl-premiership/2025/round-5/storm-v-eels/")
+
+
+def test_open_sink(tmp_path) -> None:
+    assert open_sink("postgres") is None
+    assert open_sink("postgresql://user@localhost/nrl") is None
+    sqlite_sink = open_sink(f"sqlite:{tmp_path / 'nrl.db'}")
+    assert isinstance(sqlite_sink, SQLiteSink)
+    sqlite_sink.close()
+    ndjson_sink = open_sink(f"ndjson:{tmp_path / 'out.ndjson'}")
+    assert isinstance(ndjson_sink, NDJSONSink)
+    ndjson_sink.close()
+    assert isinstance(open_sink("ndjson:-"), NDJSONSink)
+    with pytest.raises(ValueError):
+        open_sink("mysql://localhost")
@@ -0,0 +1,229 @@
+"""
+In-memory analytics: load matches and events once into pandas frames and
+compute what the ladder, team_stats and player_stats views compute, plus
+per-minute scoring timelines, with vectorised group-bys. Loaded from the
+database or from a Parquet export (export.py), whole-history and what-if
+queries (another points scheme, the ladder after round N) then run without
+touching the database.
+
+The results follow refresh_match_stats in ops/create_tables.sql: byes count
+as a win with no points for or against, matches without both scores don't
+count.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from sqlalchemy import text
+
+from utils.export import EVENT_TYPE_FLAGS
+
+# ladder points per result, as refresh_match_stats awards them
+DEFAULT_POINTS = {"win": 2, "draw": 1, "loss": 0, "bye": 2}
+
+MATCH_COLUMNS = ["season", "match_id", "round", "home_team", "away_team", "score_home", "score_away"]
+EVENT_COLUMNS = [
+    "season", "match_id", "round", "team", "player", "event_type", "game_time_sec", "points", *EVENT_TYPE_FLAGS,
+]
+
+MATCHES_SQL = """
+    SELECT m.season, m.id AS match_id, m.round, h.name AS home_team, a.name AS away_team,
+           m.score_home, m.score_away
+    FROM matches m
+    JOIN teams h ON h.id = m.home_team_id
+    LEFT JOIN teams a ON a.id = m.away_team_id
+    WHERE CAST(:seasons AS INT[]) IS NULL OR m.season = ANY(:seasons)
+"""
+
+# filtering on events.season reads only the seasons' partitions
+EVENTS_SQL = f"""
+    SELECT e.season, e.match_id, m.round, t.name AS team, p.name AS player,
+           et.name AS event_type, e.game_time_sec, et.points, {", ".join(f"et.{flag}" for flag in EVENT_TYPE_FLAGS)}
+    FROM events e
+    JOIN matches m ON m.id = e.match_id
+    JOIN event_types et ON et.id = e.event_type_id
+    LEFT JOIN teams t ON t.id = e.team_id
+    LEFT JOIN players p ON p.id = e.player_id
+    WHERE CAST(:seasons AS INT[]) IS NULL OR e.season = ANY(:seasons)
+"""
+
+
+def _rank(frame: pd.DataFrame, by: list[str]) -> pd.Series:
+    """SQL RANK() over (PARTITION BY season ORDER BY `by` DESC) for a frame already sorted that way."""
+    position = frame.groupby("season", sort=False).cumcount() + 1
+    return position.groupby([frame["season"], *[frame[column] for column in by]], sort=False).transform("min")
+
+
+class Analytics:
+    """
+    Matches and events of one or more seasons as columnar frames.
+
+    matches: one row per match, MATCH_COLUMNS, away_team is null for a bye.
+    events: one row per event, EVENT_COLUMNS, with the points and flags of
+    its event type.
+    """
+
+    def __init__(self, matches: pd.DataFrame, events: pd.DataFrame):
+        self.matches = matches.reset_index(drop=True)
+        self.events = events.reset_index(drop=True)
+        self._results = None
+
+    @classmethod
+    def from_db(cls, session, seasons: list[int] | None = None) -> "Analytics":
+        params = {"seasons": seasons}
+        matches = pd.DataFrame(session.execute(text(MATCHES_SQL), params).all(), columns=MATCH_COLUMNS)
+        events = pd.DataFrame(session.execute(text(EVENTS_SQL), params).all(), columns=EVENT_COLUMNS)
+        session.rollback()
+        return cls(matches, events)
+
+    @classmethod
+    def from_parquet(cls, directory: str, seasons: list[int] | None = None) -> "Analytics":
+        """Load the matches, events and event_types written by export.py to directory."""
+        partitioning = ds.partitioning(pa.schema([("season", pa.int32())]), flavor="hive")
+        where = ds.field("season").isin(seasons) if seasons else None
+
+        def read(name: str, columns: list[str]) -> pd.DataFrame:
+            dataset = ds.dataset(f"{directory}/{name}", format="parquet", partitioning=partitioning)
+            return dataset.to_table(columns=columns, filter=where).to_pandas()
+
+        matches = read("matches", MATCH_COLUMNS)
+        events = read("events", ["season", "match_id", "round", "team", "player", "event_type", "game_time_sec"])
+        event_types = pd.read_parquet(f"{directory}/event_types.parquet").rename(columns={"name": "event_type"})
+        events = events.astype({"event_type": str}).merge(
+            event_types.drop(columns="id"), on="event_type", how="left"
+        )
+        return cls(matches, events)
+
+    @property
+    def results(self) -> pd.DataFrame:
+        """One row per team per counted match, the in-memory match_results."""
+        if self._results is None:
+            m = self.matches
+            bye = m["away_team"].isna().to_numpy()
+            home_score = m["score_home"].to_numpy(dtype=float)
+            away_score = m["score_away"].to_numpy(dtype=float)
+
+            def side(team, scored, conceded, is_bye):
+                # NaN scores compare False everywhere and leave the status empty
+                status = np.select(
+                    [is_bye, scored > conceded, scored < conceded, scored == conceded],
+                    ["bye", "win", "loss", "draw"], default="",
+                )
+                return pd.DataFrame({
+                    "season": m["season"].to_numpy(),
+                    "match_id": m["match_id"].to_numpy(),
+                    "round": m["round"].to_numpy(),
+                    "team": np.asarray(team, dtype=object),
+                    "status": status,
+                    "points_for": np.where(is_bye, 0, scored),
+                    "points_against": np.where(is_bye, 0, conceded),
+                })
+
+            home = side(m["home_team"], home_score, away_score, bye)
+            away = side(m["away_team"], away_score, home_score, np.zeros(len(m), dtype=bool))[~bye]
+            results = pd.concat([home, away], ignore_index=True)
+            results = results[(results["status"] != "") & results["season"].notna()]
+            self._results = results.astype({
+                "season": "int64", "round": "int64", "points_for": "int64", "points_against": "int64",
+            })
+        return self._results
+
+    def _filter(self, frame: pd.DataFrame, seasons: list[int] | None, max_round: int | None) -> pd.DataFrame:
+        mask = np.ones(len(frame), dtype=bool)
+        if seasons is not None:
+            mask &= frame["season"].isin(seasons).to_numpy()
+        if max_round is not None:
+            mask &= (frame["round"] <= max_round).to_numpy()
+        return frame[mask]
+
+    def ladder(self, seasons: list[int] | None = None, max_round: int | None = None,
+               points: dict[str, int] | None = None) -> pd.DataFrame:
+        """
+        The ladder view, optionally as it stood after max_round or under
+        another points scheme, e.g. points={"win": 3, "draw": 1, "loss": 0, "bye": 2}.
+        """
+        results = self._filter(self.results, seasons, max_round)
+        status = results["status"]
+        scheme = {**DEFAULT_POINTS, **(points or {})}
+        frame = pd.DataFrame({
+            "season": results["season"],
+            "team": results["team"],
+            "games_played": status.isin(["win", "loss", "draw"]),
+            "wins": status == "win",
+            "losses": status == "loss",
+            "draws": status == "draw",
+            "byes": status == "bye",
+            "points_for": results["points_for"],
+            "points_against": results["points_against"],
+            "total_points": status.map(scheme),
+        })
+        ladder = frame.groupby(["season", "team"], as_index=False, sort=False).sum()
+        ladder.insert(9, "points_diff", ladder["points_for"] - ladder["points_against"])
+        ladder = ladder.sort_values(
+            ["season", "total_points", "points_diff", "points_for", "team"],
+            ascending=[True, False, False, False, True], kind="stable",
+        ).reset_index(drop=True)
+        ladder.insert(0, "ladder_position", _rank(ladder, ["total_points", "points_diff", "points_for"]))
+        return ladder.astype({column: "int64" for column in ladder.columns if column not in ("team",)})
+
+    def _event_totals(self, events: pd.DataFrame, by: str) -> pd.DataFrame:
+        frame = pd.DataFrame({
+            "season": events["season"],
+            by: events[by].astype(object),
+            "match_id": events["match_id"].astype("int64"),
+            "total_points": events["points"].astype("int64"),
+            "tries": events["is_try"].astype("int64"),
+            "errors": events["is_error"].astype("int64"),
+            "conversions_kicked": events["is_conversion_made"].astype("int64"),
+            "conversions_missed": events["is_conversion_missed"].astype("int64"),
+            "penalty_conceeded": events["is_penalty_conceded"].astype("int64"),
+            "field_goals": events["is_field_goal_made"].astype("int64"),
+            "field_goals_missed": events["is_field_goal_missed"].astype("int64"),
+        })
+        grouped = frame.groupby(["season", by], dropna=False, sort=False)
+        totals = grouped.sum(numeric_only=True).drop(columns="match_id")
+        totals["matches_played"] = grouped["match_id"].nunique()
+        return totals.reset_index()
+
+    def team_stats(self, seasons: list[int] | None = None, max_round: int | None = None) -> pd.DataFrame:
+        """The team_stats view: event totals per team per season, events without a team are left out."""
+        events = self._filter(self.events, seasons, max_round)
+        totals = self._event_totals(events[events["team"].notna()], "team")
+        return totals.sort_values(["season", "team"], kind="stable").reset_index(drop=True)
+
+    def player_stats(self, seasons: list[int] | None = None, max_round: int | None = None) -> pd.DataFrame:
+        """The player_stats view, events without a player are totalled under a null player."""
+        events = self._filter(self.events, seasons, max_round)
+        totals = self._event_totals(events, "player")[[
+            "season", "player", "total_points", "tries", "errors", "penalty_conceeded", "matches_played",
+        ]]
+        return totals.sort_values(
+            ["total_points", "tries", "errors", "penalty_conceeded", "season", "player"],
+            ascending=[False, False, True, True, True, True], kind="stable",
+        ).reset_index(drop=True)
+
+    def scoring_timeline(self, seasons: list[int] | None = None, teams: list[str] | None = None) -> pd.DataFrame:
+        """
+        Points scored by each team in each minute of each match, with the
+        running total of the match so far. Minutes without points are left out.
+        """
+        events = self._filter(self.events, seasons, None)
+        events = events[(events["points"] > 0) & events["team"].notna()]
+        if teams is not None:
+            events = events[events["team"].isin(teams)]
+        frame = pd.DataFrame({
+            "season": events["season"],
+            "match_id": events["match_id"],
+            "team": events["team"].astype(object),
+            "minute": events["game_time_sec"] // 60,
+            "points": events["points"].astype("int64"),
+            "tries": events["is_try"].astype("int64"),
+        })
+        timeline = frame.groupby(["season", "match_id", "team", "minute"], as_index=False).sum()
+        timeline["cumulative_points"] = timeline.groupby(["match_id", "team"])["points"].cumsum()
+        return timeline
+
+    def points_by_minute(self, seasons: list[int] | None = None, teams: list[str] | None = None) -> pd.DataFrame:
+        """Points and tries per minute of play summed over every match, one row per season and minute."""
+        timeline = self.scoring_timeline(seasons, teams)
+        return timeline.groupby(["season", "minute"], as_index=False)[["points", "tries"]].sum()
@@ -0,0 +1,289 @@
+"""
+Historical backfill: scrape (or replay) whole seasons into CSV staging files,
+COPY them into temporary tables and merge those into the real tables with a
+few set-based statements, instead of writing match by match.
+"""
+import csv
+import os
+from typing import Iterable
+
+from sqlalchemy import text
+
+from utils.fetch import CacheMiss, Fetcher
+from utils.parse import parse_game_time_to_seconds
+from utils.scrape import (
+    BASE_URL,
+    ScrapeConfig,
+    determine_latest_round,
+    draw_page_ready,
+    draw_url,
+    match_page_ready,
+    parse_draw_page,
+    parse_match_page,
+    parse_play_by_play,
+)
+
+# column order of each staging file, also the column list given to COPY
+STAGING_COLUMNS = {
+    "matches": [
+        "key", "url", "competition_id", "season", "round", "date", "venue", "home_name", "away_name",
+        "score_home", "score_away", "attendance", "weather", "ground_conditions", "complete",
+    ],
+    "events": ["match_key", "seq", "title", "team_name", "player", "role", "game_time_sec", "description"],
+    "byes": ["competition_id", "season", "round", "team_name"],
+}
+
+CREATE_STAGING_TABLES = """
+CREATE TEMP TABLE staging_matches (
+    key INT PRIMARY KEY,
+    url VARCHAR(512) NOT NULL,
+    competition_id INT NOT NULL,
+    season INT NOT NULL,
+    round INT NOT NULL,
+    date TIMESTAMP WITH TIME ZONE NOT NULL,
+    venue VARCHAR(255),
+    home_name VARCHAR(255) NOT NULL,
+    away_name VARCHAR(255) NOT NULL,
+    score_home INT,
+    score_away INT,
+    attendance INT,
+    weather VARCHAR(255),
+    ground_conditions VARCHAR(255),
+    complete BOOLEAN NOT NULL
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE staging_events (
+    match_key INT NOT NULL,
+    seq INT NOT NULL,
+    title VARCHAR(100) NOT NULL,
+    team_name VARCHAR(255),
+    player VARCHAR(255),
+    role VARCHAR(50),
+    game_time_sec INT NOT NULL,
+    description TEXT
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE staging_byes (
+    competition_id INT NOT NULL,
+    season INT NOT NULL,
+    round INT NOT NULL,
+    team_name VARCHAR(255) NOT NULL
+) ON COMMIT DROP;
+"""
+
+# Each statement resolves names to ids with joins, the set-based equivalent of
+# the get_or_create helpers in utils/db.py, and relies on the same unique keys.
+MERGE_STATEMENTS = {
+    "teams": """
+        INSERT INTO teams (name)
+        SELECT name FROM (
+            SELECT home_name AS name FROM staging_matches
+            UNION SELECT away_name FROM staging_matches
+            UNION SELECT team_name FROM staging_events WHERE team_name IS NOT NULL
+            UNION SELECT team_name FROM staging_byes
+        ) names
+        ON CONFLICT (name) DO NOTHING
+    """,
+    "event_types": """
+        INSERT INTO event_types (name)
+        SELECT DISTINCT title FROM staging_events
+        ON CONFLICT (name) DO NOTHING
+    """,
+    "event_roles": """
+        INSERT INTO event_roles (role_name)
+        SELECT DISTINCT role FROM staging_events WHERE role IS NOT NULL
+        ON CONFLICT (role_name) DO NOTHING
+    """,
+    "players": """
+        INSERT INTO players (name, positions)
+        SELECT DISTINCT player, '{}'::TEXT[] FROM staging_events WHERE player IS NOT NULL
+        ON CONFLICT (name) DO NOTHING
+    """,
+    "matches": """
+        INSERT INTO matches (competition_id, season, round, date, venue, home_team_id, away_team_id,
+                             score_home, score_away, attendance, weather, ground_conditions)
+        SELECT s.competition_id, s.season, s.round, s.date, s.venue, h.id, a.id,
+               s.score_home, s.score_away, s.attendance, s.weather, s.ground_conditions
+        FROM staging_matches s
+        JOIN teams h ON h.name = s.home_name
+        JOIN teams a ON a.name = s.away_name
+        ORDER BY s.key
+        ON CONFLICT (date, home_team_id, away_team_id) WHERE date IS NOT NULL DO NOTHING
+    """,
+    "staged_match_ids": """
+        CREATE TEMP TABLE staged_match_ids ON COMMIT DROP AS
+        SELECT s.key, m.id AS match_id, m.season
+        FROM staging_matches s
+        JOIN teams h ON h.name = s.home_name
+        JOIN teams a ON a.name = s.away_name
+        JOIN matches m ON m.date = s.date AND m.home_team_id = h.id AND m.away_team_id = a.id
+    """,
+    "partitions": """
+        SELECT ensure_season_partitions(season) FROM (
+            SELECT season FROM staged_match_ids UNION SELECT season FROM staging_byes
+        ) seasons
+    """,
+    # the first row staged for a key wins, as in bulk_insert_match_events
+    "events": """
+        INSERT INTO events (season, match_id, team_id, player_id, event_type_id, game_time_sec, description)
+        SELECT k.season, k.match_id, t.id, p.id, et.id, s.game_time_sec, s.description
+        FROM staging_events s
+        JOIN staged_match_ids k ON k.key = s.match_key
+        JOIN event_types et ON et.name = s.title
+        LEFT JOIN teams t ON t.name = s.team_name
+        LEFT JOIN players p ON p.name = s.player
+        ORDER BY s.match_key, s.seq
+        ON CONFLICT ON CONSTRAINT events_natural_key DO NOTHING
+    """,
+    "event_players": """
+        INSERT INTO event_players (event_id, season, player_id, role_id)
+        SELECT e.id, k.season, p.id, r.id
+        FROM staging_events s
+        JOIN staged_match_ids k ON k.key = s.match_key
+        JOIN event_types et ON et.name = s.title
+        JOIN players p ON p.name = s.player
+        JOIN events e ON e.season = k.season AND e.match_id = k.match_id AND e.event_type_id = et.id
+                     AND e.game_time_sec = s.game_time_sec AND e.player_id = p.id
+        LEFT JOIN event_roles r ON r.role_name = s.role
+        ORDER BY s.match_key, s.seq
+        ON CONFLICT (event_id, player_id, season) DO NOTHING
+    """,
+    # same natural key as create_bye_match
+    "byes": """
+        INSERT INTO matches (venue, competition_id, season, round, home_team_id)
+        SELECT DISTINCT 'Bye', b.competition_id, b.season, b.round, t.id
+        FROM staging_byes b
+        JOIN teams t ON t.name = b.team_name
+        ON CONFLICT (competition_id, season, round, home_team_id) WHERE away_team_id IS NULL DO NOTHING
+    """,
+    "match_stats": """
+        SELECT refresh_match_stats(match_id) FROM staged_match_ids
+        UNION ALL
+        SELECT refresh_match_stats(m.id)
+        FROM staging_byes b
+        JOIN teams t ON t.name = b.team_name
+        JOIN matches m ON m.competition_id = b.competition_id AND m.season = b.season AND m.round = b.round
+                      AND m.home_team_id = t.id AND m.away_team_id IS NULL
+    """,
+    "scrape_state": """
+        INSERT INTO scrape_state (kind, key, status)
+        SELECT 'match', url, CASE WHEN bool_and(complete) THEN 'complete' ELSE 'failed' END
+        FROM staging_matches
+        GROUP BY url
+        ON CONFLICT (kind, key) DO UPDATE SET status = EXCLUDED.status, updated_at = now()
+    """,
+}
+
+
+class StagingWriter:
+    """Appends scraped matches, events and byes to one CSV file per staging table in directory."""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._files = {name: open(staging_path(directory, name), "w", newline="") for name in STAGING_COLUMNS}
+        self._writers = {name: csv.writer(f) for name, f in self._files.items()}
+        for name, columns in STAGING_COLUMNS.items():
+            self._writers[name].writerow(columns)
+        self.matches = 0
+        self.events = 0
+
+    def add_match(self, competition_id: int, season: int, url: str, data: dict, events: list | None) -> None:
+        """Stage a match and its play-by-play, events is None when the play-by-play could not be loaded."""
+        self.matches += 1
+        key = self.matches
+        self._writers["matches"].writerow([
+            key, url, competition_id, season, data["round"], data["date"].isoformat(), data["venue"],
+            data["home_name"], data["away_name"], data["home_score"], data["away_score"],
+            int((data["attendance"] or "0").replace(",", "")), data["weather"], data["ground_conditions"],
+            events is not None,
+        ])
+        for seq, parsed in enumerate(events or []):
+            self._writers["events"].writerow([
+                key, seq, parsed["title"], parsed["team_name"], parsed["player"], parsed.get("role"),
+                parse_game_time_to_seconds(parsed["timestamp"]),
+                parsed.get("role") or parsed.get("players"),
+            ])
+        self.events += len(events or [])
+
+    def add_byes(self, competition_id: int, season: int, round_number: int, bye_teams: list[str]) -> None:
+        for team in bye_teams:
+            self._writers["byes"].writerow([competition_id, season, round_number, team])
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self) -> "StagingWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def staging_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.csv")
+
+
+def stage_match(fetcher: Fetcher, writer: StagingWriter, competition_id: int, season: int, path: str) -> None:
+    url = f"{BASE_URL}/{path}"
+    print(f"Visiting match URL: {path}")
+    try:
+        matches = parse_match_page(fetcher.get(url, match_page_ready).html, path)
+    except CacheMiss as e:
+        print(f"Page not in cache, skipping: {e}")
+        return
+    events = None
+    if matches:
+        try:
+            events = parse_play_by_play(fetcher.play_by_play(url))
+        except Exception as e:
+            print("Error processing events:", e)
+    for data in matches:
+        writer.add_match(competition_id, season, path, data, events)
+
+
+def stage_season(fetcher: Fetcher, writer: StagingWriter, competition_id: int, year: int,
+                 rounds: Iterable[int] | None = None) -> None:
+    """Stage the given rounds of a season, by default every finished round as main.py would scrape."""
+    config = ScrapeConfig(session=None, fetcher=fetcher, year=year, competition_id=competition_id, track_state=False)
+    if rounds is None:
+        try:
+            rounds = range(1, determine_latest_round(config))
+        except CacheMiss as e:
+            print(f"Page not in cache, skipping season {year}: {e}")
+            return
+    for round_number in rounds:
+        print(f"\n========== {year} Round {round_number} ==========")
+        try:
+            html = fetcher.get(draw_url(config, round_number), draw_page_ready).html
+        except CacheMiss as e:
+            print(f"Page not in cache, skipping: {e}")
+            continue
+        bye_teams, paths = parse_draw_page(html)
+        writer.add_byes(competition_id, year, round_number, bye_teams)
+        for path in paths:
+            stage_match(fetcher, writer, competition_id, year, path)
+
+
+def load_staging(session, directory: str) -> dict[str, int]:
+    """
+    COPY the staging files into temporary tables and merge them into the real
+    tables in one transaction. Returns the rows affected per merge step.
+    """
+    try:
+        session.execute(text(CREATE_STAGING_TABLES))
+        # COPY needs the psycopg2 cursor of the session's own connection
+        with session.connection().connection.cursor() as cursor:
+            for name, columns in STAGING_COLUMNS.items():
+                with open(staging_path(directory, name), newline="") as f:
+                    cursor.copy_expert(
+                        f"COPY staging_{name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, HEADER true)", f
+                    )
+        counts = {step: session.execute(text(sql)).rowcount for step, sql in MERGE_STATEMENTS.items()}
+        session.commit()
+    except Exception as e:
+        print(f"Error loading staging files from {directory}: {e}")
+        session.rollback()
+        raise
+    return counts
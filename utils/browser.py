@@ -0,0 +1,164 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+# Requests Chromium drops before they leave the browser (CDP Network.setBlockedURLs
+# patterns). Page data comes from the HTML and nrl.com's own scripts, none of it
+# needs images, media, fonts or third-party trackers.
+BLOCKED_RESOURCES = (
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+)
+BLOCKED_TRACKERS = (
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*facebook.net*", "*facebook.com/tr*", "*scorecardresearch.com*", "*hotjar.com*", "*newrelic.com*",
+    "*nr-data.net*", "*omtrdc.net*", "*demdex.net*", "*adnxs.com*", "*taboola.com*", "*outbrain.com*",
+)
+
+# content settings that stop the resources above being requested at all
+BLOCKING_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+
+
+@dataclass
+class DriverProfile:
+    binary_location: str = "/usr/bin/chromium"
+    # persistent profile directory, each concurrent driver gets its own numbered
+    # subdirectory. None uses a temporary profile removed when the driver quits
+    user_data_dir: str | None = None
+    block_resources: bool = True
+    # recycle the driver after this many page loads, or once Chromium's
+    # processes use more than max_rss_mb, 0 disables either check
+    max_pages: int = 200
+    max_rss_mb: int = 1024
+
+
+def process_tree_rss_mb(pid: int) -> float | None:
+    """Resident memory of pid and all its descendants, from /proc. None where /proc is unavailable."""
+    try:
+        children = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        # the command name may contain spaces, ppid is the second field after it
+                        ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    continue
+                children.setdefault(ppid, []).append(int(entry))
+        total_kb, stack = 0, [pid]
+        while stack:
+            current = stack.pop()
+            try:
+                with open(f"/proc/{current}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total_kb += int(line.split()[1])
+                            break
+            except OSError:
+                pass
+            stack.extend(children.get(current, []))
+        return total_kb / 1024
+    except OSError:
+        return None
+
+
+class DriverFactory:
+    """
+    Creates headless Chromium drivers for a DriverProfile and cleans up after
+    them: release() quits a driver and removes its temporary profile, and any
+    still left are removed when the process exits.
+    """
+
+    def __init__(self, profile: DriverProfile | None = None, chrome=webdriver.Chrome):
+        self.profile = profile or DriverProfile()
+        self.chrome = chrome
+        self._lock = threading.Lock()
+        self._dirs: dict[int, tuple[str, bool]] = {}  # id(driver) -> (profile dir, temporary)
+        atexit.register(self.cleanup)
+
+    def _user_data_dir(self) -> tuple[str, bool]:
+        if self.profile.user_data_dir is None:
+            return tempfile.mkdtemp(prefix="chrome-user-data-"), True
+        # Chromium locks a profile, so concurrent drivers each take the lowest free slot
+        in_use = {path for path, _ in self._dirs.values()}
+        slot = 0
+        while os.path.join(self.profile.user_data_dir, str(slot)) in in_use:
+            slot += 1
+        path = os.path.join(self.profile.user_data_dir, str(slot))
+        os.makedirs(path, exist_ok=True)
+        return path, False
+
+    def options(self, user_data_dir: str) -> Options:
+        options = Options()
+        options.add_argument("--headless")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+        if self.profile.block_resources:
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_argument("--mute-audio")
+            options.add_argument("--autoplay-policy=user-gesture-required")
+            options.add_experimental_option("prefs", BLOCKING_PREFS)
+        options.binary_location = self.profile.binary_location
+        return options
+
+    def __call__(self) -> webdriver.Chrome:
+        with self._lock:
+            user_data_dir, temporary = self._user_data_dir()
+            try:
+                driver = self.chrome(options=self.options(user_data_dir))
+            except Exception:
+                if temporary:
+                    shutil.rmtree(user_data_dir, ignore_errors=True)
+                raise
+            self._dirs[id(driver)] = (user_data_dir, temporary)
+        if self.profile.block_resources:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": [*BLOCKED_RESOURCES, *BLOCKED_TRACKERS]})
+        return driver
+
+    def should_recycle(self, driver: webdriver.Chrome, pages: int) -> bool:
+        """Whether a driver that has loaded `pages` pages should be replaced before the next one."""
+        profile = self.profile
+        if profile.max_pages and pages >= profile.max_pages:
+            return True
+        if profile.max_rss_mb:
+            process = getattr(getattr(driver, "service", None), "process", None)
+            rss = process_tree_rss_mb(process.pid) if process else None
+            if rss is not None and rss > profile.max_rss_mb:
+                print(f"Chromium using {rss:.0f} MB, recycling the driver")
+                return True
+        return False
+
+    def release(self, driver: webdriver.Chrome) -> None:
+        """Quit a driver made by this factory and remove its temporary profile."""
+        try:
+            driver.quit()
+        finally:
+            with self._lock:
+                user_data_dir, temporary = self._dirs.pop(id(driver), (None, False))
+            if temporary:
+                shutil.rmtree(user_data_dir, ignore_errors=True)
+
+    def cleanup(self) -> None:
+        with self._lock:
+            dirs = list(self._dirs.values())
+            self._dirs.clear()
+        for user_data_dir, temporary in dirs:
+            if temporary:
+                shutil.rmtree(user_data_dir, ignore_errors=True)
+
+
+create_driver = DriverFactory()
@@ -0,0 +1,85 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2GB
+
+
+@dataclass
+class CachedPage:
+    url: str
+    final_url: str
+    tab: str
+    html: str
+    fetched_at: float
+
+
+class PageCache:
+    """
+    Content-addressed on-disk cache of fetched HTML.
+
+    Page bodies are stored once per content hash as gzip files under
+    objects/, and small JSON refs under refs/ map (url, tab) to a body. The tab
+    is "" for a page as first loaded and e.g. "play-by-play" for the page after
+    clicking that tab. Once the bodies exceed max_bytes the least recently read
+    or written ones are evicted; refs left pointing at them count as misses.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._objects = self.root / "objects"
+        self._refs = self.root / "refs"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._refs.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self._objects.iterdir())
+
+    @staticmethod
+    def _key(url: str, tab: str) -> str:
+        return hashlib.sha256(f"{url}\n{tab}".encode()).hexdigest()
+
+    def get(self, url: str, tab: str = "") -> CachedPage | None:
+        ref_path = self._refs / f"{self._key(url, tab)}.json"
+        try:
+            ref = json.loads(ref_path.read_text())
+            object_path = self._objects / f"{ref['content_hash']}.html.gz"
+            html = gzip.decompress(object_path.read_bytes()).decode()
+        except FileNotFoundError:
+            return None
+        os.utime(object_path)  # mark as recently used for eviction
+        return CachedPage(url=url, final_url=ref["final_url"], tab=tab, html=html, fetched_at=ref["fetched_at"])
+
+    def put(self, url: str, html: str, tab: str = "", final_url: str | None = None) -> None:
+        body = html.encode()
+        content_hash = hashlib.sha256(body).hexdigest()
+        object_path = self._objects / f"{content_hash}.html.gz"
+        with self._lock:
+            if object_path.exists():
+                os.utime(object_path)
+            else:
+                data = gzip.compress(body)
+                tmp_path = object_path.with_suffix(".tmp")
+                tmp_path.write_bytes(data)
+                tmp_path.replace(object_path)
+                self._size += len(data)
+            ref = {"url": url, "tab": tab, "final_url": final_url or url,
+                   "content_hash": content_hash, "fetched_at": time.time()}
+            (self._refs / f"{self._key(url, tab)}.json").write_text(json.dumps(ref))
+            if self._size > self.max_bytes:
+                self._evict(keep=object_path)
+
+    def _evict(self, keep: Path) -> None:
+        objects = sorted(self._objects.glob("*.html.gz"), key=lambda path: path.stat().st_mtime)
+        for path in objects:
+            if self._size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._size -= path.stat().st_size
+            path.unlink()
@@ -1,11 +1,26 @@
 import os
-from typing import Callable
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Iterable
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, or_, select, text, update
+from sqlalchemy import event as sa_event
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session as OrmSession
 from sqlalchemy.orm import sessionmaker
 
-from models.models import Event, EventPlayer, EventRole, EventType, Match, Player, Team
+from models.models import (
+    Event,
+    EventPlayer,
+    EventRole,
+    EventType,
+    Match,
+    Player,
+    PlayerAppearance,
+    PlayerProfile,
+    Team,
+)
+from utils.metrics import METRICS
 from utils.parse import parse_game_time_to_seconds
 
 DATABASE_URL = (
@@ -15,6 +30,7 @@ DATABASE_URL = (
 
 def create_db_session(database_url: str = DATABASE_URL) -> Callable[[], OrmSession]:
     engine = create_engine(database_url, echo=False)
+    METRICS.instrument(engine)
     return sessionmaker(bind=engine)
 
 
@@ -31,110 +47,513 @@ def commit(session, record) -> None:
         session.rollback()
 
 
+class LookupCache:
+    """
+    Process-wide name -> id cache for the lookup tables (teams, event types,
+    roles and players) shared by all the get_or_create helpers.
+
+    The small tables are cached in full; players sit in a bounded LRU. Any
+    rollback clears the cache, since ids handed out in the rolled back
+    transaction may no longer exist.
+    """
+
+    def __init__(self, max_players: int = 5000):
+        self.max_players = max_players
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.RLock()
+        self._ids = {Team: {}, EventType: {}, EventRole: {}, Player: OrderedDict()}
+
+    def get(self, model, name: str) -> int | None:
+        with self._lock:
+            ids = self._ids[model]
+            id_ = ids.get(name)
+            if id_ is None:
+                self.misses[model.__tablename__] += 1
+                return None
+            if model is Player:
+                ids.move_to_end(name)
+            self.hits[model.__tablename__] += 1
+            return id_
+
+    def put(self, model, name: str, id_: int) -> None:
+        with self._lock:
+            ids = self._ids[model]
+            ids[name] = id_
+            if model is Player:
+                ids.move_to_end(name)
+                while len(ids) > self.max_players:
+                    ids.popitem(last=False)
+
+    def warm(self, session) -> None:
+        """Load the small lookup tables in full."""
+        for model in (Team, EventType, EventRole):
+            column = LOOKUP_COLUMNS[model]
+            for id_, name in session.execute(select(model.id, column)):
+                self.put(model, name, id_)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            for ids in self._ids.values():
+                ids.clear()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {
+                model.__tablename__: {
+                    "hits": self.hits[model.__tablename__],
+                    "misses": self.misses[model.__tablename__],
+                    "size": len(ids),
+                }
+                for model, ids in self._ids.items()
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits.clear()
+            self.misses.clear()
+
+
+LOOKUP_COLUMNS = {Team: Team.name, EventType: EventType.name, EventRole: EventRole.role_name, Player: Player.name}
+LOOKUP_DEFAULTS = {Player: {"positions": [], "date_of_birth": None}}
+LOOKUP_CACHE = LookupCache()
+
+sa_event.listen(OrmSession, "after_rollback", lambda session: LOOKUP_CACHE.invalidate())
+
+
+def _lookup_id(session, model, name: str) -> int | None:
+    """Insert the name if it is new (ON CONFLICT on its unique column) and return its id."""
+    column = LOOKUP_COLUMNS[model]
+    try:
+        id_ = session.execute(
+            insert(model)
+            .values({column.key: name, **LOOKUP_DEFAULTS.get(model, {})})
+            .on_conflict_do_nothing(index_elements=[column.key])
+            .returning(model.id)
+        ).scalar()
+        if id_ is None:
+            # already there, or inserted concurrently by another session
+            id_ = session.execute(select(model.id).where(column == name)).scalar()
+        session.commit()
+    except Exception as e:
+        print(f"Error creating {model.__tablename__} {name!r}: {e}")
+        session.rollback()
+        return None
+    LOOKUP_CACHE.put(model, name, id_)
+    return id_
+
+
+def _get_or_create_lookup(session, model, name: str):
+    id_ = get_lookup_id(session, model, name)
+    return session.get(model, id_) if id_ is not None else None
+
+
+def get_lookup_id(session, model, name: str) -> int | None:
+    """Like the get_or_create helpers but only returns the id, skipping the ORM load."""
+    id_ = LOOKUP_CACHE.get(model, name)
+    if id_ is None:
+        id_ = _lookup_id(session, model, name)
+    return id_
+
+
 def get_or_create_event_type(session, name: str) -> EventType:
-    obj = session.query(EventType).filter_by(name=name).first()
-    if not obj:
-        obj = EventType(name=name)
-        commit(session, obj)
-    return obj
+    return _get_or_create_lookup(session, EventType, name)
 
 
 def get_or_create_team(session, name: str) -> Team:
-    obj = session.query(Team).filter_by(name=name).first()
-    if not obj:
-        obj = Team(name=name)
-        commit(session, obj)
-    return obj
-
-
-def get_or_create_match(session, data) -> Match:
-    home_team = get_or_create_team(session, data["home_name"])
-    away_team = get_or_create_team(session, data["away_name"])
-
-    existing = session.query(Match).filter_by(
-        date=data["date"], home_team_id=home_team.id, away_team_id=away_team.id
-    ).first()
-
-    if existing:
-        return existing
-
-    match = Match(
-        date=data["date"], venue=data["venue"],
-        round=data["round"],
-        home_team_id=home_team.id, away_team_id=away_team.id,
-        score_home=data["home_score"], score_away=data["away_score"],
-        attendance=int((data["attendance"] or "0").replace(",", "")),
-        ground_conditions=data["ground_conditions"], weather=data["weather"]
-    )
-    commit(session, match)
-    return match
+    return _get_or_create_lookup(session, Team, name)
+
+
+# seasons whose events partitions are known to exist
+PARTITIONED_SEASONS: set[int] = set()
+
+
+def ensure_season_partitions(session, season: int) -> None:
+    """Create the season's events and event_players partitions unless this process already has."""
+    if season in PARTITIONED_SEASONS:
+        return
+    try:
+        session.execute(select(func.ensure_season_partitions(season)))
+        session.commit()
+    except Exception as e:
+        print(f"Error creating partitions for season {season}: {e}")
+        session.rollback()
+        raise
+    PARTITIONED_SEASONS.add(season)
+
+
+def _match_season(session, match_id: int) -> int:
+    """The season of a match, whose events partitions then exist."""
+    season = session.execute(select(Match.season).where(Match.id == match_id)).scalar_one()
+    ensure_season_partitions(session, season)
+    return season
+
+
+def _in_match_partition(match_id: int):
+    """
+    Filter on the match's season alongside match_id, so Postgres reads only
+    that season's partition (pruned at execution time).
+    """
+    return Event.season == select(Match.season).where(Match.id == match_id).scalar_subquery()
+
+
+@METRICS.timed("db.get_or_create_match")
+def get_or_create_match(session, data, season: int, competition_id: int) -> Match:
+    home_team_id = get_lookup_id(session, Team, data["home_name"])
+    away_team_id = get_lookup_id(session, Team, data["away_name"])
+
+    # idx_matches_date_teams makes (date, home, away) the match's natural key
+    try:
+        match_id = session.execute(
+            insert(Match)
+            .values(
+                competition_id=competition_id, season=season,
+                date=data["date"], venue=data["venue"],
+                round=data["round"],
+                home_team_id=home_team_id, away_team_id=away_team_id,
+                score_home=data["home_score"], score_away=data["away_score"],
+                attendance=int((data["attendance"] or "0").replace(",", "")),
+                ground_conditions=data["ground_conditions"], weather=data["weather"]
+            )
+            .on_conflict_do_nothing(
+                index_elements=["date", "home_team_id", "away_team_id"], index_where=Match.date.isnot(None)
+            )
+            .returning(Match.id)
+        ).scalar()
+        if match_id is None:
+            match_id = session.execute(select(Match.id).filter_by(
+                date=data["date"], home_team_id=home_team_id, away_team_id=away_team_id
+            )).scalar()
+        session.commit()
+    except Exception as e:
+        print(f"Error creating match {data['home_name']} v {data['away_name']}: {e}")
+        session.rollback()
+        raise
+    return session.get(Match, match_id)
+
+@METRICS.timed("db.match_has_events")
+def match_has_events(session, match_id: int) -> bool:
+    """Checks with EXISTS rather than loading match.events just to count them."""
+    return session.query(
+        session.query(Event).filter(Event.match_id == match_id, _in_match_partition(match_id)).exists()
+    ).scalar()
+
+@METRICS.timed("db.match_event_keys")
+def match_event_keys(session, match_id: int) -> set[tuple[str, int, str | None]]:
+    """The (event type, game time, player name) of every stored event, the names form of events_natural_key."""
+    return set(session.execute(
+        select(EventType.name, Event.game_time_sec, Player.name)
+        .join(EventType, Event.event_type_id == EventType.id)
+        .outerjoin(Player, Event.player_id == Player.id)
+        .where(Event.match_id == match_id, _in_match_partition(match_id))
+    ).all())
+
+@METRICS.timed("db.update_match_score")
+def update_match_score(session, match_id: int, score_home: int, score_away: int) -> bool:
+    """Set a match's score, returns whether it changed."""
+    try:
+        result = session.execute(
+            update(Match)
+            .where(Match.id == match_id, or_(
+                Match.score_home.is_distinct_from(score_home), Match.score_away.is_distinct_from(score_away)
+            ))
+            .values(score_home=score_home, score_away=score_away)
+        )
+        session.commit()
+        return result.rowcount > 0
+    except Exception as e:
+        print(f"Error updating score for match {match_id}: {e}")
+        session.rollback()
+        return False
 
 def get_or_create_player(session, name: str) -> Player:
-    obj = session.query(Player).filter_by(name=name).first()
-    if not obj:
-        obj = Player(name=name, positions=[], date_of_birth=None)
-        commit(session, obj)
-    return obj
+    return _get_or_create_lookup(session, Player, name)
 
 def get_or_create_event_role(session, role_name: str) -> EventRole:
-    obj = session.query(EventRole).filter_by(role_name=role_name).first()
-    if not obj:
-        obj = EventRole(role_name=role_name)
-        commit(session, obj)
-    return obj
+    return _get_or_create_lookup(session, EventRole, role_name)
 
+@METRICS.timed("db.get_or_create_event")
 def get_or_create_event(session, match_id: int, parsed_event: dict) -> Event:
     """
     Get or create an Event based on match_id, event_type, player, and timestamp.
     Inserts both Event and EventPlayer rows.
     """
-    event_type = get_or_create_event_type(session, parsed_event["title"])
-    team = get_or_create_team(session, parsed_event["team_name"]) if parsed_event["team_name"] else None
-    player = get_or_create_player(session, parsed_event["player"]) if parsed_event["player"] else None
+    event_type_id = get_lookup_id(session, EventType, parsed_event["title"])
+    team_id = get_lookup_id(session, Team, parsed_event["team_name"]) if parsed_event["team_name"] else None
+    player_id = get_lookup_id(session, Player, parsed_event["player"]) if parsed_event["player"] else None
+    role = parsed_event.get("role")
+    role_id = get_lookup_id(session, EventRole, role) if role else None
     game_time = parse_game_time_to_seconds(parsed_event["timestamp"])
-    description = parsed_event.get("role") or parsed_event.get("players")
-
-    # Duplicate check: adjust criteria as needed (timestamp, type, player, match)
-    existing = session.query(Event).filter_by(
-        match_id=match_id,
-        event_type_id=event_type.id,
-        game_time_sec=game_time,
-        player_id=player.id if player else None,
-    ).first()
-
-    if existing:
-        return existing
-
-    event = Event(
-        match_id=match_id,
-        team_id=team.id if team else None,
-        player_id=player.id if player else None,
-        event_type_id=event_type.id,
-        game_time_sec=game_time,
-        description=description,
+    description = role or parsed_event.get("players")
+
+    # events_natural_key is the duplicate check: (match, type, time, player)
+    try:
+        season = _match_season(session, match_id)
+        event_id = session.execute(
+            insert(Event)
+            .values(
+                season=season,
+                match_id=match_id,
+                team_id=team_id,
+                player_id=player_id,
+                event_type_id=event_type_id,
+                game_time_sec=game_time,
+                description=description,
+            )
+            .on_conflict_do_nothing(constraint="events_natural_key")
+            .returning(Event.id)
+        ).scalar()
+        if event_id is None:
+            event_id = session.execute(select(Event.id).filter_by(
+                season=season, match_id=match_id, event_type_id=event_type_id, game_time_sec=game_time,
+                player_id=player_id,
+            )).scalar()
+        elif player_id:
+            session.execute(
+                insert(EventPlayer)
+                .values(event_id=event_id, season=season, player_id=player_id, role_id=role_id)
+                .on_conflict_do_nothing(index_elements=["event_id", "player_id", "season"])
+            )
+        session.commit()
+    except Exception as e:
+        print(f"Error writing event {parsed_event} for match {match_id}: {e}")
+        session.rollback()
+        return None
+    return session.get(Event, {"id": event_id, "season": season})
+
+@METRICS.timed("db.create_bye_match")
+def create_bye_match(session, team_name: str, round_number: int, season: int, competition_id: int) -> Match:
+    """Create a match for a team that has a bye in the given round."""
+    team_id = get_lookup_id(session, Team, team_name)
+    key = {"competition_id": competition_id, "season": season, "round": round_number, "home_team_id": team_id}
+    # idx_matches_bye makes (competition, season, round, team) a bye's natural key
+    try:
+        match_id = session.execute(
+            insert(Match)
+            .values(venue="Bye", **key)
+            .on_conflict_do_nothing(
+                index_elements=list(key), index_where=Match.away_team_id.is_(None)
+            )
+            .returning(Match.id)
+        ).scalar()
+        if match_id is None:
+            print(f"Bye match already exists for {team_name} in round {round_number}.")
+            match_id = session.execute(select(Match.id).filter_by(away_team_id=None, **key)).scalar()
+        session.commit()
+    except Exception as e:
+        print(f"Error creating bye for {team_name} in round {round_number}: {e}")
+        session.rollback()
+        raise
+    return session.get(Match, match_id)
+
+
+@METRICS.timed("db.refresh_match_stats")
+def refresh_match_stats(session, match_id: int) -> None:
+    """
+    Rebuild a match's rows in the summary tables behind the ladder, team_stats
+    and player_stats views (see refresh_match_stats in ops/create_tables.sql).
+    """
+    try:
+        session.execute(select(func.refresh_match_stats(match_id)))
+        session.commit()
+    except Exception as e:
+        print(f"Error refreshing stats for match {match_id}: {e}")
+        session.rollback()
+
+
+def _cached_ids(model, names: set[str]) -> tuple[dict[str, int], set[str]]:
+    """Split names into those already in LOOKUP_CACHE and those still to resolve."""
+    ids = {}
+    for name in names:
+        id_ = LOOKUP_CACHE.get(model, name)
+        if id_ is not None:
+            ids[name] = id_
+    return ids, names - ids.keys()
+
+
+def _upsert_lookup(session, model, names: set[str]) -> dict[str, int]:
+    """
+    Insert any missing names into a unique lookup column in one statement and
+    return a name -> id map for all of them.
+    """
+    ids, missing = _cached_ids(model, names)
+    if not missing:
+        return ids
+    column = LOOKUP_COLUMNS[model]
+    session.execute(
+        insert(model)
+        .values([{column.key: name, **LOOKUP_DEFAULTS.get(model, {})} for name in missing])
+        .on_conflict_do_nothing(index_elements=[column.key])
     )
-    commit(session, event)
+    for id_, name in session.execute(select(model.id, column).where(column.in_(missing))):
+        ids[name] = id_
+    return ids
 
-    if player:
-        ep = EventPlayer(event_id=event.id, player_id=player.id, 
-                         role_id=get_or_create_event_role(session, parsed_event.get("role", "")).id)
-        commit(session, ep)
 
-    return event
+@METRICS.timed("db.bulk_insert_match_events")
+def bulk_insert_match_events(session, match_id: int, parsed_events: Iterable[dict]) -> int:
+    """
+    Write all parsed play-by-play events for a match in a single transaction.
 
-def create_bye_match(session, team_name: str, round_number: int) -> None:
-    """Create a match for a team that has a bye in the given round."""
-    team = get_or_create_team(session, team_name)
-    match_exists = session.query(Match).filter_by(
-        round=round_number, home_team_id=team.id, away_team_id=None
-    ).first()
-    if match_exists:
-        print(f"Bye match already exists for {team_name} in round {round_number}.")
-        return
-    else:
-        match = Match(
-            venue="Bye",
-            round=round_number,
-            home_team_id=team.id
+    Lookups (event types, teams, players, roles) are resolved with one
+    multi-row insert each, then the events and event_players rows are written
+    with one statement each. Events already stored for the match are skipped
+    by ON CONFLICT on events_natural_key, the same key get_or_create_event
+    uses. Returns the number of new events.
+    """
+    parsed_events = list(parsed_events)
+    if not parsed_events:
+        return 0
+    try:
+        season = _match_season(session, match_id)
+        event_type_ids = _upsert_lookup(session, EventType, {p["title"] for p in parsed_events})
+        team_ids = _upsert_lookup(session, Team, {p["team_name"] for p in parsed_events if p["team_name"]})
+        player_ids = _upsert_lookup(session, Player, {p["player"] for p in parsed_events if p["player"]})
+        role_ids = _upsert_lookup(session, EventRole, {p["role"] for p in parsed_events if p.get("role")})
+
+        events = {}
+        event_players = []
+        for parsed in parsed_events:
+            player_id = player_ids.get(parsed["player"])
+            key = (event_type_ids[parsed["title"]], parse_game_time_to_seconds(parsed["timestamp"]), player_id)
+            if key in events:
+                continue
+            events[key] = {
+                "season": season,
+                "match_id": match_id,
+                "team_id": team_ids.get(parsed["team_name"]),
+                "player_id": player_id,
+                "event_type_id": key[0],
+                "game_time_sec": key[1],
+                "description": parsed.get("role") or parsed.get("players"),
+            }
+            # Events without a role get a NULL role_id, as in get_or_create_event
+            if player_id:
+                event_players.append((key, player_id, role_ids.get(parsed.get("role"))))
+
+        rows = session.execute(
+            insert(Event)
+            .values(list(events.values()))
+            .on_conflict_do_nothing(constraint="events_natural_key")
+            .returning(Event.id, Event.event_type_id, Event.game_time_sec, Event.player_id)
         )
-        commit(session, match)
+        # only the events actually inserted come back
+        event_ids = {tuple(row[1:]): row[0] for row in rows}
+        event_players = [
+            {"event_id": event_ids[key], "season": season, "player_id": player_id, "role_id": role_id}
+            for key, player_id, role_id in event_players if key in event_ids
+        ]
+        if event_players:
+            session.execute(
+                insert(EventPlayer)
+                .values(event_players)
+                .on_conflict_do_nothing(index_elements=["event_id", "player_id", "season"])
+            )
+        session.commit()
+        # only cache ids once they are committed
+        for model, ids in ((EventType, event_type_ids), (Team, team_ids), (Player, player_ids), (EventRole, role_ids)):
+            for name, id_ in ids.items():
+                LOOKUP_CACHE.put(model, name, id_)
+        return len(event_ids)
+    except Exception as e:
+        print(f"Error writing events for match {match_id}: {e}")
+        session.rollback()
+        return 0
+
+
+# A membership is a spell at one team: consecutive appearances (by match
+# date) for the same team, ending when the player first appears for another.
+TEAM_MEMBERSHIPS_SQL = """
+    WITH played AS (
+        SELECT pa.player_id, pa.team_id, m.date::date AS played_on,
+               LAG(pa.team_id) OVER (PARTITION BY pa.player_id ORDER BY m.date) AS previous_team_id
+        FROM player_appearances pa
+        JOIN matches m ON m.id = pa.match_id
+        WHERE m.date IS NOT NULL AND (CAST(:player_ids AS INT[]) IS NULL OR pa.player_id = ANY(:player_ids))
+    ), spells AS (
+        SELECT player_id, team_id, played_on,
+               COUNT(*) FILTER (WHERE previous_team_id IS DISTINCT FROM team_id)
+                   OVER (PARTITION BY player_id ORDER BY played_on) AS spell
+        FROM played
+    ), spans AS (
+        SELECT player_id, team_id, MIN(played_on) AS start_date
+        FROM spells
+        GROUP BY player_id, team_id, spell
+    )
+    INSERT INTO team_memberships (player_id, team_id, start_date, end_date)
+    SELECT player_id, team_id, start_date,
+           LEAD(start_date) OVER (PARTITION BY player_id ORDER BY start_date)
+    FROM spans
+"""
+
+
+def refresh_team_memberships(session, player_ids: list[int] | None = None) -> None:
+    """
+    Rebuild the team_memberships of the given players (all players when None)
+    from their player_appearances, in the caller's transaction.
+    """
+    params = {"player_ids": player_ids}
+    session.execute(
+        text("DELETE FROM team_memberships WHERE CAST(:player_ids AS INT[]) IS NULL OR player_id = ANY(:player_ids)"),
+        params,
+    )
+    session.execute(text(TEAM_MEMBERSHIPS_SQL), params)
+
+
+@METRICS.timed("db.upsert_player_appearances")
+def upsert_player_appearances(session, match_id: int, appearances: Iterable[dict]) -> int:
+    """
+    Write the team lists of a match (extract_team_lists) in a single
+    transaction: teams and players are resolved with one multi-row insert
+    each, then every appearance is upserted with one statement, so a rescrape
+    updates the stats. The profile URLs found are saved to player_profiles and
+    the players' team memberships rederived. Returns the number of appearances.
+    """
+    appearances = [a for a in appearances if a.get("player") and a.get("team_name")]
+    if not appearances:
+        return 0
+    try:
+        team_ids = _upsert_lookup(session, Team, {a["team_name"] for a in appearances})
+        player_ids = _upsert_lookup(session, Player, {a["player"] for a in appearances})
+
+        rows, profiles = {}, {}
+        for a in appearances:
+            player_id = player_ids[a["player"]]
+            rows[player_id] = {
+                "match_id": match_id,
+                "player_id": player_id,
+                "team_id": team_ids[a["team_name"]],
+                "jersey_number": a.get("jersey_number"),
+                "position": a.get("position"),
+                "stats": a.get("stats") or {},
+            }
+            if a.get("profile_url"):
+                profiles[player_id] = {"player_id": player_id, "url": a["profile_url"]}
+
+        stmt = insert(PlayerAppearance).values(list(rows.values()))
+        session.execute(stmt.on_conflict_do_update(
+            constraint="player_appearances_match_player_key",
+            set_={
+                "team_id": stmt.excluded.team_id,
+                "jersey_number": stmt.excluded.jersey_number,
+                "position": stmt.excluded.position,
+                "stats": stmt.excluded.stats,
+            },
+        ))
+        if profiles:
+            stmt = insert(PlayerProfile).values(list(profiles.values()))
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=["player_id"],
+                set_={"url": stmt.excluded.url},
+                where=PlayerProfile.url.is_distinct_from(stmt.excluded.url),
+            ))
+        refresh_team_memberships(session, list(rows))
+        session.commit()
+        for model, ids in ((Team, team_ids), (Player, player_ids)):
+            for name, id_ in ids.items():
+                LOOKUP_CACHE.put(model, name, id_)
+        return len(rows)
+    except Exception as e:
+        print(f"Error writing team lists for match {match_id}: {e}")
+        session.rollback()
+        return 0
@@ -0,0 +1,240 @@
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Callable, Iterable
+from urllib.parse import urlparse
+
+from utils import state
+from utils.fetch import CacheMiss, Fetcher
+from utils.metrics import METRICS
+from utils.parse import EventRecord
+from utils.rate import AsyncTokenBucket
+from utils.scrape import (
+    BASE_URL,
+    ScrapeConfig,
+    draw_page_ready,
+    draw_url,
+    mark_state,
+    match_page_ready,
+    parse_draw_page,
+    parse_match_page,
+    parse_play_by_play,
+    save_appearances,
+    save_byes,
+    save_events,
+)
+
+
+@dataclass
+class ParsedRound:
+    round_number: int
+    bye_teams: list[str]
+
+
+@dataclass
+class ParsedMatch:
+    round_number: int
+    url: str
+    data: dict | None
+    # None when the page or its play by play could not be loaded, or was not needed
+    events: list[EventRecord] | None
+    html: str | None = None
+    # the id the sink gave the match, saved before its play by play was fetched
+    match_id: int | None = None
+    has_events: bool = False
+
+
+@dataclass
+class RoundDone:
+    """Queued after all of a round's matches, so the writer can mark the round complete."""
+    round_number: int
+    html: str
+
+
+class AsyncEngine:
+    """
+    Scrapes rounds with asyncio: draw and match pages are fetched as tasks
+    bounded by a concurrency semaphore and a per-host token bucket, retried
+    with exponential backoff, and parsed results go through a bounded queue
+    to a single writer task. Fetching, parsing and DB writes overlap instead
+    of running one after another.
+
+    Fetchers and the DB session are blocking, so they run in worker threads.
+    Each concurrent task borrows its own fetcher from a pool of `concurrency`
+    fetchers. Only the writer task touches config.session, apart from the
+    scrape_state lookups and the match saves made under config.db_lock: a
+    match is saved as soon as its page is parsed, so its play by play is only
+    fetched when the sink has no events for it yet.
+    """
+
+    def __init__(self, config: ScrapeConfig, fetcher_factory: Callable[[], Fetcher], concurrency: int = 4,
+                 rate: float = 1.0, retries: int = 3, backoff: float = 1.0, queue_size: int = 16):
+        self.config = config
+        self.fetcher_factory = fetcher_factory
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.queue_size = queue_size
+        self._buckets: dict[str, AsyncTokenBucket] = {}
+
+    def _bucket(self, url: str) -> AsyncTokenBucket:
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = AsyncTokenBucket(self.rate)
+        return self._buckets[host]
+
+    async def _call(self, url: str, fn, *args, retries: int | None = None):
+        """Run a blocking fetcher call for url in a thread, rate limited and retried with backoff."""
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            await self._bucket(url).acquire()
+            try:
+                # time the call itself, not the wait for a token
+                with METRICS.timer("play_by_play" if fn.__name__ == "play_by_play" else "fetch"):
+                    return await asyncio.to_thread(fn, *args)
+            except CacheMiss:
+                raise
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                print(f"Error fetching {url} ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def _save_match(self, data: dict) -> tuple[int, bool]:
+        """Save a match through the sink, returns its id and whether the sink already has its events."""
+        config = self.config
+        sink = config.get_sink()
+        with config.db_lock, METRICS.timer("db_write"):
+            match_id = sink.save_match(data, int(config.year), config.competition_id)
+            return match_id, sink.has_events(match_id)
+
+    async def _scrape_match(self, round_number: int, path: str) -> None:
+        url = f"{BASE_URL}/{path}"
+        html, saved, events = None, [], None
+        async with self._semaphore:
+            fetcher = await self._fetchers.get()
+            try:
+                print(f"Visiting match URL: {path}")
+                page = await self._call(url, fetcher.get, url, match_page_ready)
+                html = page.html
+                matches = await asyncio.to_thread(parse_match_page, page.html, path)
+                saved = [(data, *await asyncio.to_thread(self._save_match, data)) for data in matches]
+                if all(has_events for _, _, has_events in saved):
+                    print(f"Match {path} already has events, skipping event scraping.")
+                else:
+                    try:
+                        # the click acts on the page get() just loaded, so it is not retried on its own
+                        html = await self._call(url, fetcher.play_by_play, url, retries=0)
+                        events = await asyncio.to_thread(parse_play_by_play, html)
+                    except Exception as e:
+                        print("Error processing events:", e)
+            except Exception as e:
+                print(f"Error scraping match {path}: {e}")
+                saved = []
+            finally:
+                self._fetchers.put_nowait(fetcher)
+        if not saved:
+            await self._results.put(ParsedMatch(round_number=round_number, url=path, data=None, events=None))
+        for data, match_id, has_events in saved:
+            await self._results.put(ParsedMatch(round_number=round_number, url=path, data=data, events=events,
+                                                html=html, match_id=match_id, has_events=has_events))
+
+    def _start_round(self, round_number: int) -> bool:
+        """Marks the round in progress, or returns False when scrape_state says it is already complete."""
+        config = self.config
+        if not config.track_state:
+            return True
+        key = state.round_key(config.competition_id, config.year, round_number)
+        with config.db_lock:
+            if state.get_status(config.session, state.ROUND, key) == state.COMPLETE:
+                return False
+            mark_state(config, state.ROUND, key, state.IN_PROGRESS)
+        return True
+
+    def _pending_matches(self, paths: list[str]) -> list[str]:
+        config = self.config
+        if not config.track_state:
+            return paths
+        with config.db_lock:
+            done = state.completed_keys(config.session, state.MATCH, paths)
+        return [path for path in paths if path not in done]
+
+    async def _scrape_round(self, round_number: int) -> None:
+        if not await asyncio.to_thread(self._start_round, round_number):
+            print(f"Round {round_number} already complete, skipping.")
+            return
+        url = draw_url(self.config, round_number)
+        async with self._semaphore:
+            fetcher = await self._fetchers.get()
+            try:
+                page = await self._call(url, fetcher.get, url, draw_page_ready)
+            except Exception as e:
+                print(f"Error scraping round {round_number}: {e}")
+                return
+            finally:
+                self._fetchers.put_nowait(fetcher)
+        bye_teams, paths = parse_draw_page(page.html)
+        paths = await asyncio.to_thread(self._pending_matches, paths)
+        await self._results.put(ParsedRound(round_number=round_number, bye_teams=bye_teams))
+        await asyncio.gather(*(self._scrape_match(round_number, path) for path in paths))
+        await self._results.put(RoundDone(round_number=round_number, html=page.html))
+
+    def _save(self, result: ParsedRound | ParsedMatch | RoundDone) -> bool:
+        """Write one result, returns False if anything in it could not be stored."""
+        config = self.config
+        if isinstance(result, ParsedRound):
+            save_byes(config, result.round_number, result.bye_teams)
+            return True
+        if isinstance(result, RoundDone):
+            key = state.round_key(config.competition_id, config.year, result.round_number)
+            complete = result.round_number not in self._failed_rounds
+            mark_state(config, state.ROUND, key, state.COMPLETE if complete else state.IN_PROGRESS, result.html)
+            return True
+        ok = result.data is not None and result.events is not None
+        if result.data is not None:
+            sink = config.get_sink()
+            match_id = result.match_id
+            appearances_ok = save_appearances(config, match_id, result.data.get("appearances"))
+            if result.has_events:
+                ok = True
+            elif result.events is not None:
+                save_events(config, match_id, result.events)
+            with config.db_lock:
+                sink.match_done(match_id)
+            ok = ok and appearances_ok
+        mark_state(config, state.MATCH, result.url, state.COMPLETE if ok else state.FAILED, result.html)
+        return ok
+
+    async def _writer(self) -> None:
+        while True:
+            result = await self._results.get()
+            try:
+                if result is None:
+                    return
+                if not await asyncio.to_thread(self._save, result):
+                    self._failed_rounds.add(result.round_number)
+            except Exception as e:
+                print(f"Error saving {result}: {e}")
+                self._failed_rounds.add(result.round_number)
+            finally:
+                self._results.task_done()
+
+    async def run(self, rounds: Iterable[int]) -> None:
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._results = asyncio.Queue(maxsize=self.queue_size)
+        self._failed_rounds: set[int] = set()
+        self._fetchers = asyncio.Queue()
+        fetchers = [self.fetcher_factory() for _ in range(self.concurrency)]
+        for fetcher in fetchers:
+            self._fetchers.put_nowait(fetcher)
+        writer = asyncio.create_task(self._writer())
+        try:
+            await asyncio.gather(*(self._scrape_round(round_number) for round_number in rounds))
+            await self._results.put(None)
+            await writer
+        finally:
+            writer.cancel()
+            for fetcher in fetchers:
+                await asyncio.to_thread(fetcher.close)
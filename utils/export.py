@@ -0,0 +1,290 @@
+"""
+Columnar export for analytics: stream matches, events, event_players and the
+lookup tables out of Postgres in chunks over server-side cursors and write
+them as Parquet, so analysis runs against files instead of competing with
+the scraper's writes.
+
+Matches, events and event_players are partitioned by season into hive style
+season=<year> directories. Events and event_players are exported
+incrementally on events.created_at, each run adding one part file per season
+with only the rows added since the previous run. Matches and the lookup
+tables are small and rewritten every run.
+
+    <directory>/teams.parquet, players.parquet, event_types.parquet, event_roles.parquet
+    <directory>/matches/season=2025/part-0.parquet
+    <directory>/events/season=2025/part-<since>.parquet
+    <directory>/event_players/season=2025/part-<since>.parquet
+    <directory>/_export_state.json
+"""
+import itertools
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+DEFAULT_CHUNK_SIZE = 10000
+# events are stamped with the start time of the transaction that wrote them,
+# rows newer than this are left to the next run in case earlier stamped
+# transactions have not committed yet
+DEFAULT_LAG_SECONDS = 60
+STATE_FILE = "_export_state.json"
+# hive's name for the partition of rows without a season
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# team, player and event type names repeat on every row, store each once per row group
+NAME = pa.dictionary(pa.int32(), pa.string())
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+EVENT_TYPE_FLAGS = (
+    "is_try", "is_error", "is_conversion_made", "is_conversion_missed",
+    "is_penalty_conceded", "is_field_goal_made", "is_field_goal_missed",
+)
+
+LOOKUPS = {
+    "teams": (
+        "SELECT id, name FROM teams ORDER BY id",
+        pa.schema([("id", pa.int32()), ("name", pa.string())]),
+    ),
+    "players": (
+        """
+        SELECT id, name, positions, date_of_birth, height, weight, birthplace, nickname, junior_club
+        FROM players ORDER BY id
+        """,
+        pa.schema([
+            ("id", pa.int32()), ("name", pa.string()), ("positions", pa.list_(pa.string())),
+            ("date_of_birth", pa.date32()), ("height", pa.int32()), ("weight", pa.int32()),
+            ("birthplace", pa.string()), ("nickname", pa.string()), ("junior_club", pa.string()),
+        ]),
+    ),
+    "event_types": (
+        """
+        SELECT id, name, points, is_try, is_error, is_conversion_made, is_conversion_missed,
+               is_penalty_conceded, is_field_goal_made, is_field_goal_missed
+        FROM event_types ORDER BY id
+        """,
+        pa.schema([
+            ("id", pa.int32()), ("name", pa.string()), ("points", pa.int16()),
+            *[(flag, pa.bool_()) for flag in EVENT_TYPE_FLAGS],
+        ]),
+    ),
+    "event_roles": (
+        "SELECT id, role_name FROM event_roles ORDER BY id",
+        pa.schema([("id", pa.int32()), ("role_name", pa.string())]),
+    ),
+}
+
+# every partitioned query selects season first and is ordered by it, so a
+# single part file is open at a time
+MATCHES = (
+    """
+    SELECT m.season, m.id AS match_id, m.round, m.date, m.venue,
+           h.name AS home_team, a.name AS away_team, m.score_home, m.score_away,
+           m.attendance, m.weather, m.ground_conditions
+    FROM matches m
+    JOIN teams h ON h.id = m.home_team_id
+    LEFT JOIN teams a ON a.id = m.away_team_id
+    ORDER BY m.season, m.id
+    """,
+    pa.schema([
+        ("match_id", pa.int32()), ("round", pa.int32()), ("date", TIMESTAMP), ("venue", NAME),
+        ("home_team", NAME), ("away_team", NAME), ("score_home", pa.int32()), ("score_away", pa.int32()),
+        ("attendance", pa.int32()), ("weather", pa.string()), ("ground_conditions", pa.string()),
+    ]),
+)
+
+EVENTS = (
+    """
+    SELECT e.season, e.id AS event_id, e.match_id, m.round, t.name AS team, p.name AS player,
+           et.name AS event_type, e.game_time_sec, e.description, e.created_at
+    FROM events e
+    JOIN matches m ON m.id = e.match_id
+    JOIN event_types et ON et.id = e.event_type_id
+    LEFT JOIN teams t ON t.id = e.team_id
+    LEFT JOIN players p ON p.id = e.player_id
+    WHERE e.created_at > :since AND e.created_at <= :until
+    ORDER BY e.season, e.id
+    """,
+    pa.schema([
+        ("event_id", pa.int32()), ("match_id", pa.int32()), ("round", pa.int32()), ("team", NAME),
+        ("player", NAME), ("event_type", NAME), ("game_time_sec", pa.int32()), ("description", pa.string()),
+        ("created_at", TIMESTAMP),
+    ]),
+)
+
+EVENT_PLAYERS = (
+    """
+    SELECT ep.season, ep.event_id, e.match_id, p.name AS player, r.role_name AS role
+    FROM event_players ep
+    JOIN events e ON e.season = ep.season AND e.id = ep.event_id
+    JOIN players p ON p.id = ep.player_id
+    LEFT JOIN event_roles r ON r.id = ep.role_id
+    WHERE e.created_at > :since AND e.created_at <= :until
+    ORDER BY ep.season, ep.event_id, ep.player_id
+    """,
+    pa.schema([("event_id", pa.int32()), ("match_id", pa.int32()), ("player", NAME), ("role", NAME)]),
+)
+
+
+def stream_rows(session, sql: str, params: dict | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield the rows of a query in lists of chunk_size, read through a server-side cursor."""
+    result = session.execute(text(sql), params or {}, execution_options={"stream_results": True})
+    for rows in result.partitions(chunk_size):
+        yield [tuple(row) for row in rows]
+
+
+def to_batch(rows: list[tuple], schema: pa.Schema) -> pa.RecordBatch:
+    columns = zip(*rows) if rows else [[] for _ in schema]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(list(values), type=field.type) for values, field in zip(columns, schema)], schema=schema
+    )
+
+
+def _write_file(path: str, batches, schema: pa.Schema) -> int:
+    """Write batches to path through a temporary file, so readers never see a partial file."""
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    rows = 0
+    with pq.ParquetWriter(tmp, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    os.replace(tmp, path)
+    return rows
+
+
+class PartitionedWriter:
+    """
+    Writes rows whose first column is the season to
+    <directory>/season=<season>/<filename>. Rows must arrive ordered by
+    season, each partition's file is finished before the next is opened.
+    """
+
+    def __init__(self, directory: str, schema: pa.Schema, filename: str):
+        self.directory = directory
+        self.schema = schema
+        self.filename = filename
+        self.rows = 0
+        self._season = None
+        self._writer = None
+        self._paths = None
+
+    def _open(self, season: int | None) -> None:
+        self.close()
+        partition = os.path.join(self.directory, f"season={NULL_PARTITION if season is None else season}")
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, self.filename)
+        tmp = os.path.join(partition, f".{self.filename}.tmp")
+        self._season = season
+        self._paths = (tmp, path)
+        self._writer = pq.ParquetWriter(tmp, self.schema)
+
+    def write(self, rows: list[tuple]) -> None:
+        for season, group in itertools.groupby(rows, key=lambda row: row[0]):
+            if self._writer is None or season != self._season:
+                self._open(season)
+            batch = to_batch([row[1:] for row in group], self.schema)
+            self._writer.write_batch(batch)
+            self.rows += batch.num_rows
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(*self._paths)
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_watermark(directory: str) -> datetime | None:
+    """created_at of the newest event already exported to directory, None before the first export."""
+    try:
+        with open(os.path.join(directory, STATE_FILE)) as f:
+            return datetime.fromisoformat(json.load(f)["events_until"])
+    except FileNotFoundError:
+        return None
+
+
+def write_watermark(directory: str, until: datetime) -> None:
+    path = os.path.join(directory, STATE_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"events_until": until.isoformat()}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def export_lookup(session, directory: str, name: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    sql, schema = LOOKUPS[name]
+    batches = (to_batch(rows, schema) for rows in stream_rows(session, sql, chunk_size=chunk_size))
+    return _write_file(os.path.join(directory, f"{name}.parquet"), batches, schema)
+
+
+def export_matches(session, directory: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Rewrite the matches dataset, swapping the new directory in once it is complete."""
+    sql, schema = MATCHES
+    target = os.path.join(directory, "matches")
+    staging = f"{target}.new"
+    shutil.rmtree(staging, ignore_errors=True)
+    with PartitionedWriter(staging, schema, "part-0.parquet") as writer:
+        for rows in stream_rows(session, sql, chunk_size=chunk_size):
+            writer.write(rows)
+    os.makedirs(staging, exist_ok=True)
+    if os.path.exists(target):
+        os.replace(target, f"{target}.old")
+    os.replace(staging, target)
+    shutil.rmtree(f"{target}.old", ignore_errors=True)
+    return writer.rows
+
+
+def export_incremental(session, directory: str, name: str, since: datetime, until: datetime,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Append the rows of events created in (since, until] to dataset name. The
+    part file is named after `since`, so a run repeated after a failure
+    overwrites its own files instead of duplicating rows.
+    """
+    sql, schema = {"events": EVENTS, "event_players": EVENT_PLAYERS}[name]
+    filename = f"part-{since.astimezone(timezone.utc):%Y%m%dT%H%M%S%fZ}.parquet"
+    params = {"since": since, "until": until}
+    with PartitionedWriter(os.path.join(directory, name), schema, filename) as writer:
+        for rows in stream_rows(session, sql, params, chunk_size):
+            writer.write(rows)
+    return writer.rows
+
+
+def export(session, directory: str, full: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+           lag_seconds: float = DEFAULT_LAG_SECONDS) -> dict[str, int]:
+    """
+    Export every table to directory from one snapshot of the database, returns
+    the rows written per dataset. full discards the events exported before
+    and starts again from the first event.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if full:
+        for name in ("events", "event_players"):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    since = (None if full else read_watermark(directory)) or EPOCH
+    try:
+        # every query reads the same snapshot, so events never reference a match not exported
+        session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        until = session.execute(
+            text("SELECT now() - make_interval(secs => :lag)"), {"lag": lag_seconds}
+        ).scalar_one()
+        counts = {name: export_lookup(session, directory, name, chunk_size) for name in LOOKUPS}
+        counts["matches"] = export_matches(session, directory, chunk_size)
+        for name in ("events", "event_players"):
+            counts[name] = export_incremental(session, directory, name, since, until, chunk_size) if until > since else 0
+        if until > since:
+            write_watermark(directory, until)
+        session.rollback()
+    except Exception as e:
+        print(f"Error exporting to {directory}: {e}")
+        session.rollback()
+        raise
+    return counts
@@ -0,0 +1,233 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+
+import urllib3
+
+from utils.cache import PageCache
+from utils.rate import RateLimiter
+
+# Selenium is imported once a browser is first needed, so replaying the page
+# cache and the HTTP fetcher never pay for it
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+PLAY_BY_PLAY_TAB = "play-by-play"
+# upper bound on waiting for the Play by Play tab and its events to render
+DEFAULT_WAIT_TIMEOUT = 15.0
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+
+@dataclass
+class Page:
+    url: str
+    final_url: str
+    html: str
+
+
+# Decides whether a fetched page holds what the caller needs, e.g. that a
+# server-rendered page actually contains the match list.
+ReadyCheck = Callable[[Page], bool]
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a page was never cached."""
+
+
+class Fetcher:
+    """
+    How pages are loaded. play_by_play() returns the source of the match page
+    last loaded with get() after switching to its Play by Play tab.
+    """
+
+    def get(self, url: str, ready: ReadyCheck | None = None) -> Page:
+        raise NotImplementedError
+
+    def play_by_play(self, url: str) -> str:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SeleniumFetcher(Fetcher):
+    """
+    Loads pages in headless Chromium, the browser is only started on first use.
+    A DriverFactory can have the driver recycled between pages, after a number
+    of loads or once it uses too much memory.
+    """
+
+    def __init__(self, rate_limiter: RateLimiter | None = None,
+                 driver_factory: Callable[[], "webdriver.Chrome"] | None = None,
+                 wait_timeout: float = DEFAULT_WAIT_TIMEOUT):
+        self.rate_limiter = rate_limiter or RateLimiter(0)
+        self._driver_factory = driver_factory
+        self.wait_timeout = wait_timeout
+        self._driver = None
+        self._pages = 0
+
+    @property
+    def driver_factory(self) -> Callable[[], "webdriver.Chrome"]:
+        if self._driver_factory is None:
+            from utils.browser import create_driver
+            self._driver_factory = create_driver
+        return self._driver_factory
+
+    @property
+    def driver(self) -> "webdriver.Chrome":
+        if self._driver is None:
+            self._driver = self.driver_factory()
+        return self._driver
+
+    def get(self, url: str, ready: ReadyCheck | None = None) -> Page:
+        # only between get() calls, play_by_play() needs the page get() loaded
+        should_recycle = getattr(self.driver_factory, "should_recycle", None)
+        if self._driver is not None and should_recycle and should_recycle(self._driver, self._pages):
+            self.close()
+        with self.rate_limiter.request():
+            self.driver.get(url)
+        self._pages += 1
+        return Page(url=url, final_url=self.driver.current_url, html=self.driver.page_source)
+
+    def play_by_play(self, url: str) -> str:
+        """
+        Click the Play by Play tab and wait, up to wait_timeout seconds, until
+        its events have rendered. Raises TimeoutException rather than return a
+        page with no events. Politeness delays are left to the rate limiter.
+        """
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        wait = WebDriverWait(self.driver, self.wait_timeout)
+        with self.rate_limiter.request(wait=False):
+            wait.until(EC.element_to_be_clickable((By.XPATH, "//a[.//span[text()='Play by Play']]"))).click()
+            try:
+                wait.until(EC.presence_of_element_located((By.CLASS_NAME, "match-centre-event__content")))
+            except TimeoutException:
+                raise TimeoutException(f"No play by play events rendered for {url} within {self.wait_timeout}s")
+        return self.driver.page_source
+
+    def close(self) -> None:
+        if self._driver is not None:
+            release = getattr(self.driver_factory, "release", None)
+            if release:
+                release(self._driver)
+            else:
+                self._driver.quit()
+            self._driver = None
+            self._pages = 0
+
+
+class HttpFetcher(Fetcher):
+    """
+    Fetches the server-rendered HTML over pooled keep-alive connections. When a
+    page fails its ready check, e.g. because the data is only filled in by
+    JavaScript, the request is handed to the fallback fetcher instead.
+    """
+
+    def __init__(self, rate_limiter: RateLimiter | None = None, fallback: Fetcher | None = None,
+                 http: urllib3.PoolManager | None = None, timeout: float = 30):
+        self.rate_limiter = rate_limiter or RateLimiter(0)
+        self.fallback = fallback
+        self.http = http or urllib3.PoolManager(
+            num_pools=4, maxsize=4, headers={"User-Agent": USER_AGENT},
+            retries=urllib3.Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+        )
+        self.timeout = timeout
+        # kept on the instance, not per thread: the async engine runs get() and
+        # play_by_play() of one fetcher on whichever executor threads are free
+        self._last_page: Page | None = None
+        self._fallback_url: str | None = None
+        self.fallbacks = 0
+
+    def _fetch(self, url: str) -> Page:
+        with self.rate_limiter.request():
+            response = self.http.request("GET", url, timeout=self.timeout)
+            if response.status >= 400:
+                raise urllib3.exceptions.HTTPError(f"GET {url} returned {response.status}")
+        return Page(url=url, final_url=response.geturl() or url, html=response.data.decode(errors="replace"))
+
+    def _fall_back(self, url: str, reason: str) -> Fetcher:
+        if self.fallback is None:
+            raise ValueError(f"{url}: {reason} and no fallback fetcher is configured")
+        print(f"{reason}, falling back for {url}")
+        self.fallbacks += 1
+        return self.fallback
+
+    def get(self, url: str, ready: ReadyCheck | None = None) -> Page:
+        page = self._last_page = self._fetch(url)
+        self._fallback_url = None
+        if ready and not ready(page):
+            page = self._fall_back(url, "Server-rendered page is missing data").get(url, ready)
+            self._last_page, self._fallback_url = None, url
+        return page
+
+    def play_by_play(self, url: str) -> str:
+        page = self._last_page
+        if page is not None and page.url == url and "match-centre-event__content" in page.html:
+            return page.html
+        fallback = self._fall_back(url, "No play by play in server-rendered page")
+        if self._fallback_url != url:
+            # the fallback never loaded this page itself
+            fallback.get(url)
+            self._fallback_url = url
+        return fallback.play_by_play(url)
+
+    def close(self) -> None:
+        self.http.clear()
+        if self.fallback:
+            self.fallback.close()
+
+
+class CachingFetcher(Fetcher):
+    """Saves every page the wrapped fetcher loads to a PageCache."""
+
+    def __init__(self, inner: Fetcher, cache: PageCache):
+        self.inner = inner
+        self.cache = cache
+
+    def get(self, url: str, ready: ReadyCheck | None = None) -> Page:
+        page = self.inner.get(url, ready)
+        self.cache.put(url, page.html, final_url=page.final_url)
+        return page
+
+    def play_by_play(self, url: str) -> str:
+        html = self.inner.play_by_play(url)
+        self.cache.put(url, html, tab=PLAY_BY_PLAY_TAB)
+        return html
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class ReplayFetcher(Fetcher):
+    """Serves pages only from a PageCache, nothing touches the network."""
+
+    def __init__(self, cache: PageCache):
+        self.cache = cache
+
+    def get(self, url: str, ready: ReadyCheck | None = None) -> Page:
+        page = self.cache.get(url)
+        if page is None:
+            raise CacheMiss(url)
+        return Page(url=url, final_url=page.final_url, html=page.html)
+
+    def play_by_play(self, url: str) -> str:
+        page = self.cache.get(url, tab=PLAY_BY_PLAY_TAB)
+        if page is None:
+            raise CacheMiss(f"{url} ({PLAY_BY_PLAY_TAB})")
+        return page.html
+
+
+def build_fetcher(kind: str = "browser", rate_limiter: RateLimiter | None = None,
+                  cache: PageCache | None = None, replay: bool = False,
+                  wait_timeout: float = DEFAULT_WAIT_TIMEOUT,
+                  driver_factory: Callable[[], "webdriver.Chrome"] | None = None) -> Fetcher:
+    """Build the fetcher for the CLI options: "browser" or "http" (browser only as fallback)."""
+    if replay:
+        return ReplayFetcher(cache)
+    fetcher = SeleniumFetcher(rate_limiter, driver_factory, wait_timeout)
+    if kind == "http":
+        fetcher = HttpFetcher(rate_limiter, fallback=fetcher)
+    return CachingFetcher(fetcher, cache) if cache else fetcher
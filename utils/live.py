@@ -0,0 +1,206 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from utils import state
+from utils.db import (
+    bulk_insert_match_events,
+    get_or_create_match,
+    match_event_keys,
+    refresh_match_stats,
+    update_match_score,
+)
+from utils.parse import (
+    EventRecord,
+    extract_match_data,
+    extract_match_status,
+    extract_team_lists,
+    iter_event_records,
+    make_soup,
+    parse_game_time_to_seconds,
+)
+from utils.scrape import (
+    BASE_URL,
+    ScrapeConfig,
+    determine_latest_round,
+    draw_page_ready,
+    draw_url,
+    mark_state,
+    match_page_ready,
+    parse_draw_page,
+    save_appearances,
+)
+
+# match header statuses after which a match no longer changes
+FINISHED_STATUSES = {"Full Time"}
+# a match still not finished this long after it was first polled, e.g. one
+# postponed or abandoned, is given up on
+DEFAULT_MAX_POLL_SECONDS = 4 * 60 * 60
+# as is one whose page failed this many polls in a row
+DEFAULT_MAX_ERRORS = 10
+
+EventKey = tuple[str, int, str | None]
+
+
+def event_key(record: EventRecord) -> EventKey:
+    """The same (event type, game time, player) key as match_event_keys and events_natural_key."""
+    return record.title, parse_game_time_to_seconds(record.timestamp), record.player or None
+
+
+@dataclass
+class LiveMatch:
+    path: str
+    match_id: int | None = None
+    # keys of the events stored for the match, so each poll only writes what is new
+    keys: set[EventKey] = field(default_factory=set)
+    # hash of the last play by play polled, an unchanged page is not parsed again
+    page_hash: str | None = None
+    score: tuple[int, int] | None = None
+    # team lists are stored once they are published, retried until written
+    team_lists_saved: bool = False
+    first_polled: float | None = None
+    errors: int = 0
+
+
+class LivePoller:
+    """
+    Polls the play by play of the current round's matches every `interval`
+    seconds until they are all finished. Each poll is diffed against an
+    in-memory index of the match's stored events and only new events are
+    written, along with the score, and the team lists once the match page
+    shows them. A match drops out once its header shows it has finished, and
+    is then marked complete in scrape_state. One not finished within
+    max_poll_seconds, or failing max_errors polls in a row, drops out marked
+    failed.
+    """
+
+    def __init__(self, config: ScrapeConfig, interval: float = 30.0,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.monotonic,
+                 max_poll_seconds: float = DEFAULT_MAX_POLL_SECONDS, max_errors: int = DEFAULT_MAX_ERRORS):
+        self.config = config
+        self.interval = interval
+        self.max_poll_seconds = max_poll_seconds
+        self.max_errors = max_errors
+        self.sleep = sleep
+        self.clock = clock
+        self.matches: dict[str, LiveMatch] = {}
+
+    def discover(self) -> None:
+        """Start polling every match on the current round's draw page that is not already complete."""
+        config = self.config
+        round_number = determine_latest_round(config)
+        page = config.fetcher.get(draw_url(config, round_number), draw_page_ready)
+        _, paths = parse_draw_page(page.html)
+        if config.track_state:
+            with config.db_lock:
+                done = state.completed_keys(config.session, state.MATCH, paths)
+            paths = [path for path in paths if path not in done]
+        for path in paths:
+            self.matches.setdefault(path, LiveMatch(path))
+        print(f"Polling {len(self.matches)} matches in Round {round_number}")
+
+    def _open_match(self, live: LiveMatch, data: dict) -> None:
+        with self.config.db_lock:
+            live.match_id = get_or_create_match(
+                self.config.session, data, int(self.config.year), self.config.competition_id
+            ).id
+            live.keys = match_event_keys(self.config.session, live.match_id)
+
+    def _save_team_lists(self, live: LiveMatch, html: str) -> None:
+        appearances = extract_team_lists(make_soup(html))
+        live.team_lists_saved = bool(appearances) and save_appearances(self.config, live.match_id, appearances)
+
+    def _write(self, live: LiveMatch, score: tuple[int, int], records: list[EventRecord]) -> bool:
+        """Store the score and new events, returns whether every event is now stored."""
+        session = self.config.session
+        ok = True
+        with self.config.db_lock:
+            changed = score != live.score and update_match_score(session, live.match_id, *score)
+            live.score = score
+            if records:
+                inserted = bulk_insert_match_events(session, live.match_id, records)
+                print(f"Inserted {inserted} new events for match ID: {live.match_id}")
+                if inserted == len(records):
+                    live.keys.update(event_key(record) for record in records)
+                else:
+                    # some were written elsewhere or the batch failed, resync from the table
+                    live.keys = match_event_keys(session, live.match_id)
+                    ok = all(event_key(record) in live.keys for record in records)
+            if changed or records:
+                refresh_match_stats(session, live.match_id)
+        return ok
+
+    def _finish(self, live: LiveMatch, html: str) -> None:
+        with self.config.db_lock:
+            refresh_match_stats(self.config.session, live.match_id)
+        mark_state(self.config, state.MATCH, live.path, state.COMPLETE, html)
+
+    def _fail(self, live: LiveMatch) -> None:
+        mark_state(self.config, state.MATCH, live.path, state.FAILED)
+
+    def poll_match(self, live: LiveMatch) -> bool:
+        """Poll one match, returns False once it has finished."""
+        url = f"{BASE_URL}/{live.path}"
+        page = self.config.fetcher.get(url, match_page_ready)
+        html = self.config.fetcher.play_by_play(url)
+        page_hash = state.content_hash(html)
+        if page_hash == live.page_hash:
+            return True
+        soup = make_soup(html)
+        match_div = soup.find("div", class_="match")
+        if match_div is None:
+            print(f"No match header yet for {live.path}")
+            return True
+        data = extract_match_data(match_div, str(self.config.year))
+        if live.match_id is None:
+            self._open_match(live, data)
+        if not live.team_lists_saved:
+            self._save_team_lists(live, page.html)
+
+        records, seen = [], set()
+        for record in iter_event_records(soup):
+            key = event_key(record)
+            if key not in live.keys and key not in seen:
+                seen.add(key)
+                records.append(record)
+        if not self._write(live, (data["home_score"], data["away_score"]), records):
+            # poll the same page again rather than lose its events
+            return True
+        live.page_hash = page_hash
+
+        if extract_match_status(soup) in FINISHED_STATUSES:
+            self._finish(live, html)
+            return False
+        return True
+
+    def poll(self) -> None:
+        """Poll every live match once."""
+        for live in list(self.matches.values()):
+            if live.first_polled is None:
+                live.first_polled = self.clock()
+            try:
+                if not self.poll_match(live):
+                    print(f"Match {live.match_id} finished, no longer polling {live.path}")
+                    del self.matches[live.path]
+                    continue
+                live.errors = 0
+            except Exception as e:
+                live.errors += 1
+                print(f"Error polling {live.path} ({live.errors} in a row): {e}")
+            if live.errors >= self.max_errors:
+                reason = f"{live.errors} polls in a row failed"
+            elif self.clock() - live.first_polled >= self.max_poll_seconds:
+                reason = f"not finished after {self.max_poll_seconds / 60:.0f} minutes"
+            else:
+                continue
+            print(f"Giving up on {live.path}, {reason}")
+            self._fail(live)
+            del self.matches[live.path]
+
+    def run(self) -> None:
+        self.discover()
+        while self.matches:
+            started = self.clock()
+            self.poll()
+            if self.matches:
+                self.sleep(max(0.0, self.interval - (self.clock() - started)))
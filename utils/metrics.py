@@ -0,0 +1,208 @@
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import Engine
+
+PROMETHEUS_PREFIX = "nrl_scraper"
+
+
+class StageTimer:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> dict:
+        return {"count": self.count, "total_seconds": round(self.total, 6), "max_seconds": round(self.max, 6)}
+
+
+class Scope:
+    """Stage times and counters of one round or match page."""
+
+    def __init__(self, kind: str, key: str):
+        self.kind = kind
+        self.key = key
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.stages = defaultdict(float)
+        self.counters = Counter()
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "key": self.key,
+            "seconds": round(self.seconds, 6) if self.seconds is not None else None,
+            "stages": {stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+class Metrics:
+    """
+    Process-wide stage timers and counters, shared by every thread. Time and
+    counts are also added to each round / match scope open in the current
+    thread, so the run report breaks them down per round and per match. Work
+    handed to other threads is counted towards a scope with within().
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stages: dict[str, StageTimer] = defaultdict(StageTimer)
+        self.counters = Counter()
+        self.scopes: list[Scope] = []
+
+    def _open_scopes(self) -> list[Scope]:
+        scopes = getattr(self._local, "scopes", None)
+        if scopes is None:
+            scopes = self._local.scopes = []
+        return scopes
+
+    def current(self) -> Scope | None:
+        """The innermost scope open in the current thread."""
+        scopes = self._open_scopes()
+        return scopes[-1] if scopes else None
+
+    @contextmanager
+    def within(self, scope: Scope | None):
+        """
+        Also count this thread's stages and counters towards scope, e.g. the
+        round scope of the thread that handed it a match page.
+        """
+        if scope is None:
+            yield
+            return
+        scopes = self._open_scopes()
+        scopes.append(scope)
+        try:
+            yield
+        finally:
+            scopes.remove(scope)
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.stages[stage].add(seconds)
+                for scope in self._open_scopes():
+                    scope.stages[stage] += seconds
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator timing every call of a function as `stage`."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+            for scope in self._open_scopes():
+                scope.counters[name] += n
+
+    @contextmanager
+    def scope(self, kind: str, key: str):
+        """Collect the stages and counters of one round or match page."""
+        scope = Scope(kind, key)
+        scopes = self._open_scopes()
+        scopes.append(scope)
+        try:
+            yield scope
+        finally:
+            scopes.remove(scope)
+            scope.seconds = time.perf_counter() - scope.started
+            with self._lock:
+                self.scopes.append(scope)
+
+    def instrument(self, engine: Engine) -> None:
+        """Count the SQL statements sent through engine, by statement type."""
+        def count(conn, cursor, statement, parameters, context, executemany):
+            verb = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+            self.incr("sql_queries")
+            self.incr(f"sql_{verb}")
+        sa_event.listen(engine, "before_cursor_execute", count)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._started = time.perf_counter()
+            self.stages.clear()
+            self.counters.clear()
+            self.scopes.clear()
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "elapsed_seconds": round(time.perf_counter() - self._started, 6),
+                "stages": {stage: timer.as_dict() for stage, timer in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "rounds": [scope.as_dict() for scope in self.scopes if scope.kind == "round"],
+                "matches": [scope.as_dict() for scope in self.scopes if scope.kind == "match"],
+            }
+
+    def prometheus(self) -> str:
+        """The totals in the Prometheus text exposition format, for the node exporter textfile collector."""
+        with self._lock:
+            stages = sorted(self.stages.items())
+            counters = sorted(self.counters.items())
+            elapsed = time.perf_counter() - self._started
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_seconds Time spent in each scrape stage.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds summary",
+        ]
+        for stage, timer in stages:
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {timer.total:.6f}')
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds_count{{stage="{stage}"}} {timer.count}')
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_max_seconds Slowest single call of each scrape stage.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_max_seconds gauge",
+        ]
+        lines += [f'{PROMETHEUS_PREFIX}_stage_max_seconds{{stage="{stage}"}} {timer.max:.6f}' for stage, timer in stages]
+        for name, value in counters:
+            metric = f"{PROMETHEUS_PREFIX}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        lines += [
+            f"# TYPE {PROMETHEUS_PREFIX}_run_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_seconds {elapsed:.6f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+            f.write("\n")
+
+    def write_prometheus(self, path: str) -> None:
+        # write then rename, so a collector never reads a half written file
+        with open(f"{path}.tmp", "w") as f:
+            f.write(self.prometheus())
+        os.replace(f"{path}.tmp", path)
+
+
+METRICS = Metrics()
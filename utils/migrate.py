@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Applies the versioned SQL files in ops/migrations to an existing database,
+in filename order, each in its own transaction. Applied versions are
+recorded in schema_migrations; databases created from ops/create_tables.sql
+start with every version its schema already includes.
+
+    python -m utils.migrate
+"""
+from pathlib import Path
+
+from sqlalchemy import text
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "ops" / "migrations"
+
+
+def applied_versions(session) -> set[str]:
+    session.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(255) PRIMARY KEY, applied_at TIMESTAMP WITH TIME ZONE DEFAULT now())"
+    ))
+    session.commit()
+    return set(session.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def apply_migrations(session) -> list[str]:
+    """Apply every migration not yet recorded, returns the versions applied."""
+    done = applied_versions(session)
+    applied = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        version = path.stem
+        if version in done:
+            continue
+        print(f"Applying migration {version}")
+        try:
+            # no_parameters, or psycopg2 reads the % of format() and LIKE patterns as placeholders
+            session.connection().exec_driver_sql(path.read_text(), execution_options={"no_parameters": True})
+            session.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {"version": version})
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+def main() -> None:
+    from utils.db import create_db_session
+
+    applied = apply_migrations(create_db_session()())
+    print(f"Applied {len(applied)} migrations" if applied else "Database is up to date")
+
+
+if __name__ == "__main__":
+    main()
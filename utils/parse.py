@@ -1,8 +1,38 @@
+import importlib.util
+import os
 import re
-from datetime import datetime
-from typing import Generator
+from datetime import date, datetime
+from typing import Generator, Iterable
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
+
+# BeautifulSoup tree builders we can parse with, fastest first. lxml is
+# optional, html.parser ships with Python.
+PARSER_BACKENDS = ("lxml", "html.parser")
+
+
+def available_backends() -> list[str]:
+    return [backend for backend in PARSER_BACKENDS if backend == "html.parser" or importlib.util.find_spec(backend)]
+
+
+_parser_backend = os.getenv("NRL_HTML_PARSER") or available_backends()[0]
+
+
+def set_parser_backend(backend: str) -> None:
+    "Selects the BeautifulSoup tree builder used by make_soup for the rest of the run."
+    global _parser_backend
+    if backend not in available_backends():
+        raise ValueError(f"Parser backend {backend!r} is not available, choose from {available_backends()}")
+    _parser_backend = backend
+
+
+def get_parser_backend() -> str:
+    return _parser_backend
+
+
+def make_soup(html: str, backend: str | None = None) -> BeautifulSoup:
+    "Parses a page once with the selected backend, every extract_* function works on the result."
+    return BeautifulSoup(html, backend or _parser_backend)
 
 
 def parse_date(date_str: str, year: int) -> datetime:
@@ -20,18 +50,32 @@ def parse_game_time_to_seconds(time_str: str) -> int:
         return 0
 
 
-def extract_bye_teams(html: str) -> list[str]:
-    soup = BeautifulSoup(html, "html.parser")
+def extract_bye_teams(html: str | Tag | Iterable[Tag]) -> list[str]:
+    "Accepts raw HTML or already parsed elements, so a draw page never has to be parsed twice."
+    if isinstance(html, str):
+        roots = [make_soup(html)]
+    elif isinstance(html, Tag):
+        roots = [html]
+    else:
+        roots = html
     bye_teams = set()
 
-    for span in soup.select("li.match-bye-team span.u-visually-hidden"):
-        team_name = span.get_text(strip=True)
-        if team_name:
-            bye_teams.add(team_name)
+    for root in roots:
+        for span in root.select("li.match-bye-team span.u-visually-hidden"):
+            team_name = span.get_text(strip=True)
+            if team_name:
+                bye_teams.add(team_name)
 
     return list(bye_teams)
 
 
+def extract_draw(soup: Tag) -> tuple[list[str], list[str]]:
+    "The teams with a bye and the match page paths listed on a parsed draw page."
+    byes = soup.find_all("div", class_="o-shadowed-box u-spacing-mv-16 u-text-align-center")
+    matches = soup.find_all("a", class_="match--highlighted u-flex-column u-flex-align-items-center u-width-100")
+    return extract_bye_teams(byes), [match.get("href") for match in matches if match.get("href")]
+
+
 def extract_match_data(match_div: BeautifulSoup, year: int) -> dict:
     "Extracts match data from a BeautifulSoup match div."
     date_tag = match_div.find("p", class_="match-header__title")
@@ -75,6 +119,12 @@ def extract_match_data(match_div: BeautifulSoup, year: int) -> dict:
     }
 
 
+def extract_match_status(soup: Tag) -> str | None:
+    "The status shown in the match header, e.g. 'Full Time', None if the page has no header."
+    status_tag = soup.find("p", class_="match-header__status")
+    return status_tag.get_text(strip=True) if status_tag else None
+
+
 def extract_event_data(event) -> Generator[dict, None, None]:
     try:
         timestamp = event.find("span", class_="match-centre-event__timestamp").get_text(strip=True)
@@ -110,3 +160,251 @@ def extract_event_data(event) -> Generator[dict, None, None]:
     except Exception as e:
         print("Failed to parse event:", e)
         return None
+
+
+class EventRecord:
+    """
+    One parsed play-by-play row, the compact form of the dicts yielded by
+    extract_event_data. Supports record["title"] and record.get("role") so it
+    can be passed anywhere those dicts are accepted.
+    """
+
+    __slots__ = ("timestamp", "title", "team_name", "player", "role")
+
+    def __init__(self, timestamp: str, title: str, team_name: str | None, player: str | None, role: str | None):
+        self.timestamp = timestamp
+        self.title = title
+        self.team_name = team_name
+        self.player = player
+        self.role = role
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return isinstance(other, EventRecord) and self.as_dict() == other.as_dict()
+
+    def __repr__(self) -> str:
+        return f"EventRecord({', '.join(f'{key}={getattr(self, key)!r}' for key in self.__slots__)})"
+
+
+def _has_class(tag: Tag, name: str) -> bool:
+    classes = tag.attrs.get("class")
+    return classes is not None and name in classes
+
+
+def _inside(tag: Tag, ancestor: Tag) -> bool:
+    parent = tag.parent
+    while parent is not None:
+        if parent is ancestor:
+            return True
+        parent = parent.parent
+    return False
+
+
+def _event_records(content: Tag) -> Generator[EventRecord, None, None]:
+    timestamp = title = summary = team_tag = player_tag = ul = None
+    # walk the event once, picking out the first match of each field just as
+    # extract_event_data's find() calls do
+    for tag in content.descendants:
+        if not isinstance(tag, Tag):
+            continue
+        name = tag.name
+        if name == "span":
+            if timestamp is None and _has_class(tag, "match-centre-event__timestamp"):
+                timestamp = tag
+        elif name == "h4":
+            if title is None and _has_class(tag, "match-centre-event__title"):
+                title = tag
+        elif name == "div":
+            if summary is None and _has_class(tag, "match-centre-event__summary"):
+                summary = tag
+        elif summary is not None and name == "p":
+            if team_tag is None and _has_class(tag, "match-centre-event__team-name") and _inside(tag, summary):
+                team_tag = tag
+            elif player_tag is None and _has_class(tag, "u-font-weight-500") and _inside(tag, summary):
+                player_tag = tag
+        elif summary is not None and name == "ul" and ul is None and _inside(tag, summary):
+            ul = tag
+
+    if timestamp is None or title is None:
+        print("Failed to parse event: missing timestamp or title")
+        return
+    timestamp = timestamp.get_text(strip=True)
+    title = title.get_text(strip=True)
+    team_name = team_tag.get_text(strip=True) if team_tag else None
+
+    if ul:
+        for li in ul.find_all("li"):
+            role = li.find("span").get_text(strip=True)
+            name = li.get_text(strip=True).replace(role, "").strip()
+            yield EventRecord(timestamp, title, team_name, name, role)
+    else:
+        yield EventRecord(timestamp, title, team_name, player_tag.get_text(strip=True) if player_tag else None, None)
+
+
+def iter_event_records(soup: Tag) -> Generator[EventRecord, None, None]:
+    "Single pass extractor for every play-by-play event on a parsed match page."
+    for content in soup.find_all("div", class_="match-centre-event__content"):
+        try:
+            yield from _event_records(content)
+        except Exception as e:
+            print("Failed to parse event:", e)
+
+
+# profile detail labels and the players columns they fill
+PROFILE_FIELDS = {
+    "height": "height", "weight": "weight", "date of birth": "date_of_birth", "birthplace": "birthplace",
+    "nickname": "nickname", "junior club": "junior_club",
+}
+DEBUT_FIELDS = {"debut club": "club", "date": "date", "opposition": "opposition", "round": "round"}
+
+
+def _number(text: str) -> int | None:
+    digits = re.sub(r"[^\d]", "", text)
+    return int(digits) if digits else None
+
+
+def _profile_date(text: str) -> date | None:
+    try:
+        return datetime.strptime(text, "%d %B %Y").date()
+    except ValueError as e:
+        print(f"Error parsing profile date '{text}': {e}")
+        return None
+
+
+def extract_player_profile(soup: Tag) -> dict:
+    """
+    The players columns found on a parsed player profile page: positions,
+    date_of_birth, height and weight (cm / kg), birthplace, nickname,
+    junior_club, biography, debut ({club, date, opposition, round}) and career
+    (a row per season of the career table). Details not on the page are left out.
+    """
+    profile, debut = {}, {}
+    position = soup.find("p", class_="club-card__position")
+    if position and position.get_text(strip=True):
+        profile["positions"] = [part.strip() for part in re.split(r"[/,]", position.get_text(strip=True)) if part.strip()]
+    for label_tag in soup.find_all("dt"):
+        value_tag = label_tag.find_next_sibling("dd")
+        label = label_tag.get_text(strip=True).rstrip(":").lower()
+        value = value_tag.get_text(strip=True) if value_tag else ""
+        if not value:
+            continue
+        in_debut = "profile-details--debut" in (label_tag.parent.get("class") or [])
+        if in_debut and label in DEBUT_FIELDS:
+            debut[DEBUT_FIELDS[label]] = value
+        elif label in PROFILE_FIELDS:
+            profile[PROFILE_FIELDS[label]] = value
+    for column in ("height", "weight"):
+        if column in profile:
+            profile[column] = _number(profile[column])
+    if "date_of_birth" in profile:
+        profile["date_of_birth"] = _profile_date(profile["date_of_birth"])
+    if "date" in debut:
+        debut_date = _profile_date(debut["date"])
+        debut["date"] = debut_date.isoformat() if debut_date else None
+    if "round" in debut:
+        debut["round"] = _number(debut["round"])
+    if debut:
+        profile["debut"] = debut
+
+    biography = soup.find("div", class_="player-profile__biography")
+    if biography and biography.get_text(strip=True):
+        profile["biography"] = biography.get_text(" ", strip=True)
+
+    table = soup.find("table", class_="table--player-career")
+    career = _table_rows(table) if table else []
+    if career:
+        profile["career"] = career
+    return profile
+
+
+def _cell(text: str) -> int | float | str | None:
+    if text in ("", "-"):
+        return None
+    if text.isdigit():
+        return int(text)
+    if re.fullmatch(r"\d+\.\d+", text):
+        return float(text)
+    return text
+
+
+def _table_rows(table: Tag) -> list[dict]:
+    "The body rows of a stats table as dicts keyed by the snake_cased column headings."
+    headers = [re.sub(r"\W+", "_", th.get_text(strip=True).lower()).strip("_") for th in table.select("thead th")]
+    return [
+        {header: _cell(td.get_text(strip=True)) for header, td in zip(headers, row.find_all("td"))}
+        for row in table.select("tbody tr")
+    ]
+
+
+def extract_team_lists(soup: Tag) -> list[dict]:
+    """
+    One dict per player named on a parsed match page, from both team lists
+    and the player stats tables: team_name, player, jersey_number, position,
+    profile_path and stats (the player's stats table row without the name,
+    number and position columns, {} when the page has no stats yet).
+    """
+    team_names = {}
+    for side in ("home", "away"):
+        name_tag = soup.find("p", class_=f"match-team__name--{side}")
+        team_names[side] = name_tag.get_text(strip=True) if name_tag else None
+
+    players = {}
+    for team_list in soup.find_all("div", class_="team-list"):
+        side = "home" if "team-list--home" in team_list.get("class", []) else "away"
+        for item in team_list.find_all("li", class_="team-list-player"):
+            name_tag = item.find(class_="team-list-player__name")
+            if not name_tag or not name_tag.get_text(strip=True):
+                continue
+            number = item.find(class_="team-list-player__number")
+            position = item.find(class_="team-list-player__position")
+            name = name_tag.get_text(strip=True)
+            players[(side, name)] = {
+                "team_name": team_names[side],
+                "player": name,
+                "jersey_number": _number(number.get_text()) if number else None,
+                "position": position.get_text(strip=True) if position else None,
+                "profile_path": name_tag.get("href"),
+                "stats": {},
+            }
+
+    for table in soup.find_all("table", class_="table--player-stats"):
+        side = table.get("data-team", "home")
+        for row in _table_rows(table):
+            name = row.pop("player", None)
+            if not name:
+                continue
+            number, position = row.pop("number", None), row.pop("position", None)
+            player = players.setdefault((side, name), {
+                "team_name": team_names[side], "player": name, "jersey_number": number,
+                "position": position, "profile_path": None, "stats": {},
+            })
+            player["stats"] = row
+    return [player for player in players.values() if player["team_name"]]
+
+
+def parse_html(html: str, year: str) -> dict:
+    """
+    Everything the extract_* functions find on a saved draw, match or play by
+    play page, as plain data. Keys with nothing found are left out.
+    """
+    soup = make_soup(html)
+    bye_teams, paths = extract_draw(soup)
+    result = {
+        "bye_teams": sorted(bye_teams),
+        "match_paths": paths,
+        "matches": [extract_match_data(match_div, year) for match_div in soup.find_all("div", class_="match")],
+        "status": extract_match_status(soup),
+        "appearances": extract_team_lists(soup),
+        "events": [record.as_dict() for record in iter_event_records(soup)],
+    }
+    return {key: value for key, value in result.items() if value}
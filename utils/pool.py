@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Callable, Iterable
+
+from sqlalchemy.orm import Session as OrmSession
+
+from utils.fetch import Fetcher
+from utils.metrics import METRICS, Scope
+from utils.scrape import ScrapeConfig, process_match_page
+
+
+class WorkerPool:
+    """
+    Fans match pages out over a pool of threads, each with its own fetcher
+    (and so its own headless driver) and DB session. These are created lazily
+    the first time a thread picks up work and live until close().
+    """
+
+    def __init__(self, config: ScrapeConfig, size: int, session_factory: Callable[[], OrmSession],
+                 fetcher_factory: Callable[[], Fetcher]):
+        self.config = config
+        self.size = size
+        self.session_factory = session_factory
+        self.fetcher_factory = fetcher_factory
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="scrape-worker")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._workers: list[ScrapeConfig] = []
+
+    def _worker_config(self) -> ScrapeConfig:
+        config = getattr(self._local, "config", None)
+        if config is None:
+            config = replace(self.config, session=self.session_factory(), fetcher=self.fetcher_factory())
+            self._local.config = config
+            with self._lock:
+                self._workers.append(config)
+        return config
+
+    def _process(self, url: str, scope: Scope | None) -> bool:
+        with METRICS.within(scope):
+            return process_match_page(self._worker_config(), url)
+
+    def process_matches(self, urls: Iterable[str]) -> list[bool]:
+        # the matches count towards the round scope open in the calling thread
+        scope = METRICS.current()
+        # list() so exceptions from any worker are raised here
+        return list(self._executor.map(lambda url: self._process(url, scope), urls))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        for config in self._workers:
+            config.fetcher.close()
+            if config.session is not None:
+                config.session.close()
+        self._workers.clear()
@@ -0,0 +1,223 @@
+"""
+Player profile enrichment. get_or_create_player only knows a player's name,
+this fills in positions, date of birth, height, weight, birthplace, debut and
+career from their nrl.com profile page.
+
+Players whose profile was never checked, or not for max_age_days, are
+fetched over plain HTTP by a bounded pool of threads. Each request carries
+the ETag and Last-Modified stored in player_profiles, so an unchanged
+profile costs a 304, and a 200 whose body hashes the same as last time is
+not parsed again. Changed profiles are written in batches of one UPDATE and
+one upsert. Enrichment uses its own connection pool and rate limiter and no
+browser, so it can run alongside a scrape without holding it up.
+"""
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import urllib3
+from sqlalchemy import func, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from models.models import Player, PlayerProfile
+from utils.fetch import USER_AGENT
+from utils.metrics import METRICS
+from utils.parse import extract_player_profile, make_soup
+from utils.rate import RateLimiter
+from utils.scrape import BASE_URL
+from utils.state import content_hash
+
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_COMPETITION_SLUG = "nrl-premiership"
+
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+MISSING = "missing"
+FAILED = "failed"
+
+STALE_SQL = """
+    SELECT p.id, p.name, pp.url, pp.etag, pp.last_modified, pp.content_hash
+    FROM players p
+    LEFT JOIN player_profiles pp ON pp.player_id = p.id
+    WHERE (pp.checked_at IS NULL OR pp.checked_at < now() - make_interval(days => :max_age_days))
+      AND (CAST(:names AS TEXT[]) IS NULL OR p.name = ANY(:names))
+    ORDER BY pp.checked_at NULLS FIRST, p.id
+    LIMIT :limit
+"""
+
+# the team a player last had an event for, the profile URL is under that club
+LATEST_TEAM_SQL = """
+    SELECT DISTINCT ON (e.player_id) e.player_id, t.name
+    FROM events e
+    JOIN teams t ON t.id = e.team_id
+    WHERE e.player_id = ANY(:player_ids)
+    ORDER BY e.player_id, e.season DESC, e.id DESC
+"""
+
+
+@dataclass
+class StaleProfile:
+    player_id: int
+    name: str
+    url: str | None
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+
+
+@dataclass
+class ProfileResult:
+    player_id: int
+    url: str | None
+    status: str
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+    fields: dict = field(default_factory=dict)
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def profile_url(team_name: str, player_name: str, competition_slug: str = DEFAULT_COMPETITION_SLUG) -> str:
+    return f"{BASE_URL}/players/{competition_slug}/{slugify(team_name)}/{slugify(player_name)}/"
+
+
+def stale_profiles(session, max_age_days: int = DEFAULT_MAX_AGE_DAYS, limit: int | None = None,
+                   competition_slug: str = DEFAULT_COMPETITION_SLUG,
+                   names: list[str] | None = None) -> list[StaleProfile]:
+    """
+    Players never checked or last checked over max_age_days ago, those never
+    checked first, optionally only the players called one of names.
+    """
+    params = {"max_age_days": max_age_days, "limit": limit, "names": names}
+    rows = session.execute(text(STALE_SQL), params).all()
+    profiles = [StaleProfile(*row) for row in rows]
+    without_url = [profile.player_id for profile in profiles if not profile.url]
+    if without_url:
+        teams = dict(session.execute(text(LATEST_TEAM_SQL), {"player_ids": without_url}).all())
+        for profile in profiles:
+            if not profile.url and profile.player_id in teams:
+                profile.url = profile_url(teams[profile.player_id], profile.name, competition_slug)
+    session.rollback()
+    return profiles
+
+
+class ProfileFetcher:
+    """Conditional GETs of profile pages over pooled keep-alive connections, safe to share between threads."""
+
+    def __init__(self, rate_limiter: RateLimiter | None = None, workers: int = DEFAULT_WORKERS,
+                 http: urllib3.PoolManager | None = None, timeout: float = 30):
+        self.rate_limiter = rate_limiter or RateLimiter(0)
+        self.http = http or urllib3.PoolManager(
+            num_pools=2, maxsize=workers, block=True, headers={"User-Agent": USER_AGENT},
+            retries=urllib3.Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+        )
+        self.timeout = timeout
+
+    def fetch(self, profile: StaleProfile) -> ProfileResult:
+        if not profile.url:
+            return ProfileResult(profile.player_id, None, MISSING)
+        headers = {}
+        if profile.etag:
+            headers["If-None-Match"] = profile.etag
+        if profile.last_modified:
+            headers["If-Modified-Since"] = profile.last_modified
+        try:
+            with METRICS.timer("profile_fetch"), self.rate_limiter.request():
+                response = self.http.request("GET", profile.url, headers=headers, timeout=self.timeout)
+                if response.status >= 400 and response.status != 404:
+                    raise urllib3.exceptions.HTTPError(f"GET {profile.url} returned {response.status}")
+        except Exception as e:
+            print(f"Error fetching profile of {profile.name}: {e}")
+            return ProfileResult(profile.player_id, profile.url, FAILED)
+
+        result = ProfileResult(
+            profile.player_id, profile.url, UNCHANGED,
+            etag=response.headers.get("ETag") or profile.etag,
+            last_modified=response.headers.get("Last-Modified") or profile.last_modified,
+            content_hash=profile.content_hash,
+        )
+        if response.status == 404:
+            result.status = MISSING
+        elif response.status == 200:
+            html = response.data.decode(errors="replace")
+            result.content_hash = content_hash(html)
+            if result.content_hash != profile.content_hash:
+                result.status = CHANGED
+                with METRICS.timer("profile_parse"):
+                    result.fields = extract_player_profile(make_soup(html))
+        return result
+
+
+def write_profiles(session, results: list[ProfileResult]) -> None:
+    """Update the players whose profile changed and record every check, one statement each."""
+    results = [result for result in results if result.status != FAILED]
+    if not results:
+        return
+    now = datetime.now(timezone.utc)
+    try:
+        changed = [{"id": result.player_id, **result.fields} for result in results if result.fields]
+        if changed:
+            # bulk UPDATE by primary key, rows are grouped by the columns they set
+            session.execute(update(Player), changed)
+        stmt = insert(PlayerProfile).values([
+            {
+                "player_id": result.player_id,
+                "url": result.url,
+                "etag": result.etag,
+                "last_modified": result.last_modified,
+                "content_hash": result.content_hash,
+                "status": result.status,
+                "checked_at": now,
+                "changed_at": now if result.status == CHANGED else None,
+            }
+            for result in results
+        ])
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=["player_id"],
+            set_={
+                "url": stmt.excluded.url,
+                "etag": stmt.excluded.etag,
+                "last_modified": stmt.excluded.last_modified,
+                "content_hash": stmt.excluded.content_hash,
+                "status": stmt.excluded.status,
+                "checked_at": stmt.excluded.checked_at,
+                "changed_at": func.coalesce(stmt.excluded.changed_at, PlayerProfile.changed_at),
+            },
+        ))
+        session.commit()
+    except Exception as e:
+        print(f"Error writing {len(results)} player profiles: {e}")
+        session.rollback()
+        raise
+
+
+def enrich_profiles(session, fetcher: ProfileFetcher, workers: int = DEFAULT_WORKERS,
+                    max_age_days: int = DEFAULT_MAX_AGE_DAYS, limit: int | None = None,
+                    batch_size: int = DEFAULT_BATCH_SIZE,
+                    competition_slug: str = DEFAULT_COMPETITION_SLUG, names: list[str] | None = None) -> Counter:
+    """
+    Fetch the stale profiles on `workers` threads and write them every
+    batch_size results, returns how many profiles ended in each status.
+    Failed fetches are not recorded and are retried on the next run.
+    """
+    profiles = stale_profiles(session, max_age_days, limit, competition_slug, names)
+    print(f"Checking {len(profiles)} player profiles")
+    counts = Counter()
+    batch = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="profile-worker") as executor:
+        for result in executor.map(fetcher.fetch, profiles):
+            counts[result.status] += 1
+            METRICS.incr(f"profiles_{result.status}")
+            batch.append(result)
+            if len(batch) >= batch_size:
+                write_profiles(session, batch)
+                batch = []
+    write_profiles(session, batch)
+    return counts
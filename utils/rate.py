@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RateLimiter:
+    """
+    Politeness limit shared between threads: request starts are spaced at
+    least `interval` seconds apart no matter how many workers are running.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        """Told how each request went, a fixed interval ignores it."""
+
+    @contextmanager
+    def request(self, wait: bool = True):
+        """Wait for a slot (unless wait=False), then time the request in the block and record how it went."""
+        if wait:
+            self.wait()
+        start = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(time.monotonic() - start, ok)
+
+
+class AdaptiveRateController(RateLimiter):
+    """
+    RateLimiter whose interval follows how the site is coping: it is
+    multiplied by `backoff` after an error or a response slower than `slow`
+    seconds, and by `recovery` after each healthy response, always staying
+    between min_interval and max_interval.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float = 30.0, slow: float = 5.0,
+                 backoff: float = 2.0, recovery: float = 0.9):
+        super().__init__(min_interval)
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.slow = slow
+        self.backoff = backoff
+        self.recovery = recovery
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            if not ok or seconds > self.slow:
+                # start backing off from a second even when the floor is 0
+                self.interval = min(self.max_interval, max(self.interval * self.backoff, 1.0))
+            else:
+                self.interval = max(self.min_interval, self.interval * self.recovery)
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for asyncio tasks: allows `rate` requests per second on
+    average with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
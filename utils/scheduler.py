@@ -0,0 +1,247 @@
+import itertools
+import queue
+import threading
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import Callable, Iterable
+
+from sqlalchemy.orm import Session as OrmSession
+
+from utils import state
+from utils.fetch import CacheMiss, Fetcher
+from utils.metrics import METRICS, Scope
+from utils.scrape import (
+    ScrapeConfig,
+    determine_latest_round,
+    draw_page_ready,
+    draw_url,
+    fetch_page,
+    mark_state,
+    parse_draw_page,
+    process_match_page,
+    save_byes,
+)
+
+SEASON = "season"
+
+
+def parse_numbers(value: str) -> list[int]:
+    """'2005-2007' or '1,3-4' -> [2005, 2006, 2007] or [1, 3, 4]."""
+    numbers = []
+    for part in value.split(","):
+        start, _, end = part.partition("-")
+        numbers.extend(range(int(start), int(end or start) + 1))
+    return numbers
+
+
+@dataclass(frozen=True)
+class Target:
+    """One season of a competition to scrape. rounds=None means every finished round."""
+    competition_id: int
+    year: int
+    rounds: tuple[int, ...] | None = None
+    # lower runs first, ties go to the newest season and round
+    priority: int = 0
+
+
+def parse_target(value: str) -> list[Target]:
+    """
+    Expand one --matrix entry, COMP:YEARS[:ROUNDS][@PRIORITY], into a Target
+    per season, e.g. 111:2015-2025 or 116:2024:1-5@1.
+    """
+    value, _, priority = value.partition("@")
+    parts = value.split(":")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Expected COMP:YEARS[:ROUNDS][@PRIORITY], got {value!r}")
+    rounds = tuple(parse_numbers(parts[2])) if len(parts) == 3 else None
+    return [
+        Target(competition_id=int(parts[0]), year=year, rounds=rounds, priority=int(priority or 0))
+        for year in parse_numbers(parts[1])
+    ]
+
+
+@dataclass
+class Task:
+    kind: str  # SEASON, state.ROUND or state.MATCH
+    target: Target
+    round_number: int | None = None
+    path: str | None = None
+
+    @property
+    def key(self) -> str:
+        if self.kind == SEASON:
+            return f"{self.target.competition_id}/{self.target.year}"
+        if self.kind == state.ROUND:
+            return state.round_key(self.target.competition_id, self.target.year, self.round_number)
+        return self.path
+
+    @property
+    def priority(self) -> tuple:
+        # a season is resolved before any of its rounds, a round's matches
+        # before the next round's draw page
+        round_order = float("-inf") if self.kind == SEASON else -self.round_number
+        return self.target.priority, -self.target.year, round_order, self.kind != state.MATCH
+
+
+@dataclass
+class RoundProgress:
+    pending: int
+    ok: bool
+    html: str
+    # the draw page task's metrics scope, its matches run on other threads
+    scope: Scope | None = None
+
+
+class Scheduler:
+    """
+    Runs a matrix of competitions, seasons and rounds as one deduplicated
+    priority queue of season, draw page and match page tasks over `workers`
+    threads, each with its own fetcher and DB session as in WorkerPool.
+
+    The newest round of the newest season goes first and history after.
+    Progress is checkpointed in scrape_state exactly as scrape_round does, so
+    a restart skips every round and match already complete.
+    """
+
+    def __init__(self, config: ScrapeConfig, targets: Iterable[Target], workers: int,
+                 session_factory: Callable[[], OrmSession], fetcher_factory: Callable[[], Fetcher]):
+        self.config = config
+        self.targets = list(targets)
+        self.workers = workers
+        self.session_factory = session_factory
+        self.fetcher_factory = fetcher_factory
+        self.counts = Counter()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._seen: set[tuple[str, str]] = set()
+        self._rounds: dict[str, RoundProgress] = {}
+
+    def _put(self, task: Task) -> bool:
+        """Queue a task unless one with the same kind and key was queued before."""
+        with self._lock:
+            if (task.kind, task.key) in self._seen:
+                return False
+            self._seen.add((task.kind, task.key))
+        self._queue.put((task.priority, next(self._order), task))
+        return True
+
+    def _task_config(self, config: ScrapeConfig, target: Target) -> ScrapeConfig:
+        return replace(config, competition_id=target.competition_id, year=target.year)
+
+    def _queue_rounds(self, config: ScrapeConfig, target: Target, rounds: Iterable[int]) -> None:
+        tasks = [Task(state.ROUND, target, round_number) for round_number in rounds]
+        if config.track_state:
+            with config.db_lock:
+                done = state.completed_keys(config.session, state.ROUND, [task.key for task in tasks])
+            if done:
+                print(f"Skipping {len(done)} rounds of {target.competition_id}/{target.year} already complete.")
+            tasks = [task for task in tasks if task.key not in done]
+        for task in tasks:
+            self._put(task)
+
+    def _run_season(self, config: ScrapeConfig, task: Task) -> None:
+        latest_round = determine_latest_round(config)
+        self._queue_rounds(config, task.target, range(1, latest_round))
+
+    def _run_round(self, config: ScrapeConfig, task: Task) -> None:
+        print(f"\n========== {task.key} ==========")
+        mark_state(config, state.ROUND, task.key, state.IN_PROGRESS)
+        try:
+            html = fetch_page(config, draw_url(config, task.round_number), draw_page_ready).html
+        except CacheMiss as e:
+            print(f"Page not in cache, skipping: {e}")
+            return
+        bye_teams, paths = parse_draw_page(html)
+        self._save_byes(config, task.round_number, bye_teams)
+        if config.track_state:
+            with config.db_lock:
+                done = state.completed_keys(config.session, state.MATCH, paths)
+            paths = [path for path in paths if path not in done]
+        matches = [Task(state.MATCH, task.target, task.round_number, path) for path in dict.fromkeys(paths)]
+        with self._lock:
+            matches = [match for match in matches if (match.kind, match.key) not in self._seen]
+            self._rounds[task.key] = RoundProgress(pending=len(matches), ok=True, html=html, scope=METRICS.current())
+        for match in matches:
+            self._put(match)
+        if not matches:
+            self._round_done(config, task, True)
+
+    def _run_match(self, config: ScrapeConfig, task: Task) -> None:
+        ok = False
+        with self._lock:
+            progress = self._rounds.get(state.round_key(task.target.competition_id, task.target.year, task.round_number))
+        try:
+            with METRICS.within(progress.scope if progress else None):
+                ok = self._process_match(config, task.path)
+        finally:
+            self._round_done(config, task, ok)
+
+    def _save_byes(self, config: ScrapeConfig, round_number: int, bye_teams: list[str]) -> None:
+        save_byes(config, round_number, bye_teams)
+
+    def _process_match(self, config: ScrapeConfig, path: str) -> bool:
+        return process_match_page(config, path)
+
+    def _round_done(self, config: ScrapeConfig, task: Task, ok: bool) -> None:
+        """Called as each of a round's matches finishes, marks the round once the last one has."""
+        key = state.round_key(task.target.competition_id, task.target.year, task.round_number)
+        with self._lock:
+            progress = self._rounds[key]
+            progress.ok = progress.ok and ok
+            if task.kind == state.MATCH:
+                progress.pending -= 1
+            if progress.pending:
+                return
+        mark_state(config, state.ROUND, key, state.COMPLETE if progress.ok else state.IN_PROGRESS, progress.html)
+
+    def _run(self, config: ScrapeConfig, task: Task) -> None:
+        config = self._task_config(config, task.target)
+        if task.kind == SEASON:
+            self._run_season(config, task)
+        elif task.kind == state.ROUND:
+            with METRICS.scope("round", task.key):
+                self._run_round(config, task)
+        else:
+            self._run_match(config, task)
+
+    def _work(self) -> None:
+        config = replace(self.config, session=self.session_factory(), fetcher=self.fetcher_factory())
+        try:
+            while True:
+                _, _, task = self._queue.get()
+                try:
+                    if task is None:
+                        return
+                    self._run(config, task)
+                    with self._lock:
+                        self.counts[task.kind] += 1
+                except Exception as e:
+                    print(f"Error running {task.kind} {task.key}: {e}")
+                    with self._lock:
+                        self.counts["failed"] += 1
+                finally:
+                    self._queue.task_done()
+        finally:
+            config.fetcher.close()
+            config.session.close()
+
+    def run(self) -> Counter:
+        """Run every target to completion, returns the number of tasks run per kind."""
+        for target in self.targets:
+            if target.rounds is None:
+                self._put(Task(SEASON, target))
+            else:
+                self._queue_rounds(self._task_config(self.config, target), target, target.rounds)
+        threads = [
+            threading.Thread(target=self._work, name=f"scheduler-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        self._queue.join()
+        for _ in threads:
+            self._queue.put(((float("inf"),), next(self._order), None))
+        for thread in threads:
+            thread.join()
+        return self.counts
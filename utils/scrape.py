@@ -1,21 +1,22 @@
-import random
 import re
-from dataclasses import dataclass
-
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
+import threading
+from dataclasses import dataclass, field
+from urllib.parse import urljoin
+
 from sqlalchemy.orm import Session as OrmSession
 
-from utils.db import create_bye_match, get_or_create_event, get_or_create_match
+from utils import state
+from utils.fetch import CacheMiss, Fetcher, Page
+from utils.metrics import METRICS
 from utils.parse import (
-    extract_bye_teams,
-    extract_event_data,
+    EventRecord,
+    extract_draw,
     extract_match_data,
+    extract_team_lists,
+    iter_event_records,
+    make_soup,
 )
+from utils.sinks import PostgresSink, Sink
 
 BASE_URL = "https://www.nrl.com"
 DEFAULT_YEAR = "2025"
@@ -25,72 +26,197 @@ DEFAULT_COMP = 111  # NRL competition ID
 @dataclass
 class ScrapeConfig:
     session: OrmSession
-    driver: webdriver
+    fetcher: Fetcher
     year: int = DEFAULT_YEAR
     competition_id: int = DEFAULT_COMP
+    # write each match's events in one batched transaction, False uses the per-row helpers
+    batch_writes: bool = True
+    # shared between parallel workers so DB writes are serialised and results
+    # match the sequential path, re-entrant so helpers can nest
+    db_lock: threading.RLock = field(default_factory=threading.RLock)
+    # record per round / match progress in scrape_state and skip finished work
+    track_state: bool = True
+    # where parsed matches and events go, None writes to Postgres through session
+    sink: Sink | None = None
 
+    def get_sink(self) -> Sink:
+        return self.sink or PostgresSink(self.session, self.batch_writes)
 
-def create_driver() -> webdriver.Chrome:
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument(f"--user-data-dir=/tmp/chrome-user-data-{random.randint(1000, 9999)}")
-    options.binary_location = "/usr/bin/chromium"
-    return webdriver.Chrome(options=options)
 
+def draw_page_ready(page: Page) -> bool:
+    return "match--highlighted" in page.html or "match-bye-team" in page.html
 
-def process_match_page(session: OrmSession, driver: webdriver, url: str) -> None:
-    print(f"Visiting match URL: {url}")
-    driver.get(f"{BASE_URL}/{url}")
+
+def match_page_ready(page: Page) -> bool:
+    return "match-header__title" in page.html
+
+
+def redirected_to_round(page: Page) -> bool:
+    return "round=" in page.final_url
+
+
+def parse_draw_page(html: str) -> tuple[list[str], list[str]]:
+    """Returns the teams with a bye and the match page paths listed on a draw page."""
+    with METRICS.timer("parse"):
+        soup = make_soup(html)
+    with METRICS.timer("extract"):
+        return extract_draw(soup)
+
+
+def parse_match_page(html: str, url: str) -> list[dict]:
+    """The match data on a match page, each with the page's team lists under "appearances"."""
     year = re.search(r"/(\d{4})/", url).group(1)
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    for match_div in soup.find_all("div", class_="match"):
-        data = extract_match_data(match_div, year)
-        match = get_or_create_match(session, data)
-        if len(match.events) > 0:
-            print(f"Match {match.id} already has events, skipping event scraping.")
-            continue
-        print(f"Processing match events for match ID: {match.id}")
-        try:
-            # wait random time between 0 and 6 seconds to avoid being blocked
-            play_by_play_tab = WebDriverWait(driver, random.randint(0, 6)).until(
-                EC.element_to_be_clickable((By.XPATH, "//a[.//span[text()='Play by Play']]"))
-            )
-            play_by_play_tab.click()
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            for event_soup in soup.find_all("div", class_="match-centre-event__content"):
-                for parsed in extract_event_data(event_soup):
-                    if parsed:
-                        get_or_create_event(session, match.id, parsed)
-        except Exception as e:
-            print("Error processing events:", e)
-
-
-def scrape_round(config: ScrapeConfig, round_number: int) -> None:
-    print(f"\n========== Round {round_number} ==========")
-    config.driver.get(f"{BASE_URL}/draw/?competition={config.competition_id}&round={round_number}&season={config.year}")
-    soup = BeautifulSoup(config.driver.page_source, "html.parser")
-    # Work out teams with a bye this round
-    byes = soup.find_all("div", class_="o-shadowed-box u-spacing-mv-16 u-text-align-center")
-    bye_teams = extract_bye_teams(str(byes))
-    for team in bye_teams:
-        create_bye_match(config.session, team, round_number)
+    with METRICS.timer("parse"):
+        soup = make_soup(html)
+    with METRICS.timer("extract"):
+        matches = [extract_match_data(match_div, year) for match_div in soup.find_all("div", class_="match")]
+        appearances = extract_team_lists(soup)
+    for data in matches:
+        data["appearances"] = appearances
+    return matches
+
+
+def parse_play_by_play(html: str) -> list[EventRecord]:
+    with METRICS.timer("parse"):
+        soup = make_soup(html)
+    with METRICS.timer("extract"):
+        events = list(iter_event_records(soup))
+    METRICS.incr("events_parsed", len(events))
+    return events
+
+
+def fetch_page(config: ScrapeConfig, url: str, ready=None) -> Page:
+    with METRICS.timer("fetch"):
+        page = config.fetcher.get(url, ready)
+    METRICS.incr("pages_fetched")
+    return page
+
+
+def fetch_play_by_play(config: ScrapeConfig, url: str) -> str:
+    with METRICS.timer("play_by_play"):
+        return config.fetcher.play_by_play(url)
+
+
+def save_byes(config: ScrapeConfig, round_number: int, bye_teams: list[str]) -> None:
+    sink = config.get_sink()
+    with config.db_lock, METRICS.timer("db_write"):
+        for team in bye_teams:
+            sink.save_bye(team, round_number, int(config.year), config.competition_id)
     print(f"Bye teams for Round {round_number}: {bye_teams}")
-    # Get all matches for the round
-    matches = soup.find_all("a", class_="match--highlighted u-flex-column u-flex-align-items-center u-width-100")
-    for match in matches:
-        path = match.get("href")
-        if path:
-            process_match_page(config.session, config.driver, path)
+
+
+def save_events(config: ScrapeConfig, match_id: int, events: list[EventRecord]) -> None:
+    with config.db_lock, METRICS.timer("db_write"):
+        inserted = config.get_sink().save_events(match_id, events)
+    METRICS.incr("events_inserted", inserted)
+    print(f"Inserted {inserted} new events for match ID: {match_id}")
+
+
+def save_appearances(config: ScrapeConfig, match_id: int, appearances: list[dict] | None) -> bool:
+    """Store a match's team lists, returns False if they could not be written."""
+    appearances = [a for a in appearances or [] if a.get("player") and a.get("team_name")]
+    if not appearances:
+        return True
+    for appearance in appearances:
+        if appearance.get("profile_path"):
+            appearance["profile_url"] = urljoin(BASE_URL, appearance["profile_path"])
+    with config.db_lock, METRICS.timer("db_write"):
+        written = config.get_sink().save_appearances(match_id, appearances)
+    METRICS.incr("appearances_written", written)
+    return written > 0
+
+
+def mark_state(config: ScrapeConfig, kind: str, key: str, status: str, html: str | None = None) -> None:
+    if config.track_state:
+        with config.db_lock:
+            state.mark(config.session, kind, key, status, html)
+
+
+def process_match_page(config: ScrapeConfig, url: str) -> bool:
+    """Scrape one match page, returns whether the match and its events are now fully stored."""
+    with METRICS.scope("match", url):
+        ok = _process_match_page(config, url)
+    METRICS.incr("matches_complete" if ok else "matches_failed")
+    return ok
+
+
+def _process_match_page(config: ScrapeConfig, url: str) -> bool:
+    print(f"Visiting match URL: {url}")
+    try:
+        html = fetch_page(config, f"{BASE_URL}/{url}", match_page_ready).html
+    except CacheMiss as e:
+        print(f"Page not in cache, skipping: {e}")
+        return False
+    matches = parse_match_page(html, url)
+    ok = bool(matches)
+    sink = config.get_sink()
+    for data in matches:
+        with config.db_lock, METRICS.timer("db_write"):
+            match_id = sink.save_match(data, int(config.year), config.competition_id)
+            has_events = sink.has_events(match_id)
+        if not save_appearances(config, match_id, data.get("appearances")):
+            ok = False
+        if has_events:
+            print(f"Match {match_id} already has events, skipping event scraping.")
+        else:
+            print(f"Processing match events for match ID: {match_id}")
+            try:
+                html = fetch_play_by_play(config, f"{BASE_URL}/{url}")
+                save_events(config, match_id, parse_play_by_play(html))
+            except Exception as e:
+                print("Error processing events:", e)
+                ok = False
+        with config.db_lock, METRICS.timer("db_write"):
+            sink.match_done(match_id)
+    mark_state(config, state.MATCH, url, state.COMPLETE if ok else state.FAILED, html)
+    return ok
+
+
+def draw_url(config: ScrapeConfig, round_number: int) -> str:
+    return f"{BASE_URL}/draw/?competition={config.competition_id}&round={round_number}&season={config.year}"
+
+
+def scrape_round(config: ScrapeConfig, round_number: int, pool=None) -> None:
+    """
+    Scrape a round's draw page and every match on it, through the WorkerPool if
+    one is given. Rounds and matches already marked complete in scrape_state
+    are skipped before any page is loaded.
+    """
+    print(f"\n========== Round {round_number} ==========")
+    key = state.round_key(config.competition_id, config.year, round_number)
+    with METRICS.scope("round", key):
+        _scrape_round(config, round_number, key, pool)
+
+
+def _scrape_round(config: ScrapeConfig, round_number: int, key: str, pool) -> None:
+    if config.track_state and state.get_status(config.session, state.ROUND, key) == state.COMPLETE:
+        print(f"Round {round_number} already complete, skipping.")
+        return
+    mark_state(config, state.ROUND, key, state.IN_PROGRESS)
+    try:
+        html = fetch_page(config, draw_url(config, round_number), draw_page_ready).html
+    except CacheMiss as e:
+        print(f"Page not in cache, skipping: {e}")
+        return
+    bye_teams, paths = parse_draw_page(html)
+    save_byes(config, round_number, bye_teams)
+    if config.track_state:
+        done = state.completed_keys(config.session, state.MATCH, paths)
+        if done:
+            print(f"Skipping {len(done)} matches already complete.")
+        paths = [path for path in paths if path not in done]
+    if pool:
+        results = pool.process_matches(paths)
+    else:
+        results = [process_match_page(config, path) for path in paths]
+    mark_state(config, state.ROUND, key, state.COMPLETE if all(results) else state.IN_PROGRESS, html)
 
 
 def determine_latest_round(config: ScrapeConfig) -> int:
     """Finds the latest round number of completed matches for a given year / competition."""
     # if round is not included the browser redirects to the latest round
-    config.driver.get(f"{BASE_URL}/draw/?competition={config.competition_id}&season={config.year}")
-    final_url = config.driver.current_url
+    url = f"{BASE_URL}/draw/?competition={config.competition_id}&season={config.year}"
+    final_url = config.fetcher.get(url, redirected_to_round).final_url
     round_match = re.search(r"round=(\d+)", final_url)
     last_round = int(round_match.group(1))
     print(f"Latest round for {config.year} is {last_round}")
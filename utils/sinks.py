@@ -0,0 +1,341 @@
+"""
+Where the scraper writes what it parses. scrape.py, the worker pool and the
+async engine hand matches, byes, events and team lists to a Sink, and every
+call is made holding ScrapeConfig.db_lock, so a sink is only ever written
+by one thread at a time.
+
+    PostgresSink  the utils/db.py helpers on the ScrapeConfig's session (the default)
+    SQLiteSink    an embedded SQLite database in WAL mode, one batched
+                  transaction per match, for laptop runs and hermetic tests
+    NDJSONSink    one JSON object per line appended to a file or stdout, to
+                  pipe scrape output into other tools
+
+open_sink builds one from the --sink option.
+"""
+import json
+import sqlite3
+import sys
+from datetime import date, datetime
+from typing import IO, Iterable
+
+from sqlalchemy.orm import Session as OrmSession
+
+from utils.db import (
+    bulk_insert_match_events,
+    create_bye_match,
+    get_or_create_event,
+    get_or_create_match,
+    match_has_events,
+    refresh_match_stats,
+    upsert_player_appearances,
+)
+from utils.parse import EventRecord, parse_game_time_to_seconds
+
+
+class Sink:
+    """
+    save_match returns the id the sink gave the match, which the other
+    calls for that match are passed. match_done is called once a match's
+    events and team lists have been handed over.
+    """
+
+    def save_match(self, data: dict, season: int, competition_id: int) -> int:
+        raise NotImplementedError
+
+    def save_bye(self, team_name: str, round_number: int, season: int, competition_id: int) -> int:
+        raise NotImplementedError
+
+    def has_events(self, match_id: int) -> bool:
+        raise NotImplementedError
+
+    def save_events(self, match_id: int, events: list[EventRecord]) -> int:
+        """Write a match's events, returns how many were new."""
+        raise NotImplementedError
+
+    def save_appearances(self, match_id: int, appearances: list[dict]) -> int:
+        raise NotImplementedError
+
+    def match_done(self, match_id: int) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class PostgresSink(Sink):
+    """
+    The utils/db.py helpers on one session. Cheap to create, ScrapeConfig
+    makes one per call around its own session when no sink is given.
+    """
+
+    def __init__(self, session: OrmSession, batch_writes: bool = True):
+        self.session = session
+        self.batch_writes = batch_writes
+
+    def save_match(self, data: dict, season: int, competition_id: int) -> int:
+        return get_or_create_match(self.session, data, season, competition_id).id
+
+    def save_bye(self, team_name: str, round_number: int, season: int, competition_id: int) -> int:
+        match_id = create_bye_match(self.session, team_name, round_number, season, competition_id).id
+        refresh_match_stats(self.session, match_id)
+        return match_id
+
+    def has_events(self, match_id: int) -> bool:
+        return match_has_events(self.session, match_id)
+
+    def save_events(self, match_id: int, events: list[EventRecord]) -> int:
+        if self.batch_writes:
+            return bulk_insert_match_events(self.session, match_id, events)
+        return sum(1 for parsed in events if get_or_create_event(self.session, match_id, parsed))
+
+    def save_appearances(self, match_id: int, appearances: list[dict]) -> int:
+        return upsert_player_appearances(self.session, match_id, appearances)
+
+    def match_done(self, match_id: int) -> None:
+        refresh_match_stats(self.session, match_id)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS teams (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS players (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS event_types (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    competition_id INTEGER NOT NULL,
+    season INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    date TEXT,
+    venue TEXT,
+    home_team_id INTEGER NOT NULL REFERENCES teams(id),
+    away_team_id INTEGER REFERENCES teams(id),
+    score_home INTEGER,
+    score_away INTEGER,
+    attendance INTEGER,
+    weather TEXT,
+    ground_conditions TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_matches_date_teams ON matches(date, home_team_id, away_team_id)
+    WHERE date IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_matches_bye ON matches(competition_id, season, round, home_team_id)
+    WHERE away_team_id IS NULL;
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    season INTEGER NOT NULL,
+    match_id INTEGER NOT NULL REFERENCES matches(id) ON DELETE CASCADE,
+    team_id INTEGER REFERENCES teams(id),
+    player_id INTEGER REFERENCES players(id),
+    event_type_id INTEGER NOT NULL REFERENCES event_types(id),
+    game_time_sec INTEGER NOT NULL,
+    description TEXT
+);
+-- events_natural_key, SQLite has no NULLS NOT DISTINCT so a missing player is 0
+CREATE UNIQUE INDEX IF NOT EXISTS events_natural_key
+    ON events(match_id, event_type_id, game_time_sec, IFNULL(player_id, 0));
+CREATE TABLE IF NOT EXISTS player_appearances (
+    match_id INTEGER NOT NULL REFERENCES matches(id) ON DELETE CASCADE,
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    team_id INTEGER NOT NULL REFERENCES teams(id),
+    jersey_number INTEGER,
+    position TEXT,
+    stats TEXT,
+    PRIMARY KEY (match_id, player_id)
+);
+"""
+
+
+class SQLiteSink(Sink):
+    """
+    Matches, events and team lists in an embedded SQLite file, with the same
+    natural keys as the Postgres schema so a rescrape adds nothing twice.
+    WAL lets readers query the file during a run; a match's rows are written
+    with executemany and committed together in match_done.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # with WAL, NORMAL only syncs at checkpoints and stays crash safe
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self._ids = {"teams": {}, "players": {}, "event_types": {}}
+
+    def _lookup(self, table: str, names: Iterable[str]) -> dict[str, int]:
+        """Insert any names not seen yet in one executemany and return a name -> id map."""
+        ids = self._ids[table]
+        missing = sorted({name for name in names if name and name not in ids})
+        if missing:
+            self.conn.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", [(name,) for name in missing])
+            placeholders = ",".join("?" * len(missing))
+            ids.update({
+                name: id_ for id_, name in
+                self.conn.execute(f"SELECT id, name FROM {table} WHERE name IN ({placeholders})", missing)
+            })
+        return ids
+
+    def _match_id(self, where: str, params: tuple) -> int:
+        return self.conn.execute(f"SELECT id FROM matches WHERE {where}", params).fetchone()[0]
+
+    def save_match(self, data: dict, season: int, competition_id: int) -> int:
+        teams = self._lookup("teams", [data["home_name"], data["away_name"]])
+        match_date, home_team_id, away_team_id = data["date"].isoformat(), teams[data["home_name"]], teams[data["away_name"]]
+        self.conn.execute(
+            "INSERT OR IGNORE INTO matches (competition_id, season, round, date, venue, home_team_id, away_team_id,"
+            " score_home, score_away, attendance, weather, ground_conditions)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (competition_id, season, data["round"], match_date, data["venue"], home_team_id, away_team_id,
+             data["home_score"], data["away_score"], int((data["attendance"] or "0").replace(",", "")),
+             data["weather"], data["ground_conditions"]),
+        )
+        self.conn.commit()
+        return self._match_id(
+            "date = ? AND home_team_id = ? AND away_team_id = ?", (match_date, home_team_id, away_team_id)
+        )
+
+    def save_bye(self, team_name: str, round_number: int, season: int, competition_id: int) -> int:
+        key = (competition_id, season, round_number, self._lookup("teams", [team_name])[team_name])
+        self.conn.execute(
+            "INSERT OR IGNORE INTO matches (competition_id, season, round, home_team_id, venue)"
+            " VALUES (?, ?, ?, ?, 'Bye')",
+            key,
+        )
+        self.conn.commit()
+        return self._match_id(
+            "competition_id = ? AND season = ? AND round = ? AND home_team_id = ? AND away_team_id IS NULL", key
+        )
+
+    def has_events(self, match_id: int) -> bool:
+        return self.conn.execute("SELECT EXISTS (SELECT 1 FROM events WHERE match_id = ?)", (match_id,)).fetchone()[0]
+
+    def save_events(self, match_id: int, events: list[EventRecord]) -> int:
+        if not events:
+            return 0
+        season = self.conn.execute("SELECT season FROM matches WHERE id = ?", (match_id,)).fetchone()[0]
+        event_types = self._lookup("event_types", [e["title"] for e in events])
+        teams = self._lookup("teams", [e["team_name"] for e in events])
+        players = self._lookup("players", [e["player"] for e in events])
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO events (season, match_id, team_id, player_id, event_type_id, game_time_sec, description)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (season, match_id, teams.get(e["team_name"]), players.get(e["player"]), event_types[e["title"]],
+                 parse_game_time_to_seconds(e["timestamp"]), e.get("role") or e.get("players"))
+                for e in events
+            ],
+        )
+        return self.conn.total_changes - before
+
+    def save_appearances(self, match_id: int, appearances: list[dict]) -> int:
+        appearances = [a for a in appearances if a.get("player") and a.get("team_name")]
+        teams = self._lookup("teams", [a["team_name"] for a in appearances])
+        players = self._lookup("players", [a["player"] for a in appearances])
+        self.conn.executemany(
+            "INSERT INTO player_appearances (match_id, player_id, team_id, jersey_number, position, stats)"
+            " VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (match_id, player_id) DO UPDATE SET team_id = excluded.team_id,"
+            " jersey_number = excluded.jersey_number, position = excluded.position, stats = excluded.stats",
+            [
+                (match_id, players[a["player"]], teams[a["team_name"]], a.get("jersey_number"), a.get("position"),
+                 json.dumps(a.get("stats") or {}))
+                for a in appearances
+            ],
+        )
+        return len(appearances)
+
+    def match_done(self, match_id: int) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class NDJSONSink(Sink):
+    """
+    Appends one JSON object per record, tagged with "type": match, bye,
+    event or appearance. Match ids are numbered per run, so events and team
+    lists can be joined to their match downstream. Nothing is read back:
+    has_events only knows about matches written in this run.
+    """
+
+    def __init__(self, stream: IO[str], close_stream: bool = False):
+        self.stream = stream
+        self.close_stream = close_stream
+        self._match_ids = {}
+        self._with_events = set()
+
+    def _write(self, records: Iterable[dict]) -> None:
+        self.stream.write("".join(json.dumps(record, default=_json_default) + "\n" for record in records))
+
+    def _new_id(self, key: tuple) -> tuple[int, bool]:
+        if key in self._match_ids:
+            return self._match_ids[key], False
+        self._match_ids[key] = len(self._match_ids) + 1
+        return self._match_ids[key], True
+
+    def save_match(self, data: dict, season: int, competition_id: int) -> int:
+        match_id, new = self._new_id((data["date"], data["home_name"], data["away_name"]))
+        if new:
+            fields = {key: value for key, value in data.items() if key != "appearances"}
+            self._write([{"type": "match", "match_id": match_id, "season": season,
+                          "competition_id": competition_id, **fields}])
+        return match_id
+
+    def save_bye(self, team_name: str, round_number: int, season: int, competition_id: int) -> int:
+        match_id, new = self._new_id((competition_id, season, round_number, team_name))
+        if new:
+            self._write([{"type": "bye", "match_id": match_id, "season": season, "competition_id": competition_id,
+                          "round": round_number, "team_name": team_name}])
+        return match_id
+
+    def has_events(self, match_id: int) -> bool:
+        return match_id in self._with_events
+
+    def save_events(self, match_id: int, events: list[EventRecord]) -> int:
+        self._with_events.add(match_id)
+        self._write(
+            {"type": "event", "match_id": match_id, **(e.as_dict() if isinstance(e, EventRecord) else e)}
+            for e in events
+        )
+        return len(events)
+
+    def save_appearances(self, match_id: int, appearances: list[dict]) -> int:
+        self._write({"type": "appearance", "match_id": match_id, **a} for a in appearances)
+        return len(appearances)
+
+    def match_done(self, match_id: int) -> None:
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.flush()
+        if self.close_stream:
+            self.stream.close()
+
+
+def is_postgres(spec: str) -> bool:
+    return spec == "postgres" or spec.startswith("postgresql")
+
+
+def open_sink(spec: str) -> Sink | None:
+    """
+    The sink for a --sink option: sqlite:PATH, or ndjson:PATH with ndjson:-
+    for stdout. None for "postgres" or a postgresql:// URL, the scraper then
+    writes through its own sessions.
+    """
+    kind, _, target = spec.partition(":")
+    if is_postgres(spec):
+        return None
+    if kind == "sqlite" and target:
+        return SQLiteSink(target)
+    if kind == "ndjson" and target:
+        if target == "-":
+            return NDJSONSink(sys.stdout)
+        return NDJSONSink(open(target, "a", encoding="utf-8"), close_stream=True)
+    raise ValueError(f"Unknown sink {spec!r}, expected postgres, a postgresql:// URL, sqlite:PATH or ndjson:PATH")
@@ -0,0 +1,66 @@
+import hashlib
+import re
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from models.models import ScrapeState
+
+ROUND = "round"
+MATCH = "match"
+
+IN_PROGRESS = "in_progress"
+COMPLETE = "complete"
+FAILED = "failed"
+
+
+def round_key(competition_id: int, year: int, round_number: int) -> str:
+    return f"{competition_id}/{year}/{round_number}"
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode()).hexdigest()
+
+
+def mark(session, kind: str, key: str, status: str, html: str | None = None) -> None:
+    """Record the status of a round or match page, keeping the hash of the page it was last scraped from."""
+    values = {"kind": kind, "key": key, "status": status, "content_hash": content_hash(html) if html else None}
+    stmt = insert(ScrapeState).values(**values)
+    update = {"status": stmt.excluded.status, "updated_at": func.now()}
+    if html:
+        update["content_hash"] = stmt.excluded.content_hash
+    session.execute(stmt.on_conflict_do_update(index_elements=["kind", "key"], set_=update))
+    session.commit()
+
+
+def get_status(session, kind: str, key: str) -> str | None:
+    return session.execute(
+        select(ScrapeState.status).where(ScrapeState.kind == kind, ScrapeState.key == key)
+    ).scalar_one_or_none()
+
+
+def completed_keys(session, kind: str, keys: Iterable[str]) -> set[str]:
+    keys = list(keys)
+    if not keys:
+        return set()
+    return set(session.execute(
+        select(ScrapeState.key).where(
+            ScrapeState.kind == kind, ScrapeState.key.in_(keys), ScrapeState.status == COMPLETE
+        )
+    ).scalars())
+
+
+def first_incomplete_round(session, competition_id: int, year: int) -> int:
+    """The round to resume a season from: one past the longest run of completed rounds starting at round 1."""
+    prefix = f"{competition_id}/{year}/"
+    keys = session.execute(
+        select(ScrapeState.key).where(
+            ScrapeState.kind == ROUND, ScrapeState.key.startswith(prefix), ScrapeState.status == COMPLETE
+        )
+    ).scalars()
+    done = {int(re.sub(r"^.*/", "", key)) for key in keys}
+    round_number = 1
+    while round_number in done:
+        round_number += 1
+    return round_number